@@ -9,31 +9,187 @@ Two modes are provided:
    Use this for local testing and development — faster iteration, no network.
 
 Both produce the same agent behavior. Switch via AGENT_MODE env var.
+
+The tools are async so that a single event loop can drive many concurrent
+sub-agent calls; call_agent() remains available for synchronous callers.
+Either way a call returns a ``shared.contracts.SubAgentResult``; the tools hand
+the orchestrator its compact ``view()``.
 """
 
+import asyncio
 import os
-import json
-from strands import tool
+import re
+import time
+from functools import cache
+
+from shared import deadline, metrics
+from shared import model_router as router
+from shared.agent_runtime import AgentPool
+from shared.contracts import SubAgentResult
+from shared.model_router import MODEL_TIERS
+from shared.resilience import CircuitBreaker, CircuitOpen, EndpointGroup
+from shared.singleflight import SingleFlight
+from shared.tracing import trace_event
 
 # ── Mode Selection ──────────────────────────────────────────────
 
 AGENT_MODE = os.getenv("AGENT_MODE", "direct")  # "direct" or "a2a"
 
 
-# ── Direct Mode Tools (Local Development) ───────────────────────
-# Import agents directly — no network, no A2A overhead.
+# ── Direct Mode (Local Development) ─────────────────────────────
+# Import agents directly — no network, no A2A overhead. Strands agents reject
+# concurrent invocations, so each call leases its own instance from a pool.
+# Each task is routed to a model tier (shared.model_router); fast-tier answers
+# that fail validation are re-run once on the large tier. Agents answer with
+# a SubAgentResult as their structured output.
+
+SUBAGENT_POOL_SIZE = int(os.getenv("SUBAGENT_POOL_SIZE", "8"))
+
+DISPLAY_NAMES = {"servicenow": "ServiceNow", "salesforce": "Salesforce"}
+
+
+def _create_agent(agent_name: str, tier: str):
+    if agent_name == "servicenow":
+        from agents.servicenow.agent import create_servicenow_agent
+        return create_servicenow_agent(tier)
+    from agents.salesforce.agent import create_salesforce_agent
+    return create_salesforce_agent(tier)
+
+
+AGENT_POOLS: dict[tuple[str, str], AgentPool] = {
+    (name, tier): AgentPool(lambda name=name, tier=tier: _create_agent(name, tier),
+                            max_idle=SUBAGENT_POOL_SIZE)
+    for name in DISPLAY_NAMES for tier in MODEL_TIERS
+}
+
+metrics.register_provider("agent_pools", lambda: {
+    f"{name}:{tier}": pool.stats() for (name, tier), pool in AGENT_POOLS.items()
+})
+
+# Comma-separated to spread calls over several replicas of an agent
+AGENT_URLS = {
+    "servicenow": lambda: os.getenv("SERVICENOW_AGENT_URL", "http://localhost:8001"),
+    "salesforce": lambda: os.getenv("SALESFORCE_AGENT_URL", "http://localhost:8002"),
+}
+
+
+# ── Request Coalescing ──────────────────────────────────────────
+# Identical tasks already in flight for the same sub-agent (a retried request,
+# two tabs, a double-clicked send) share one execution instead of each paying
+# for an LLM round trip. Tasks match after case and whitespace normalisation.
+
+COALESCE_SUBAGENT_CALLS = os.getenv("COALESCE_SUBAGENT_CALLS", "true").lower() == "true"
+
+SUBAGENT_FLIGHTS = SingleFlight("subagent")
+
+metrics.register_provider("singleflight", lambda: {"subagent": SUBAGENT_FLIGHTS.stats()})
+
+
+def coalesce_key(agent_name: str, task: str) -> tuple[str, str]:
+    return agent_name, " ".join(task.lower().split())
+
+
+def _report_coalesced(agent_name: str, task: str):
+    trace_event("coalesced", DISPLAY_NAMES[agent_name], "Joined identical in-flight call",
+                task[:120], "🔗", "info", {"agent": agent_name})
+
+
+async def call_agent_async(agent_name: str, task: str) -> SubAgentResult:
+    """Send a task to a sub-agent without blocking a thread on the LLM call."""
+    deadline.check()
+    if not COALESCE_SUBAGENT_CALLS:
+        return await _run_agent_async(agent_name, task)
+    # Each caller stops waiting when its own request is cancelled; the shared
+    # execution itself is cancelled only once every caller has gone
+    result, shared = await deadline.race(SUBAGENT_FLIGHTS.do(
+        coalesce_key(agent_name, task), lambda: _run_shared_async(agent_name, task)))
+    if shared:
+        _report_coalesced(agent_name, task)
+    return result
+
+
+async def _run_shared_async(agent_name: str, task: str) -> SubAgentResult:
+    # Runs on behalf of several requests, so no single request's deadline applies
+    deadline.current_deadline.set(None)
+    return await _run_agent_async(agent_name, task)
+
+
+def call_agent(agent_name: str, task: str) -> SubAgentResult:
+    """Synchronous counterpart of call_agent_async for non-async callers."""
+    if not COALESCE_SUBAGENT_CALLS:
+        return _run_agent(agent_name, task)
+    result, shared = SUBAGENT_FLIGHTS.do_sync(
+        coalesce_key(agent_name, task), lambda: _run_agent(agent_name, task))
+    if shared:
+        _report_coalesced(agent_name, task)
+    return result
+
+
+def _structured(result) -> SubAgentResult:
+    return result.structured_output or SubAgentResult.from_text(str(result))
+
+
+def _unstructured(agent, error: Exception) -> tuple[SubAgentResult, tuple[int, int]]:
+    # The model answered in prose even when forced to call the result tool;
+    # read before the lease is released, which clears the conversation
+    usage = agent.event_loop_metrics.accumulated_usage
+    return (SubAgentResult.from_unstructured(agent.messages, error),
+            (usage.get("inputTokens", 0), usage.get("outputTokens", 0)))
+
+
+async def _run_agent_async(agent_name: str, task: str) -> SubAgentResult:
+    if AGENT_MODE == "a2a":
+        return await _call_remote_agent_async(agent_name, task)
+    from strands.types.exceptions import StructuredOutputException
+
+    request_deadline = deadline.current_deadline.get()
+    cancel_signal = request_deadline.signal if request_deadline else None
+    decision = router.route(agent_name, task)
+    while decision is not None:
+        router.announce(decision, DISPLAY_NAMES[agent_name])
+        start = time.perf_counter()
+        try:
+            with AGENT_POOLS[agent_name, decision.tier].lease() as agent:
+                try:
+                    result = await agent.invoke_async(task, cancel_signal=cancel_signal,
+                                                      structured_output_model=SubAgentResult)
+                    output, usage = _structured(result), router.usage_of(result)
+                except StructuredOutputException as e:
+                    output, usage = _unstructured(agent, e)
+        except (asyncio.CancelledError, deadline.RequestCancelled):
+            metrics.incr("cancellation.subagent_calls_aborted")
+            raise
+        if request_deadline is not None and request_deadline.cancelled:
+            metrics.incr("cancellation.subagent_calls_aborted")
+            raise request_deadline.error()
+        # A fast-tier prose answer that fails validation escalates like any other
+        decision = router.complete(decision, task, output.view(), time.perf_counter() - start, *usage)
+    return output
+
+
+def _run_agent(agent_name: str, task: str) -> SubAgentResult:
+    if AGENT_MODE == "a2a":
+        return _call_a2a_agent(agent_name, task)
+    from strands.types.exceptions import StructuredOutputException
 
-def _get_servicenow_agent():
-    from agents.servicenow.agent import servicenow_agent
-    return servicenow_agent
+    decision = router.route(agent_name, task)
+    while decision is not None:
+        router.announce(decision, DISPLAY_NAMES[agent_name])
+        start = time.perf_counter()
+        with AGENT_POOLS[agent_name, decision.tier].lease() as agent:
+            try:
+                result = agent(task, structured_output_model=SubAgentResult)
+                output, usage = _structured(result), router.usage_of(result)
+            except StructuredOutputException as e:
+                output, usage = _unstructured(agent, e)
+        decision = router.complete(decision, task, output.view(), time.perf_counter() - start, *usage)
+    return output
 
-def _get_salesforce_agent():
-    from agents.salesforce.agent import salesforce_agent
-    return salesforce_agent
 
+# Plain async functions; agents.orchestrator.agent wraps them with strands'
+# @tool when it builds the orchestrator, keeping strands out of import time.
 
-@tool
-def servicenow_agent_tool(task: str) -> str:
+async def servicenow_agent_tool(task: str) -> str:
     """Send a task to the ServiceNow AI Agent.
 
     Use this for billing lookups, billing corrections, creating service tickets,
@@ -43,18 +199,10 @@ def servicenow_agent_tool(task: str) -> str:
     Args:
         task: Natural language description of the task for the ServiceNow agent.
     """
-    if AGENT_MODE == "a2a":
-        return _call_a2a_agent(
-            os.getenv("SERVICENOW_AGENT_URL", "http://localhost:8001"),
-            task
-        )
-    agent = _get_servicenow_agent()
-    result = agent(task)
-    return str(result)
+    return (await call_agent_async("servicenow", task)).view()
 
 
-@tool
-def salesforce_agent_tool(task: str) -> str:
+async def salesforce_agent_tool(task: str) -> str:
     """Send a task to the Salesforce Health Cloud Agent.
 
     Use this for patient record lookups, insurance verification,
@@ -64,57 +212,168 @@ def salesforce_agent_tool(task: str) -> str:
     Args:
         task: Natural language description of the task for the Salesforce agent.
     """
-    if AGENT_MODE == "a2a":
-        return _call_a2a_agent(
-            os.getenv("SALESFORCE_AGENT_URL", "http://localhost:8002"),
-            task
-        )
-    agent = _get_salesforce_agent()
-    result = agent(task)
-    return str(result)
+    return (await call_agent_async("salesforce", task)).view()
 
 
 # ── A2A Protocol Mode ───────────────────────────────────────────
-# Uses the A2A protocol for real network communication.
+# Uses the A2A protocol for real network communication. Each remote agent may
+# have several replicas; calls go through a circuit breaker per replica, are
+# hedged to a second replica when slower than the recent p95, and fail fast
+# with a degraded answer while every replica's breaker is open.
 
-def _call_a2a_agent(agent_url: str, task: str) -> str:
-    """Send a task to a remote A2A agent and return its response."""
-    import asyncio
+A2A_TIMEOUT_SECONDS = float(os.getenv("A2A_TIMEOUT_SECONDS", "60"))
+A2A_BREAKER_WINDOW = int(os.getenv("A2A_BREAKER_WINDOW", "20"))
+A2A_BREAKER_FAILURE_RATE = float(os.getenv("A2A_BREAKER_FAILURE_RATE", "0.5"))
+A2A_BREAKER_SLOW_SECONDS = float(os.getenv("A2A_BREAKER_SLOW_SECONDS", "20"))
+A2A_BREAKER_OPEN_SECONDS = float(os.getenv("A2A_BREAKER_OPEN_SECONDS", "30"))
+A2A_HEDGE_ENABLED = os.getenv("A2A_HEDGE_ENABLED", "true").lower() == "true"
+A2A_HEDGE_MIN_SECONDS = float(os.getenv("A2A_HEDGE_MIN_SECONDS", "1.0"))
+
+# Tasks that change records are never hedged, and only retried on another
+# replica when the request provably never reached the first one
+WRITE_TASK = re.compile(r"\b(correct|correction|submit|create|open|schedule|book|cancel|reprocess|update)",
+                        re.IGNORECASE)
+
+
+@cache
+def _endpoint_group(agent_name: str, urls: str) -> EndpointGroup:
+    return EndpointGroup(
+        agent_name,
+        [url.strip().rstrip("/") for url in urls.split(",") if url.strip()],
+        lambda name: CircuitBreaker(
+            name, window=A2A_BREAKER_WINDOW, failure_rate=A2A_BREAKER_FAILURE_RATE,
+            slow_call_seconds=A2A_BREAKER_SLOW_SECONDS, open_seconds=A2A_BREAKER_OPEN_SECONDS),
+        hedge=A2A_HEDGE_ENABLED,
+        hedge_min_seconds=A2A_HEDGE_MIN_SECONDS,
+    )
+
+
+def endpoint_groups() -> dict[str, EndpointGroup]:
+    return {name: _endpoint_group(name, urls()) for name, urls in AGENT_URLS.items()}
+
+
+metrics.register_provider("a2a_endpoints", lambda: {
+    name: group.stats() for name, group in endpoint_groups().items()
+} if AGENT_MODE == "a2a" else {})
+
+
+def _degraded_response(agent_name: str) -> SubAgentResult:
+    metrics.incr(f"resilience.degraded.{agent_name}")
+    trace_event("degraded", DISPLAY_NAMES[agent_name], "Agent unavailable",
+                "Circuit open on every endpoint; answering without it", "⚠️", "error",
+                {"agent": agent_name})
+    return SubAgentResult(
+        status="unavailable",
+        summary=(f"The {DISPLAY_NAMES[agent_name]} agent is temporarily unavailable. "
+                 "Do not guess at its data. Tell the patient this part of the request "
+                 "could not be completed right now and will need a follow-up."),
+    )
+
+
+def _never_sent(error: BaseException) -> bool:
+    import httpx
+    while error is not None:
+        if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout)):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+async def _call_remote_agent_async(agent_name: str, task: str) -> SubAgentResult:
+    group = _endpoint_group(agent_name, AGENT_URLS[agent_name]())
+    write = bool(WRITE_TASK.search(task))
+    try:
+        return await group.call(lambda endpoint: _call_a2a_agent_async(endpoint, task),
+                                hedge=not write, retry=_never_sent if write else lambda e: True)
+    except CircuitOpen:
+        return _degraded_response(agent_name)
+
+
+async def _call_a2a_agent_async(endpoint, task: str) -> SubAgentResult:
+    """Send a task to one replica of a remote A2A agent and return its result."""
     import httpx
     from uuid import uuid4
     from a2a.client import A2ACardResolver, ClientConfig, ClientFactory
     from a2a.types import Message, Part, Role, TextPart
 
-    async def _send():
-        async with httpx.AsyncClient(timeout=60) as httpx_client:
-            # Discover agent card
-            resolver = A2ACardResolver(
-                httpx_client=httpx_client,
-                base_url=agent_url
-            )
-            agent_card = await resolver.get_agent_card()
-
-            # Create client and send message
-            config = ClientConfig(httpx_client=httpx_client, streaming=False)
-            factory = ClientFactory(config)
-            client = factory.create(agent_card)
-
-            message = Message(
-                role=Role.user,
-                parts=[Part(root=TextPart(text=task))],
-                messageId=str(uuid4()),
-            )
-            response = await client.send_message(message=message)
-            return str(response)
-
-    # Run async in sync context (Strands tools are sync)
+    request_deadline = deadline.current_deadline.get()
+    timeout = (min(A2A_TIMEOUT_SECONDS, request_deadline.remaining()) if request_deadline
+               else A2A_TIMEOUT_SECONDS)
+    # The server bounds its own work by the caller's remaining budget
+    headers = {"X-Request-Timeout": f"{timeout:.3f}"}
+    async with httpx.AsyncClient(timeout=timeout, headers=headers) as httpx_client:
+        # Discover the agent card once per replica; requests go to the replica's
+        # own URL rather than whatever address the card advertises
+        agent_card = endpoint.cache.get("agent_card")
+        if agent_card is None:
+            resolver = A2ACardResolver(httpx_client=httpx_client, base_url=endpoint.url)
+            agent_card = (await resolver.get_agent_card()).model_copy(update={"url": endpoint.url + "/"})
+            endpoint.cache["agent_card"] = agent_card
+
+        # Create client and send message
+        config = ClientConfig(httpx_client=httpx_client, streaming=False)
+        factory = ClientFactory(config)
+        client = factory.create(agent_card)
+
+        message = Message(
+            role=Role.user,
+            parts=[Part(root=TextPart(text=task))],
+            messageId=str(uuid4()),
+        )
+        try:
+            response = await deadline.race(_send_message(client, message))
+        except deadline.RequestCancelled:
+            metrics.incr("cancellation.subagent_calls_aborted")
+            raise
+        except Exception:
+            endpoint.cache.pop("agent_card", None)  # rediscover after a failure
+            raise
+        return _response_result(response)
+
+
+async def _send_message(client, message):
+    """The final event of a (non-streaming) send: a Message or a (Task, update) pair."""
+    final = None
+    async for event in client.send_message(message):
+        final = event
+    return final
+
+
+def _response_result(response) -> SubAgentResult:
+    """The SubAgentResult of a Message or Task: its DataPart, else parsed from its text."""
+    from a2a.types import Message
+    from a2a.utils import get_data_parts, get_text_parts
+
+    if isinstance(response, Message):
+        parts = response.parts
+    elif isinstance(response, tuple):
+        task = response[0]
+        if task.artifacts:
+            parts = [part for artifact in task.artifacts for part in artifact.parts]
+        elif task.status.message is not None:
+            parts = task.status.message.parts
+        else:
+            parts = []
+    else:
+        return SubAgentResult.from_text(str(response))
+    for data in get_data_parts(parts):
+        try:
+            return SubAgentResult.model_validate(data)
+        except ValueError:
+            metrics.incr("contracts.invalid_data_part")
+    return SubAgentResult.from_text("\n".join(get_text_parts(parts)))
+
+
+def _call_a2a_agent(agent_name: str, task: str) -> SubAgentResult:
+    """Blocking wrapper around _call_remote_agent_async for sync callers."""
+    import asyncio
+
     try:
-        loop = asyncio.get_running_loop()
-        # If already in an async context, create a task
-        import concurrent.futures
-        with concurrent.futures.ThreadPoolExecutor() as pool:
-            result = loop.run_in_executor(pool, asyncio.run, _send())
-            return asyncio.ensure_future(result)
+        asyncio.get_running_loop()
     except RuntimeError:
         # No running loop — safe to use asyncio.run
-        return asyncio.run(_send())
+        return asyncio.run(_call_remote_agent_async(agent_name, task))
+    # Called from inside an event loop: run on a private loop in a worker thread
+    import concurrent.futures
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, _call_remote_agent_async(agent_name, task)).result()
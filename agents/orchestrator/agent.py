@@ -4,20 +4,24 @@ This agent owns the patient conversation. It has no direct data access.
 It relies entirely on the ServiceNow and Salesforce agents via tools.
 """
 
-from strands import Agent
-from strands.models.bedrock import BedrockModel
+import threading
+from typing import TYPE_CHECKING
 
-from shared.config import BEDROCK_MODEL_ID, AWS_REGION
+from shared.config import ORCHESTRATOR_MODEL_TIER
+from shared.bedrock import create_bedrock_model
+from shared.model_router import MODEL_TIERS
 from agents.orchestrator.prompts import ORCHESTRATOR_SYSTEM_PROMPT
 from agents.orchestrator.a2a_tools import servicenow_agent_tool, salesforce_agent_tool
 
+if TYPE_CHECKING:
+    from strands import Agent
 
-def create_orchestrator_agent() -> Agent:
+
+def create_orchestrator_agent() -> "Agent":
     """Create and return the Orchestrator Strands Agent."""
-    model = BedrockModel(
-        model_id=BEDROCK_MODEL_ID,
-        region_name=AWS_REGION,
-    )
+    from strands import Agent, tool
+
+    model = create_bedrock_model(MODEL_TIERS[ORCHESTRATOR_MODEL_TIER])
     return Agent(
         name="MidAtlantic Health Virtual Assistant",
         description=(
@@ -27,8 +31,25 @@ def create_orchestrator_agent() -> Agent:
         ),
         model=model,
         system_prompt=ORCHESTRATOR_SYSTEM_PROMPT,
-        tools=[servicenow_agent_tool, salesforce_agent_tool],
+        tools=[tool(servicenow_agent_tool), tool(salesforce_agent_tool)],
     )
 
 
-orchestrator_agent = create_orchestrator_agent()
+_agent: "Agent | None" = None
+_agent_lock = threading.Lock()
+
+
+def get_orchestrator_agent() -> "Agent":
+    """Shared instance, built on first use rather than on import."""
+    global _agent
+    if _agent is None:
+        with _agent_lock:
+            if _agent is None:
+                _agent = create_orchestrator_agent()
+    return _agent
+
+
+def __getattr__(name: str):
+    if name == "orchestrator_agent":
+        return get_orchestrator_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,16 +1,16 @@
 """AgentCore Runtime entrypoint for the Orchestrator Agent."""
 
 from bedrock_agentcore.runtime import BedrockAgentCoreApp
-from agents.orchestrator.agent import orchestrator_agent
+from agents.orchestrator.agent import create_orchestrator_agent
+from shared.agent_runtime import AgentRuntime
 
 app = BedrockAgentCoreApp()
+runtime = AgentRuntime(create_orchestrator_agent)
 
 
 @app.entrypoint
-def invoke(input_data: dict) -> dict:
-    user_message = input_data.get("input", {}).get("text", "")
-    result = orchestrator_agent(user_message)
-    return {"output": {"text": str(result)}}
+def invoke(input_data: dict, context=None):
+    return runtime.handle(input_data, context)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,137 @@
+"""Speculative prefetch of likely sub-agent lookups.
+
+A billing-dispute message that names a patient almost always leads the
+orchestrator to ask for that patient's billing analysis and insurance
+coverage. Instead of waiting seconds for the orchestrator's first model call
+to decide that, the speculator starts both sub-agent calls as soon as the
+message is parsed. When the model does ask, the tool wrapper takes the
+in-flight (or finished) result instead of starting a new call; whatever is
+never asked for is cancelled when the turn ends.
+
+Saved time is the head start a consumed speculation had when the model asked
+for it. Wasted time is the runtime of speculations nobody consumed.
+"""
+
+import asyncio
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+from shared import metrics
+from shared.contracts import SubAgentResult
+
+PATIENT_ID = re.compile(r"PAT-\d+")
+BILLING_MESSAGE = re.compile(r"\b(bill|billed|billing|charge|charged)\b", re.IGNORECASE)
+WRITE_REQUEST = re.compile(r"\b(fix|correct|correction|dispute it|go ahead)\b", re.IGNORECASE)
+
+SERVICENOW_BILLING = re.compile(r"\bbill", re.IGNORECASE)
+SERVICENOW_WRITE = re.compile(r"\b(correct|fix|submit|ticket|appointment|schedule)", re.IGNORECASE)
+SALESFORCE_INSURANCE = re.compile(r"\b(insurance|coverage)\b", re.IGNORECASE)
+SALESFORCE_WRITE = re.compile(r"\b(case|create)\b", re.IGNORECASE)
+
+Key = tuple[str, str, str]  # (agent, intent, patient_id)
+
+
+def classify(agent: str, task: str) -> Key | None:
+    """Map a sub-agent task to a speculation key, if it is a prefetchable read."""
+    patient = PATIENT_ID.search(task)
+    if not patient:
+        return None
+    if agent == "servicenow" and SERVICENOW_BILLING.search(task) and not SERVICENOW_WRITE.search(task):
+        return (agent, "billing_lookup", patient.group())
+    if agent == "salesforce" and SALESFORCE_INSURANCE.search(task) and not SALESFORCE_WRITE.search(task):
+        return (agent, "insurance_verify", patient.group())
+    return None
+
+
+def plan(message: str) -> list[tuple[Key, str]]:
+    """Sub-agent calls worth starting before the orchestrator decides."""
+    patient = PATIENT_ID.search(message)
+    if not patient or not BILLING_MESSAGE.search(message) or WRITE_REQUEST.search(message):
+        return []
+    pid = patient.group()
+    return [
+        (("servicenow", "billing_lookup", pid),
+         f"Look up billing records for patient {pid} and identify any errors or discrepancies."),
+        (("salesforce", "insurance_verify", pid),
+         f"Verify insurance coverage for patient {pid}: confirm active coverage, deductible "
+         "status, and expected patient responsibility."),
+    ]
+
+
+@dataclass
+class _Speculation:
+    task: asyncio.Task
+    started: float
+    finished: float | None = None
+
+
+@dataclass
+class Speculator:
+    """Speculative sub-agent calls for one orchestrator turn."""
+
+    runner: Callable[[str, str], Awaitable[SubAgentResult]]
+    _pending: dict[Key, _Speculation] = field(default_factory=dict)
+    started: int = 0
+    used: int = 0
+    cancelled: int = 0
+    saved_seconds: float = 0.0
+    wasted_seconds: float = 0.0
+
+    def start(self, message: str) -> list[Key]:
+        """Launch the planned prefetches for a message; returns their keys."""
+        keys = []
+        for key, task in plan(message):
+            if key in self._pending:
+                continue
+            spec = _Speculation(asyncio.create_task(self.runner(key[0], task)), time.perf_counter())
+            spec.task.add_done_callback(lambda _, s=spec: setattr(s, "finished", time.perf_counter()))
+            self._pending[key] = spec
+            self.started += 1
+            keys.append(key)
+        metrics.incr("speculation.started", len(keys))
+        return keys
+
+    async def take(self, agent: str, task: str) -> SubAgentResult | None:
+        """Result of a matching speculation, or None if the caller must run it."""
+        key = classify(agent, task)
+        spec = self._pending.pop(key, None) if key else None
+        if spec is None:
+            return None
+        asked = time.perf_counter()
+        try:
+            result = await spec.task
+        except Exception:
+            # A failed speculation costs nothing extra: fall back to a real call
+            self.wasted_seconds += (spec.finished or asked) - spec.started
+            return None
+        self.used += 1
+        self.saved_seconds += min(asked, spec.finished or asked) - spec.started
+        metrics.incr("speculation.used")
+        return result
+
+    async def finish(self) -> dict:
+        """Cancel unconsumed speculations and return the turn's accounting."""
+        now = time.perf_counter()
+        for spec in self._pending.values():
+            if not spec.task.done():
+                spec.task.cancel()
+            self.cancelled += 1
+            self.wasted_seconds += (spec.finished or now) - spec.started
+        if self._pending:
+            await asyncio.gather(*(s.task for s in self._pending.values()), return_exceptions=True)
+        self._pending.clear()
+        metrics.incr("speculation.cancelled", self.cancelled)
+        metrics.incr("speculation.saved_seconds", self.saved_seconds)
+        metrics.incr("speculation.wasted_seconds", self.wasted_seconds)
+        return self.summary()
+
+    def summary(self) -> dict:
+        return {
+            "started": self.started,
+            "used": self.used,
+            "cancelled": self.cancelled,
+            "saved_seconds": round(self.saved_seconds, 3),
+            "wasted_seconds": round(self.wasted_seconds, 3),
+        }
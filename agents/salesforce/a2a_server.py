@@ -1,14 +1,20 @@
-"""A2A Server for the Salesforce Agent."""
+"""A2A Server for the Salesforce Agent (see agents/servicenow/a2a_server.py)."""
 
-from strands.multiagent.a2a import A2AServer
-from agents.salesforce.agent import salesforce_agent
+import os
+
+from shared.a2a_serving import create_a2a_app, serve
+
+PORT = 8002
+
+
+def create_app():
+    """ASGI app factory, called once in each worker process."""
+    from agents.salesforce.agent import create_salesforce_agent
+    from shared.contracts import SubAgentResult
+    return create_a2a_app(create_salesforce_agent,
+                          os.getenv("A2A_PUBLIC_URL", f"http://localhost:{PORT}"),
+                          output_model=SubAgentResult)
 
-a2a_server = A2AServer(
-    agent=salesforce_agent,
-    host="0.0.0.0",
-    port=8002,
-)
 
 if __name__ == "__main__":
-    print("Starting Salesforce A2A Server on port 8002...")
-    a2a_server.serve()
+    serve("agents.salesforce.a2a_server:create_app", PORT, "Salesforce")
@@ -1,31 +1,44 @@
 """Salesforce Health Cloud Agent — Strands Agent with domain tools."""
 
 import json
+import threading
 import uuid
-from pathlib import Path
+from functools import cache
+from typing import TYPE_CHECKING
+
+from shared.config import SALESFORCE_DATA_PATH
+from shared.bedrock import create_bedrock_model
+from shared.idempotency import dedupe_write, write_key
+from shared.model_router import MODEL_TIERS
+from shared.mock_data import load_mock_data
+from shared.record_store import RecordStore, open_record_store
+from agents.salesforce.prompts import SALESFORCE_SYSTEM_PROMPT
 
-from strands import Agent, tool
-from strands.models.bedrock import BedrockModel
+if TYPE_CHECKING:
+    from strands import Agent
 
-from shared.config import BEDROCK_MODEL_ID, AWS_REGION, SALESFORCE_DATA_PATH
-from agents.salesforce.prompts import SALESFORCE_SYSTEM_PROMPT
+# ── Mock data (loaded on first tool call) ───────────────────────
+
+def _mock_data() -> dict:
+    return load_mock_data(SALESFORCE_DATA_PATH)
 
-# ── Load mock data ──────────────────────────────────────────────
 
-with open(SALESFORCE_DATA_PATH) as f:
-    MOCK_DATA = json.load(f)
+# ── Created records (persisted; see shared.record_store) ────────
+
+def _records() -> RecordStore:
+    return open_record_store("salesforce")
 
 
 # ── Domain Tools ────────────────────────────────────────────────
+# Plain async functions, wrapped with strands' @tool when the agent is built.
 
-@tool
-def patient_lookup(patient_id: str) -> str:
+async def patient_lookup(patient_id: str) -> str:
     """Retrieve patient demographic information, contact details, and preferences.
 
     Args:
         patient_id: Patient identifier (e.g., PAT-2847).
     """
-    patient = MOCK_DATA["patients"].get(patient_id)
+    patient = _mock_data()["patients"].get(patient_id)
     if not patient:
         return json.dumps({
             "status": "error",
@@ -38,8 +51,7 @@ def patient_lookup(patient_id: str) -> str:
     })
 
 
-@tool
-def insurance_verify(patient_id: str, policy_number: str = "") -> str:
+async def insurance_verify(patient_id: str, policy_number: str = "") -> str:
     """Verify patient insurance coverage.
 
     Confirm active coverage, calculate expected patient responsibility,
@@ -49,7 +61,7 @@ def insurance_verify(patient_id: str, policy_number: str = "") -> str:
         patient_id: Patient identifier.
         policy_number: Optional policy number for specific lookup.
     """
-    insurance = MOCK_DATA["insurance"].get(patient_id)
+    insurance = _mock_data()["insurance"].get(patient_id)
     if not insurance:
         return json.dumps({
             "status": "error",
@@ -68,8 +80,7 @@ def insurance_verify(patient_id: str, policy_number: str = "") -> str:
     })
 
 
-@tool
-def care_history(patient_id: str, date_range_start: str = "",
+async def care_history(patient_id: str, date_range_start: str = "",
                  date_range_end: str = "") -> str:
     """Retrieve patient care history including visits, procedures, and diagnoses.
 
@@ -78,7 +89,7 @@ def care_history(patient_id: str, date_range_start: str = "",
         date_range_start: Optional start date filter (YYYY-MM-DD).
         date_range_end: Optional end date filter (YYYY-MM-DD).
     """
-    history = MOCK_DATA["care_history"].get(patient_id, [])
+    history = _mock_data()["care_history"].get(patient_id, [])
     return json.dumps({
         "status": "found" if history else "empty",
         "care_records": history,
@@ -90,31 +101,48 @@ def care_history(patient_id: str, date_range_start: str = "",
     })
 
 
-@tool
-def case_create(patient_id: str, case_type: str, subject: str,
-                description: str = "") -> str:
+async def case_create(patient_id: str, case_type: str, subject: str,
+                description: str = "", idempotency_key: str = "") -> str:
     """Create a patient case for tracking issue resolution.
 
+    Repeating a case of the same type for the same patient returns the
+    existing case ID.
+
     Args:
         patient_id: Patient identifier.
         case_type: Case type (e.g., billing_dispute, appointment_issue, general).
         subject: Brief subject line for the case.
         description: Detailed description of the issue.
+        idempotency_key: Optional caller key; reuse it when retrying the same request.
     """
-    patient = MOCK_DATA["patients"].get(patient_id, {})
-    existing_cases = MOCK_DATA["cases"].get(patient_id, [])
+    records = _records()
+    key = write_key("case_create", patient_id, case_type, client_key=idempotency_key)
+    existing_cases = _mock_data()["cases"].get(patient_id, []) + records.by_patient("cases", patient_id)
     case_id = f"CASE-{uuid.uuid4().hex[:6].upper()}"
+    new_case = {
+        "case_id": case_id,
+        "patient_id": patient_id,
+        "case_type": case_type,
+        "subject": subject,
+        "description": description
+    }
+    case_id, duplicate = await dedupe_write(records, "cases", case_id, {**new_case, "status": "open"},
+                                            key, "Salesforce", "case")
+    if duplicate:
+        return json.dumps({
+            "status": "duplicate",
+            "case_id": case_id,
+            "instruction": (
+                f"A {case_type} case for this patient already exists ({case_id}). "
+                "Do not create another; confirm the existing case to the user."
+            )
+        })
+    patient = _mock_data()["patients"].get(patient_id, {})
     return json.dumps({
         "status": "ready",
         "patient_context": patient,
         "existing_cases": existing_cases,
-        "new_case": {
-            "case_id": case_id,
-            "patient_id": patient_id,
-            "case_type": case_type,
-            "subject": subject,
-            "description": description
-        },
+        "new_case": new_case,
         "instruction": (
             f"Create patient case {case_id}. Assign to the appropriate team "
             "based on case type (billing_dispute → Billing Resolution Team, "
@@ -125,14 +153,27 @@ def case_create(patient_id: str, case_type: str, subject: str,
     })
 
 
+TOOLS = (patient_lookup, insurance_verify, care_history, case_create)
+
+
+@cache
+def _strands_tools() -> list:
+    from strands import tool
+    return [tool(f) for f in TOOLS]
+
+
 # ── Agent Definition ────────────────────────────────────────────
 
-def create_salesforce_agent() -> Agent:
-    """Create and return the Salesforce Strands Agent."""
-    model = BedrockModel(
-        model_id=BEDROCK_MODEL_ID,
-        region_name=AWS_REGION,
-    )
+def create_salesforce_agent(tier: str = "large", memory: str | None = None) -> "Agent":
+    """Create and return the Salesforce Strands Agent on the given model tier.
+
+    ``memory`` is the conversation memory policy (see shared.agent_memory);
+    SUBAGENT_MEMORY when not given.
+    """
+    from strands import Agent
+    from shared.agent_memory import subagent_memory
+
+    model = create_bedrock_model(MODEL_TIERS[tier])
     return Agent(
         name="Salesforce Health Cloud Agent",
         description=(
@@ -142,9 +183,27 @@ def create_salesforce_agent() -> Agent:
         ),
         model=model,
         system_prompt=SALESFORCE_SYSTEM_PROMPT,
-        tools=[patient_lookup, insurance_verify, care_history, case_create],
+        tools=_strands_tools(),
+        conversation_manager=subagent_memory("salesforce", memory),
         callback_handler=None,
     )
 
 
-salesforce_agent = create_salesforce_agent()
+_agent: "Agent | None" = None
+_agent_lock = threading.Lock()
+
+
+def get_salesforce_agent() -> "Agent":
+    """Shared instance, built on first use rather than on import."""
+    global _agent
+    if _agent is None:
+        with _agent_lock:
+            if _agent is None:
+                _agent = create_salesforce_agent()
+    return _agent
+
+
+def __getattr__(name: str):
+    if name == "salesforce_agent":
+        return get_salesforce_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,16 +1,17 @@
 """AgentCore Runtime entrypoint for the Salesforce Agent."""
 
 from bedrock_agentcore.runtime import BedrockAgentCoreApp
-from agents.salesforce.agent import salesforce_agent
+from agents.salesforce.agent import create_salesforce_agent
+from shared.agent_runtime import AgentRuntime
 
 app = BedrockAgentCoreApp()
+runtime = AgentRuntime(create_salesforce_agent,
+                       session_factory=lambda: create_salesforce_agent(memory="session"))
 
 
 @app.entrypoint
-def invoke(input_data: dict) -> dict:
-    user_message = input_data.get("input", {}).get("text", "")
-    result = salesforce_agent(user_message)
-    return {"output": {"text": str(result)}}
+def invoke(input_data: dict, context=None):
+    return runtime.handle(input_data, context)
 
 
 if __name__ == "__main__":
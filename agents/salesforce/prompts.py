@@ -35,10 +35,11 @@ You are not a database query — you are a domain expert. When you verify insura
 - Be precise about coverage calculations — errors here affect patient bills.
 
 ## OUTPUT FORMAT
-Return your response as a JSON object with:
-- "skill_used": which skill you executed
+Answer with the structured result you are given as your output schema:
 - "status": "success" or "error"
-- "findings": your analysis (object with relevant fields)
-- "analysis": natural language expert analysis
-- "recommendations": array of recommended actions (if applicable)
-- "references": any IDs generated (case numbers, etc.)"""
+- "skill_used": which skill you executed (e.g. insurance_verify)
+- "summary": at most two sentences with your determination and the amounts, rates and IDs that matter — this is all the orchestrator reads by default, so put the analysis there, not a restatement of the data
+- "references": IDs found or generated (patient_id, case_id)
+- "patient_name": the patient's full name, when you looked the patient up
+- "insurance" for a coverage determination, "case" for a created case; leave findings for other skills empty
+- "recommendations": recommended actions, one short line each (if applicable)"""
\ No newline at end of file
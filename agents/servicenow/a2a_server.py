@@ -1,19 +1,27 @@
 """A2A Server for the ServiceNow Agent.
 
-Run this to expose the ServiceNow agent as an A2A-compatible server.
-Strands auto-generates the Agent Card from the agent's name, description,
-and tools — no manual agent_card.json needed.
+Run this to expose the ServiceNow agent as an A2A-compatible server. Each of
+the A2A_SERVER_WORKERS worker processes serves requests from its own pool of
+agents (see shared.a2a_serving), and all of them share the agent's record
+store (shared.record_store). The Agent Card is generated from the agent's
+name, description and tools — no manual agent_card.json needed.
 """
 
-from strands.multiagent.a2a import A2AServer
-from agents.servicenow.agent import servicenow_agent
+import os
+
+from shared.a2a_serving import create_a2a_app, serve
+
+PORT = 8001
+
+
+def create_app():
+    """ASGI app factory, called once in each worker process."""
+    from agents.servicenow.agent import create_servicenow_agent
+    from shared.contracts import SubAgentResult
+    return create_a2a_app(create_servicenow_agent,
+                          os.getenv("A2A_PUBLIC_URL", f"http://localhost:{PORT}"),
+                          output_model=SubAgentResult)
 
-a2a_server = A2AServer(
-    agent=servicenow_agent,
-    host="0.0.0.0",
-    port=8001,
-)
 
 if __name__ == "__main__":
-    print("Starting ServiceNow A2A Server on port 8001...")
-    a2a_server.serve()
+    serve("agents.servicenow.a2a_server:create_app", PORT, "ServiceNow")
@@ -5,28 +5,52 @@ Data is injected into tool responses, not into the system prompt.
 """
 
 import json
+import threading
 import uuid
-from pathlib import Path
+from functools import cache
+from typing import TYPE_CHECKING
 
-from strands import Agent, tool
-from strands.models.bedrock import BedrockModel
-
-from shared.config import BEDROCK_MODEL_ID, AWS_REGION, SERVICENOW_DATA_PATH
+from shared.config import SERVICENOW_DATA_PATH
+from shared.bedrock import create_bedrock_model
+from shared.idempotency import dedupe_write, write_key
+from shared.model_router import MODEL_TIERS
+from shared.mock_data import load_mock_data
+from shared.record_store import RecordStore, open_record_store
 from agents.servicenow.prompts import SERVICENOW_SYSTEM_PROMPT
 
-# ── Load mock data ──────────────────────────────────────────────
+if TYPE_CHECKING:
+    from strands import Agent
+
+    from shared.billing_scan import BillingScan
+
+# ── Mock data (loaded on first tool call) ───────────────────────
+
+def _mock_data() -> dict:
+    return load_mock_data(SERVICENOW_DATA_PATH)
+
+
+@cache
+def _billing_scan() -> "BillingScan":
+    """Rule findings for every mock bill (see shared.billing_scan), scanned once."""
+    from shared.billing_scan import BillingScan  # NumPy loads on the first billing lookup
+    return BillingScan.from_bills(b for bills in _mock_data()["bills"].values() for b in bills)
+
+
+# ── Created records (persisted; see shared.record_store) ────────
 
-with open(SERVICENOW_DATA_PATH) as f:
-    MOCK_DATA = json.load(f)
+def _records() -> RecordStore:
+    return open_record_store("servicenow")
 
 
 # ── Domain Tools ────────────────────────────────────────────────
 # Each tool returns raw data + an instruction for the agent to analyze.
 # The agent's system prompt tells it to reason about the data, not just
 # return it. This is what makes it "agentic" vs. a deterministic handler.
+# Tools are async so they run on the agent's event loop, not a worker thread.
+# They are plain functions here and wrapped with strands' @tool when the first
+# agent is built, so importing this module does not import strands.
 
-@tool
-def billing_lookup(patient_id: str) -> str:
+async def billing_lookup(patient_id: str) -> str:
     """Retrieve and analyze billing records for a patient account.
 
     Look up charges, identify any billing errors or discrepancies,
@@ -35,7 +59,7 @@ def billing_lookup(patient_id: str) -> str:
     Args:
         patient_id: Patient identifier (e.g., PAT-2847).
     """
-    records = MOCK_DATA["bills"].get(patient_id, [])
+    records = _mock_data()["bills"].get(patient_id, [])
     if not records:
         return json.dumps({
             "status": "error",
@@ -46,23 +70,26 @@ def billing_lookup(patient_id: str) -> str:
     return json.dumps({
         "status": "found",
         "billing_records": records,
+        "anomaly_findings": _billing_scan().for_patient(patient_id),
+        "submitted_corrections": _records().by_patient("corrections", patient_id),
         "instruction": (
-            "Analyze these billing records thoroughly. For each record: "
-            "identify the root cause of any errors, explain WHY the error occurred "
-            "using specific procedure codes and modifiers, calculate the expected "
-            "corrected amount, and recommend specific corrective actions. "
-            "Return your analysis as a structured JSON artifact."
+            "Analyze these billing records thoroughly. The anomaly_findings are "
+            "the errors rule checks already found in each record, with the "
+            "expected patient responsibility and any overcharge; do not re-derive "
+            "them. For each finding: explain WHY the error occurred using the "
+            "specific procedure codes and modifiers, and recommend specific corrective actions. "
+            "Report each record in the billing findings of your structured result."
         )
     })
 
 
-@tool
-def billing_correct(patient_id: str, bill_id: str, correction_type: str,
-                    details: str = "") -> str:
+async def billing_correct(patient_id: str, bill_id: str, correction_type: str,
+                    details: str = "", idempotency_key: str = "") -> str:
     """Submit a billing correction.
 
     Process the correction, generate a reference ID, and provide
-    expected resolution timeline.
+    expected resolution timeline. Repeating a correction for the same bill and
+    correction type returns the existing correction ID.
 
     Args:
         patient_id: Patient identifier.
@@ -70,15 +97,37 @@ def billing_correct(patient_id: str, bill_id: str, correction_type: str,
         correction_type: Type of correction — one of: procedure_code,
             insurance_reprocess, charge_dispute.
         details: Additional correction details.
+        idempotency_key: Optional caller key; reuse it when retrying the same request.
     """
-    bills = MOCK_DATA["bills"].get(patient_id, [])
+    bills = _mock_data()["bills"].get(patient_id, [])
     bill = next((b for b in bills if b["bill_id"] == bill_id), None)
     if not bill:
         return json.dumps({
             "status": "error",
             "instruction": f"Bill {bill_id} not found for patient {patient_id}."
         })
+    key = write_key("billing_correct", patient_id, bill_id, correction_type,
+                    client_key=idempotency_key)
     correction_id = f"CORR-{uuid.uuid4().hex[:6].upper()}"
+    correction = {
+        "correction_id": correction_id,
+        "patient_id": patient_id,
+        "bill_id": bill_id,
+        "correction_type": correction_type,
+        "details": details,
+        "status": "submitted",
+    }
+    correction_id, duplicate = await dedupe_write(_records(), "corrections", correction_id, correction,
+                                                  key, "ServiceNow", "billing correction")
+    if duplicate:
+        return json.dumps({
+            "status": "duplicate",
+            "correction_id": correction_id,
+            "instruction": (
+                f"This correction was already submitted as {correction_id}. Do not "
+                "submit it again; confirm the existing correction ID to the user."
+            )
+        })
     return json.dumps({
         "status": "ready",
         "bill_to_correct": bill,
@@ -89,17 +138,19 @@ def billing_correct(patient_id: str, bill_id: str, correction_type: str,
             f"Process this billing correction. The correction ID is {correction_id}. "
             "Determine the corrected amount, expected timeline (typically 24-48 hours "
             "for code corrections, 5-7 business days for insurance reprocessing), "
-            "and confirm what actions will be taken. Return as structured JSON."
+            "and confirm what actions will be taken in the correction findings."
         )
     })
 
 
-@tool
-def ticket_create(patient_id: str, category: str, summary: str,
-                  priority: str = "medium", details: str = "") -> str:
+async def ticket_create(patient_id: str, category: str, summary: str,
+                  priority: str = "medium", details: str = "",
+                  idempotency_key: str = "") -> str:
     """Create a tracked service ticket.
 
     Assign priority, route to the appropriate team, and set SLA expectations.
+    Repeating a ticket for the same patient and category returns the existing
+    ticket ID.
 
     Args:
         patient_id: Patient identifier.
@@ -107,31 +158,45 @@ def ticket_create(patient_id: str, category: str, summary: str,
         summary: Brief summary of the issue.
         priority: Priority level — one of: low, medium, high, critical.
         details: Additional details.
+        idempotency_key: Optional caller key; reuse it when retrying the same request.
     """
-    existing = MOCK_DATA["tickets"].get(patient_id, [])
+    records = _records()
+    key = write_key("ticket_create", patient_id, category, client_key=idempotency_key)
+    existing = _mock_data()["tickets"].get(patient_id, []) + records.by_patient("tickets", patient_id)
     ticket_id = f"TKT-{uuid.uuid4().hex[:6].upper()}"
+    new_ticket = {
+        "ticket_id": ticket_id,
+        "patient_id": patient_id,
+        "category": category,
+        "summary": summary,
+        "priority": priority,
+        "details": details
+    }
+    ticket_id, duplicate = await dedupe_write(records, "tickets", ticket_id, {**new_ticket, "status": "open"},
+                                              key, "ServiceNow", "ticket")
+    if duplicate:
+        return json.dumps({
+            "status": "duplicate",
+            "ticket_id": ticket_id,
+            "instruction": (
+                f"A {category} ticket for this patient already exists ({ticket_id}). "
+                "Do not create another; confirm the existing ticket to the user."
+            )
+        })
     return json.dumps({
         "status": "ready",
         "existing_tickets": existing,
-        "new_ticket": {
-            "ticket_id": ticket_id,
-            "patient_id": patient_id,
-            "category": category,
-            "summary": summary,
-            "priority": priority,
-            "details": details
-        },
+        "new_ticket": new_ticket,
         "instruction": (
             f"Create this service ticket (ID: {ticket_id}). Check for duplicate "
             "tickets first. Assign to the appropriate team based on category. "
             "Set SLA based on priority (critical: 4hr, high: 8hr, medium: 24hr, "
-            "low: 48hr). Return confirmation as structured JSON."
+            "low: 48hr). Return the ticket ID in your references."
         )
     })
 
 
-@tool
-def appointment_schedule(patient_id: str, department: str, reason: str,
+async def appointment_schedule(patient_id: str, department: str, reason: str,
                          preferred_date: str = "", facility: str = "") -> str:
     """Schedule a patient appointment.
 
@@ -144,7 +209,7 @@ def appointment_schedule(patient_id: str, department: str, reason: str,
         preferred_date: Preferred date (optional, format: YYYY-MM-DD).
         facility: Preferred facility (optional).
     """
-    slots = MOCK_DATA["appointments"]["available_slots"]
+    slots = _mock_data()["appointments"]["available_slots"]
     return json.dumps({
         "status": "ready",
         "available_slots": slots,
@@ -163,14 +228,27 @@ def appointment_schedule(patient_id: str, department: str, reason: str,
     })
 
 
+TOOLS = (billing_lookup, billing_correct, ticket_create, appointment_schedule)
+
+
+@cache
+def _strands_tools() -> list:
+    from strands import tool
+    return [tool(f) for f in TOOLS]
+
+
 # ── Agent Definition ────────────────────────────────────────────
 
-def create_servicenow_agent() -> Agent:
-    """Create and return the ServiceNow Strands Agent."""
-    model = BedrockModel(
-        model_id=BEDROCK_MODEL_ID,
-        region_name=AWS_REGION,
-    )
+def create_servicenow_agent(tier: str = "large", memory: str | None = None) -> "Agent":
+    """Create and return the ServiceNow Strands Agent on the given model tier.
+
+    ``memory`` is the conversation memory policy (see shared.agent_memory);
+    SUBAGENT_MEMORY when not given.
+    """
+    from strands import Agent
+    from shared.agent_memory import subagent_memory
+
+    model = create_bedrock_model(MODEL_TIERS[tier])
     return Agent(
         name="ServiceNow AI Agent",
         description=(
@@ -181,10 +259,28 @@ def create_servicenow_agent() -> Agent:
         ),
         model=model,
         system_prompt=SERVICENOW_SYSTEM_PROMPT,
-        tools=[billing_lookup, billing_correct, ticket_create, appointment_schedule],
+        tools=_strands_tools(),
+        conversation_manager=subagent_memory("servicenow", memory),
         callback_handler=None,  # No streaming for A2A server responses
     )
 
 
-# Module-level agent instance (created on import)
-servicenow_agent = create_servicenow_agent()
+# Shared module-level instance, built on first use rather than on import.
+# `from agents.servicenow.agent import servicenow_agent` still works.
+_agent: "Agent | None" = None
+_agent_lock = threading.Lock()
+
+
+def get_servicenow_agent() -> "Agent":
+    global _agent
+    if _agent is None:
+        with _agent_lock:
+            if _agent is None:
+                _agent = create_servicenow_agent()
+    return _agent
+
+
+def __getattr__(name: str):
+    if name == "servicenow_agent":
+        return get_servicenow_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
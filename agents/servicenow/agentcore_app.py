@@ -2,20 +2,23 @@
 
 This file is the entrypoint specified during `agentcore configure`.
 AgentCore Runtime calls the decorated function for each invocation.
+Invocations carrying a session id reuse that session's agent; stateless
+calls lease a warm agent, so one container can serve parallel sessions.
 """
 
 from bedrock_agentcore.runtime import BedrockAgentCoreApp
-from agents.servicenow.agent import servicenow_agent
+from agents.servicenow.agent import create_servicenow_agent
+from shared.agent_runtime import AgentRuntime
 
 app = BedrockAgentCoreApp()
+runtime = AgentRuntime(create_servicenow_agent,
+                       session_factory=lambda: create_servicenow_agent(memory="session"))
 
 
 @app.entrypoint
-def invoke(input_data: dict) -> dict:
+def invoke(input_data: dict, context=None):
     """AgentCore Runtime invocation handler."""
-    user_message = input_data.get("input", {}).get("text", "")
-    result = servicenow_agent(user_message)
-    return {"output": {"text": str(result)}}
+    return runtime.handle(input_data, context)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,49 @@
+"""Explicit warm-up for processes that should not pay lazy costs on first use.
+
+Agent modules build nothing on import. Call warm_up() at startup to move that
+work out of the first request:
+
+- ``warm_up()`` imports strands/boto3 and parses the mock data. This is
+  fork-safe, so a pre-fork server (``gunicorn --preload``) can run it in the
+  master and let workers share the loaded modules and data copy-on-write.
+- ``warm_up(build_agents=True)`` also builds the shared agent instances. Do
+  this in each worker: boto3 clients must not be created before a fork.
+"""
+
+import gc
+import time
+
+
+def warm_up(build_agents: bool = False, freeze: bool = False) -> dict:
+    """Pre-load heavy modules and data; return the seconds spent per step."""
+    timings = {}
+
+    start = time.perf_counter()
+    import strands  # noqa: F401
+    import strands.models.bedrock  # noqa: F401
+    timings["imports"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    from shared.config import SERVICENOW_DATA_PATH, SALESFORCE_DATA_PATH
+    from shared.mock_data import load_mock_data
+    load_mock_data(SERVICENOW_DATA_PATH)
+    load_mock_data(SALESFORCE_DATA_PATH)
+    timings["mock_data"] = time.perf_counter() - start
+
+    if build_agents:
+        start = time.perf_counter()
+        from agents.servicenow.agent import get_servicenow_agent
+        from agents.salesforce.agent import get_salesforce_agent
+        from agents.orchestrator.agent import get_orchestrator_agent
+        get_servicenow_agent()
+        get_salesforce_agent()
+        get_orchestrator_agent()
+        timings["agents"] = time.perf_counter() - start
+
+    if freeze:
+        # Move everything loaded so far out of the GC's generations so that
+        # collections in forked workers don't touch (and copy) shared pages.
+        gc.collect()
+        gc.freeze()
+
+    return {k: round(v, 4) for k, v in timings.items()}
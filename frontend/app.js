@@ -108,35 +108,38 @@ async function send() {
     metricsSection.style.display = 'none';
     activateAgent('orch');
 
+    // The turn runs server-side as a resumable run: if the connection drops,
+    // reattach from the last event seen instead of resending the message
+    const stream = { runId: null, lastEventId: 0, finished: false };
     try {
         const res = await fetch('/api/chat/stream', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ message: msg, session_id: sessionId })
         });
+        stream.runId = res.headers.get('X-Run-ID');
+        await readStream(res, stream);
+    } catch (err) {
+        console.warn('Stream interrupted', err);
+    }
 
-        const reader = res.body.getReader();
-        const decoder = new TextDecoder();
-        let buffer = '';
-
-        while (true) {
-            const { done, value } = await reader.read();
-            if (done) break;
-
-            buffer += decoder.decode(value, { stream: true });
-            const lines = buffer.split('\n');
-            buffer = lines.pop() || '';
-
-            for (const line of lines) {
-                if (line.startsWith('data: ')) {
-                    try {
-                        handleSSE(JSON.parse(line.slice(6)));
-                    } catch {}
-                }
-            }
+    for (let attempt = 0; !stream.finished && stream.runId && attempt < 5; attempt++) {
+        setStatus('Reconnecting', true);
+        await new Promise(r => setTimeout(r, 500 * 2 ** attempt));
+        try {
+            const res = await fetch(`/api/runs/${stream.runId}/stream`, {
+                headers: { 'Last-Event-ID': String(stream.lastEventId) }
+            });
+            if (res.status === 404) break;  // run expired
+            if (!res.ok) continue;
+            attempt = -1;  // reattached: back off from scratch if it drops again
+            await readStream(res, stream);
+        } catch (err) {
+            console.warn('Reconnect failed', err);
         }
-    } catch (err) {
-        console.error(err);
+    }
+
+    if (!stream.finished) {
         hideTyping();
         addMsg('Sorry, something went wrong. Please try again.', 'assistant');
         setStatus('Error', false);
@@ -147,6 +150,38 @@ async function send() {
     sendBtn.disabled = !msgInput.value.trim();
 }
 
+async function readStream(res, stream) {
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let eventId = null;
+
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop() || '';
+
+        for (const line of lines) {
+            if (line.startsWith('id: ')) {
+                eventId = Number(line.slice(4));
+            } else if (line.startsWith('data: ')) {
+                try {
+                    const data = JSON.parse(line.slice(6));
+                    if (data.type === 'run') stream.runId = data.run_id;
+                    if (data.type === 'done') stream.finished = true;
+                    handleSSE(data);
+                } catch {}
+            } else if (line === '' && eventId !== null) {
+                stream.lastEventId = eventId;  // event fully received
+                eventId = null;
+            }
+        }
+    }
+}
+
 function handleSSE(data) {
     switch (data.type) {
         case 'trace':
@@ -167,6 +202,12 @@ function handleSSE(data) {
             addMsg('Error: ' + data.message, 'assistant');
             setStatus('Error', false);
             break;
+        case 'gap':
+            console.warn(`Missed ${data.missed} trace events while disconnected`);
+            break;
+        case 'skipped':
+            console.warn(`Server skipped ${data.count} reasoning events to catch up`);
+            break;
     }
 }
 
@@ -260,38 +301,38 @@ function card(v) {
             <div class="card-grid">
                 <div class="card-stat">
                     <span class="stat-label">Billed Amount</span>
-                    <span class="stat-value error">${v.amount}</span>
+                    <span class="stat-value error">${v.amount||''}</span>
                 </div>
                 <div class="card-stat">
                     <span class="stat-label">Correct Amount</span>
-                    <span class="stat-value success">${v.correct_amount}</span>
+                    <span class="stat-value success">${v.correct_amount||''}</span>
                 </div>
                 <div class="card-stat">
                     <span class="stat-label">Code Used</span>
-                    <span class="stat-value mono">${v.procedure_code}</span>
+                    <span class="stat-value mono">${v.procedure_code||''}</span>
                 </div>
                 <div class="card-stat">
                     <span class="stat-label">Correct Code</span>
-                    <span class="stat-value accent mono">${v.correct_code}</span>
+                    <span class="stat-value accent mono">${v.correct_code||''}</span>
                 </div>
             </div>`,
         insurance: `
             <div class="card-head">
                 <span class="card-badge insurance">Insurance</span>
-                <span class="card-id">${v.plan}</span>
+                <span class="card-id">${v.plan||''}</span>
             </div>
             <div class="card-grid">
                 <div class="card-stat">
                     <span class="stat-label">Carrier</span>
-                    <span class="stat-value">${v.carrier}</span>
+                    <span class="stat-value">${v.carrier||''}</span>
                 </div>
                 <div class="card-stat">
                     <span class="stat-label">Status</span>
-                    <span class="stat-value success">${v.status}</span>
+                    <span class="stat-value success">${v.status||''}</span>
                 </div>
                 <div class="card-stat">
                     <span class="stat-label">Coverage Rate</span>
-                    <span class="stat-value accent">${v.coverage_rate}</span>
+                    <span class="stat-value accent">${v.coverage_rate||''}</span>
                 </div>
                 <div class="card-stat">
                     <span class="stat-label">Deductible</span>
@@ -301,43 +342,43 @@ function card(v) {
         correction: `
             <div class="card-head">
                 <span class="card-badge correction">Correction</span>
-                <span class="card-id">${v.correction_id}</span>
+                <span class="card-id">${v.correction_id||''}</span>
             </div>
             <div class="card-grid">
                 <div class="card-stat">
                     <span class="stat-label">Original</span>
-                    <span class="stat-value error">${v.original_amount}</span>
+                    <span class="stat-value error">${v.original_amount||''}</span>
                 </div>
                 <div class="card-stat">
                     <span class="stat-label">Corrected</span>
-                    <span class="stat-value success">${v.corrected_amount}</span>
+                    <span class="stat-value success">${v.corrected_amount||''}</span>
                 </div>
                 <div class="card-stat">
                     <span class="stat-label">You Save</span>
-                    <span class="stat-value accent">${v.savings}</span>
+                    <span class="stat-value accent">${v.savings||''}</span>
                 </div>
                 <div class="card-stat">
                     <span class="stat-label">Timeline</span>
-                    <span class="stat-value">${v.timeline}</span>
+                    <span class="stat-value">${v.timeline||''}</span>
                 </div>
             </div>`,
         case: `
             <div class="card-head">
                 <span class="card-badge case">Support Case</span>
-                <span class="card-id">${v.case_id}</span>
+                <span class="card-id">${v.case_id||''}</span>
             </div>
             <div class="card-grid cols-3">
                 <div class="card-stat">
                     <span class="stat-label">Status</span>
-                    <span class="stat-value accent">${v.status}</span>
+                    <span class="stat-value accent">${v.status||''}</span>
                 </div>
                 <div class="card-stat">
                     <span class="stat-label">Priority</span>
-                    <span class="stat-value ${v.priority === 'High' ? 'error' : ''}">${v.priority}</span>
+                    <span class="stat-value ${v.priority === 'High' ? 'error' : ''}">${v.priority||''}</span>
                 </div>
                 <div class="card-stat">
                     <span class="stat-label">Assigned To</span>
-                    <span class="stat-value">${v.team}</span>
+                    <span class="stat-value">${v.team||''}</span>
                 </div>
             </div>`
     };
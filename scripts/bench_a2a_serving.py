@@ -0,0 +1,201 @@
+"""Load benchmark of the multi-worker A2A sub-agent server (stub model).
+
+Starts the real A2A serving stack (``shared.a2a_serving.serve``) with 1, 2,
+4... workers around a ServiceNow agent whose model is a stub, then drives it
+with JSON-RPC ``message/send`` requests from ``--clients`` concurrent
+connections for ``--seconds``. Each request makes two model calls of
+``--model-latency`` seconds: one that creates a ticket through the real
+``ticket_create`` tool, and one that answers. All workers write to one
+scratch record store, and every successful request must have left exactly
+one ticket in it. Reports requests per second, latency and that count for
+each worker count.
+
+Throughput is capped by ``workers x --concurrency`` in-flight invocations
+and, once that is high enough, by the CPU strands spends per request, so
+scaling past the number of cores needs more cores.
+
+Usage:
+    python -m scripts.bench_a2a_serving
+    python -m scripts.bench_a2a_serving --workers 1 2 4 8 --concurrency 4 --clients 128
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+
+BILL_ANSWER = "BILL-90421: $2,400.00, modifier -25 missing."
+
+
+def reply(latency_ms: int):
+    """Create a ticket keyed by the request text, then answer once the tool has run."""
+    from scripts.stub_model import text, tool_use
+
+    def respond(messages: list, system_prompt: str | None) -> list[dict]:
+        if any("toolResult" in block for block in messages[-1]["content"]):
+            return text(BILL_ANSWER, 1500, 40, latency_ms)
+        request = next(block["text"] for block in messages[-1]["content"] if "text" in block)
+        return tool_use("ticket_create", {"patient_id": "PAT-2847", "category": "billing_dispute",
+                                          "summary": "Benchmark ticket", "idempotency_key": request},
+                        1500, 40, latency_ms)
+    return respond
+
+
+def stub_app():
+    """App factory for the server workers: the ServiceNow agent on a stub model."""
+    from strands import Agent
+
+    from agents.servicenow.agent import _strands_tools
+    from agents.servicenow.prompts import SERVICENOW_SYSTEM_PROMPT
+    from scripts.stub_model import StubModel
+    from shared.a2a_serving import create_a2a_app
+
+    latency = float(os.environ["BENCH_MODEL_LATENCY"])
+    return create_a2a_app(
+        lambda: Agent(name="ServiceNow AI Agent", description="Billing operations (stub model)",
+                      model=StubModel(reply(int(latency * 1000)), latency), system_prompt=SERVICENOW_SYSTEM_PROMPT,
+                      tools=_strands_tools(), callback_handler=None),
+        os.environ["BENCH_URL"],
+    )
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers: int, concurrency: int, model_latency: float,
+                 record_dir: str) -> tuple[subprocess.Popen, str]:
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}"
+    env = {**os.environ, "A2A_SERVER_WORKERS": str(workers), "A2A_SERVER_CONCURRENCY": str(concurrency),
+           "A2A_SERVER_WARM_AGENTS": str(concurrency), "A2A_DRAIN_SECONDS": "0",
+           "RATE_LIMIT_ENABLED": "false", "RECORD_STORE_DIR": record_dir,
+           "BENCH_MODEL_LATENCY": str(model_latency), "BENCH_URL": url}
+    code = ("from shared.a2a_serving import serve; "
+            f"serve('scripts.bench_a2a_serving:stub_app', {port}, 'Benchmark')")
+    proc = subprocess.Popen([sys.executable, "-c", code], env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return proc, url
+
+
+async def wait_ready(url: str, workers: int, timeout: float = 120):
+    """Wait until /ready has answered 200 from every worker."""
+    import httpx
+
+    ready: set[int] = set()
+    started = time.monotonic()
+    async with httpx.AsyncClient(timeout=5) as client:
+        while len(ready) < workers:
+            if time.monotonic() - started > timeout:
+                raise RuntimeError(f"only {len(ready)}/{workers} workers ready after {timeout:g}s")
+            try:
+                # A fresh connection per probe so the OS spreads them across workers
+                response = await client.get(f"{url}/ready", headers={"Connection": "close"})
+                if response.status_code == 200:
+                    ready.add(response.json()["pid"])
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.05)
+
+
+def _request_body(n: int) -> bytes:
+    return json.dumps({
+        "jsonrpc": "2.0", "id": n, "method": "message/send",
+        "params": {"message": {"role": "user", "messageId": uuid.uuid4().hex, "kind": "message",
+                               "parts": [{"kind": "text", "text": f"Open a billing ticket for PAT-2847 ({n})"}]}},
+    }).encode()
+
+
+async def load(url: str, clients: int, seconds: float, run_id: int = 0) -> dict:
+    import httpx
+
+    latencies: list[float] = []
+    errors = 0
+    stop_at = time.perf_counter() + seconds
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+
+    async def client_loop(client: httpx.AsyncClient, worker: int):
+        nonlocal errors
+        n = 0
+        while time.perf_counter() < stop_at:
+            n += 1  # unique per client and run, so every request creates a ticket
+            start = time.perf_counter()
+            try:
+                response = await client.post(url + "/", content=_request_body(run_id * 10**9 + worker * 10**6 + n),
+                                             headers={"Content-Type": "application/json"})
+                ok = response.status_code == 200 and "error" not in response.json()
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    async with httpx.AsyncClient(timeout=60, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(client, i) for i in range(clients)))
+        elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p99_ms": latencies[max(0, int(len(latencies) * 0.99) - 1)] * 1000 if latencies else 0.0,
+        "errors": errors,
+    }
+
+
+def run(workers: int, args) -> dict:
+    from shared.record_store import RecordStore
+
+    with tempfile.TemporaryDirectory() as record_dir:
+        proc, url = start_server(workers, args.concurrency, args.model_latency, record_dir)
+        try:
+            asyncio.run(wait_ready(url, workers))
+            warm = asyncio.run(load(url, args.clients, min(1.0, args.seconds), run_id=1))  # warm connections
+            result = asyncio.run(load(url, args.clients, args.seconds, run_id=2))
+        finally:
+            proc.terminate()
+            proc.wait(timeout=60)
+        store = RecordStore(Path(record_dir) / "servicenow.jsonl")
+        result["tickets"] = len(store.items("tickets"))
+        result["expected_tickets"] = warm["requests"] + result["requests"]
+        store.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=8, help="invocations per worker")
+    parser.add_argument("--clients", type=int, default=64, help="concurrent client connections")
+    parser.add_argument("--model-latency", type=float, default=0.2)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    print("=" * 64)
+    print(f"A2A SERVING: stub model {args.model_latency * 1000:.0f} ms, {args.concurrency} per worker, "
+          f"{args.clients} clients, {os.cpu_count()} CPUs")
+    print("=" * 64)
+    baseline = None
+    for workers in args.workers:
+        r = run(workers, args)
+        baseline = baseline or r["rps"]
+        print(f"  {workers:>2} workers  {r['rps']:>7.1f} req/s  x{r['rps'] / baseline:<4.2f}  "
+              f"p50 {r['p50_ms']:>6.0f}ms  p99 {r['p99_ms']:>6.0f}ms  errors {r['errors']}  "
+              f"tickets {r['tickets']}/{r['expected_tickets']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Billing anomaly scan throughput on synthetic bills.
+
+Generates ``--bills`` bills as columns, with each anomaly the rules look for
+(missing modifier, insurance not applied, patient overcharged, expected
+split not adding up) injected into a few percent of them. The same
+``shared.billing_scan`` rules are then evaluated:
+
+* vectorized: ``scan_columns``, one NumPy pass per rule over every bill;
+* row by row: ``scan_rows``, the fallback without NumPy, on the first
+  ``--row-bills`` bills (extrapolated to the full set);
+
+then the findings index is built and ``for_patient`` lookups are timed.
+Both scans must flag the same bills.
+
+Usage:
+    python -m scripts.bench_billing_scan
+    python -m scripts.bench_billing_scan --bills 5000000 --row-bills 100000
+"""
+
+import argparse
+import statistics
+import sys
+import time
+
+from shared import billing_scan
+from shared.billing_scan import BillColumns, BillingScan, scan_columns, scan_rows
+
+
+def synthetic(n: int, bills_per_patient: int, anomaly_rate: float, seed: int) -> BillColumns:
+    np = billing_scan.np
+    rng = np.random.default_rng(seed)
+    billed = rng.choice([180.0, 240.0, 650.0, 1200.0, 2400.0], n)
+    rate = rng.choice([0.7, 0.8, 0.9, 1.0], n)
+    insurer = np.round(billed * rate, 2)
+    patient = billed - insurer
+    applied = rng.random(n) >= anomaly_rate
+    patient[rng.random(n) < anomaly_rate] += 50.0  # split does not add up
+    codes = ["99213", "99214", "99215", "93000"]
+    code = rng.integers(0, len(codes), n)
+    modifier = rng.random(n) < anomaly_rate
+    procedure_code = [codes[c] for c in code]
+    return BillColumns(
+        bill_id=[f"BILL-{i:08d}" for i in range(n)],
+        patient_id=[f"PAT-{i // bills_per_patient:07d}" for i in range(n)],
+        procedure_code=procedure_code,
+        correct_code=[p + "-25" if m else p for p, m in zip(procedure_code, modifier.tolist())],
+        rejection_reason=["MODIFIER_MISSING" if m else "" for m in modifier.tolist()],
+        billed=billed, insurer_expected=insurer, patient_expected=patient,
+        insurance_applied=applied, insurance_not_applied=~applied, modifier_missing=modifier,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bills", type=int, default=1_000_000)
+    parser.add_argument("--row-bills", type=int, default=50_000, help="bills scanned row by row")
+    parser.add_argument("--bills-per-patient", type=int, default=4)
+    parser.add_argument("--anomaly-rate", type=float, default=0.03, help="per rule")
+    parser.add_argument("--lookups", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    if billing_scan.np is None:
+        sys.exit("NumPy is not installed; the scan runs row by row only and there is nothing to compare")
+    np = billing_scan.np
+
+    columns = synthetic(args.bills, args.bills_per_patient, args.anomaly_rate, args.seed)
+
+    start = time.perf_counter()
+    mask = scan_columns(columns)
+    vectorized = time.perf_counter() - start
+
+    sample = BillColumns(**{name: value[:args.row_bills] for name, value in vars(columns).items()})
+    start = time.perf_counter()
+    rows = scan_rows(sample)
+    by_row = (time.perf_counter() - start) * args.bills / len(sample)
+    mismatches = int(np.count_nonzero(mask[:len(sample)] != np.asarray(rows, dtype=np.uint32)))
+
+    start = time.perf_counter()
+    scan = BillingScan(columns)
+    indexed = time.perf_counter() - start
+    patients = args.bills // args.bills_per_patient
+    latencies = []
+    for i in np.random.default_rng(args.seed).integers(0, patients, args.lookups).tolist():
+        start = time.perf_counter()
+        scan.for_patient(f"PAT-{i:07d}")
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+
+    print("=" * 72)
+    print(f"BILLING SCAN: {args.bills:,} bills, {len(scan.rules)} rules, "
+          f"{args.anomaly_rate:.0%} anomaly rate per rule")
+    print("=" * 72)
+    print(f"  vectorized  {vectorized * 1e3:9.1f} ms  {args.bills / vectorized / 1e6:8.1f} M bills/s")
+    print(f"  row by row  {by_row * 1e3:9.1f} ms  {args.bills / by_row / 1e6:8.2f} M bills/s  "
+          f"(extrapolated from {len(sample):,})  x{by_row / vectorized:.0f}")
+    print(f"  mismatches {mismatches}  flagged bills {int(np.count_nonzero(mask)):,}  "
+          + "  ".join(f"{name} {count:,}" for name, count in scan.stats()["anomalies"].items()))
+    print(f"  scan + findings index  {indexed:.2f} s   for_patient p50 "
+          f"{statistics.median(latencies) * 1e6:.1f}us  p99 {latencies[int(len(latencies) * 0.99) - 1] * 1e6:.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Offline benchmark of model tiering with stub models (no AWS calls).
+
+Replays a mix of sub-agent tasks through the real router (route → run →
+validate → escalate) against stub tiers with configurable latency and a
+fast-tier failure rate, and compares against running everything on the large
+tier.
+
+Usage:
+    python -m scripts.bench_model_tiers
+    python -m scripts.bench_model_tiers --tasks 500 --fast-failure 0.15
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from shared import model_router as router
+
+# (agent, task) mix seen in the billing-dispute demo
+TASK_MIX = [
+    ("salesforce", "Verify insurance coverage for patient PAT-2847 and summarise deductible status."),
+    ("salesforce", "Look up the patient record for PAT-2847."),
+    ("salesforce", "Retrieve care history for PAT-2847."),
+    ("servicenow", "Look up billing records for patient PAT-2847 and identify any errors."),
+    ("servicenow", "List available cardiology appointment slots for PAT-2847."),
+    ("servicenow", "Submit a billing correction for BILL-90421 (procedure_code) for PAT-2847."),
+    ("salesforce", "Create a billing dispute case for PAT-2847."),
+]
+
+# Simulated seconds per call (mean, stdev) and tokens per call (in, out)
+STUB_LATENCY = {"fast": (0.9, 0.2), "large": (3.2, 0.8)}
+STUB_TOKENS = (1800, 350)
+
+
+class StubTier:
+    def __init__(self, tier: str, failure_rate: float, time_scale: float, rng: random.Random):
+        self.tier, self.failure_rate, self.time_scale, self.rng = tier, failure_rate, time_scale, rng
+
+    async def __call__(self, task: str) -> tuple[str, float]:
+        mean, stdev = STUB_LATENCY[self.tier]
+        seconds = max(0.05, self.rng.gauss(mean, stdev))
+        await asyncio.sleep(seconds * self.time_scale)
+        if self.tier == "fast" and self.rng.random() < self.failure_rate:
+            return "Sorry.", seconds  # fails validation → escalation
+        return f"Findings for PAT-2847: BILL-90421 $2,400.00 coverage 90% ({task[:30]})", seconds
+
+
+async def run_one(agent: str, task: str, tiers: dict, tiered: bool) -> dict:
+    decision = router.route(agent, task) if tiered else router.RoutingDecision(agent, "large", "baseline")
+    total = cost = 0.0
+    path = []
+    while decision is not None:
+        output, seconds = await tiers[decision.tier](task)
+        total += seconds
+        cost += router.estimate_cost(decision.tier, *STUB_TOKENS)
+        path.append(decision.tier)
+        decision = router.complete(decision, task, output, seconds, *STUB_TOKENS)
+    return {"seconds": total, "cost": cost, "path": "→".join(path)}
+
+
+async def run(n: int, tiered: bool, failure_rate: float, time_scale: float, seed: int) -> list[dict]:
+    rng = random.Random(seed)
+    tiers = {t: StubTier(t, failure_rate, time_scale, rng) for t in router.MODEL_TIERS}
+    jobs = [rng.choice(TASK_MIX) for _ in range(n)]
+    return await asyncio.gather(*(run_one(a, t, tiers, tiered) for a, t in jobs))
+
+
+def report(label: str, results: list[dict]):
+    seconds = sorted(r["seconds"] for r in results)
+    paths: dict[str, int] = {}
+    for r in results:
+        paths[r["path"]] = paths.get(r["path"], 0) + 1
+    p95 = seconds[int(len(seconds) * 0.95) - 1]
+    print(f"\n{label}")
+    print(f"  latency  mean {statistics.mean(seconds):.2f}s  p50 {statistics.median(seconds):.2f}s  p95 {p95:.2f}s")
+    print(f"  cost     ${sum(r['cost'] for r in results):.4f} total, "
+          f"${statistics.mean(r['cost'] for r in results):.5f}/call")
+    print("  tier mix " + ", ".join(f"{p}: {c / len(results):.0%}" for p, c in sorted(paths.items())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=300)
+    parser.add_argument("--fast-failure", type=float, default=0.1,
+                        help="fraction of fast-tier answers that fail validation")
+    parser.add_argument("--time-scale", type=float, default=0.01,
+                        help="wall-clock seconds slept per simulated second")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"MODEL TIERS: {args.tasks} sub-agent calls, stub latency {STUB_LATENCY}")
+    print("=" * 60)
+    start = time.perf_counter()
+    baseline = asyncio.run(run(args.tasks, False, args.fast_failure, args.time_scale, args.seed))
+    tiered = asyncio.run(run(args.tasks, True, args.fast_failure, args.time_scale, args.seed))
+    report("All large tier (baseline)", baseline)
+    report(f"Routed (fast-tier failure rate {args.fast_failure:.0%})", tiered)
+    print(f"\n  ran in {time.perf_counter() - start:.1f}s wall")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Patient summary: materialized view vs assembling the join per call.
+
+Clones the mock patient into ``--patients`` patients, each with
+``--records`` created corrections, tickets and cases in two record stores
+(written to a temporary directory), then replays ``--lookups`` summary
+lookups over them, with one write tool ``put`` every ``--write-every``
+lookups:
+
+* per call: join both systems' mock data and record stores for the patient
+  and summarise it on every lookup, as a caller without the view would;
+* materialized: ``shared.patient_view.PatientViews``, built once per patient
+  and upserted on each write.
+
+Every lookup's summary is checked against the per-call one, so stale views
+would show up as mismatches.
+
+Usage:
+    python -m scripts.bench_patient_view
+    python -m scripts.bench_patient_view --patients 5000 --records 20 --max-patients 1000
+"""
+
+import argparse
+import copy
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from shared.config import SALESFORCE_DATA_PATH, SERVICENOW_DATA_PATH
+from shared.mock_data import load_mock_data
+from shared.patient_view import COLLECTIONS, PatientViews
+from shared.record_store import RecordStore
+
+SEED_PATIENT = "PAT-2847"
+WRITES = [("corrections", "CORR", "servicenow"), ("tickets", "TKT", "servicenow"),
+          ("cases", "CASE", "salesforce")]
+
+
+def clone(data: dict, patients: list[str]) -> dict:
+    """The mock data with every per-patient entry copied to each patient."""
+    cloned = {}
+    for key, by_patient in data.items():
+        if not isinstance(by_patient, dict) or SEED_PATIENT not in by_patient:
+            cloned[key] = by_patient
+            continue
+        cloned[key] = {}
+        for patient_id in patients:
+            entry = copy.deepcopy(by_patient[SEED_PATIENT])
+            for item in entry if isinstance(entry, list) else [entry]:
+                if "patient_id" in item:
+                    item["patient_id"] = patient_id
+            cloned[key][patient_id] = entry
+    return cloned
+
+
+def put(stores: dict, patient_id: str, n: int, status: str = "open"):
+    collection, prefix, system = WRITES[n % len(WRITES)]
+    record_id = f"{prefix}-{n:07d}"
+    stores[system].put(collection, record_id, {COLLECTIONS[collection]: record_id,
+                                               "patient_id": patient_id, "status": status,
+                                               "_created_at": time.time()})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--patients", type=int, default=2000)
+    parser.add_argument("--records", type=int, default=10, help="created records per patient")
+    parser.add_argument("--lookups", type=int, default=20000)
+    parser.add_argument("--write-every", type=int, default=20, help="lookups per write")
+    parser.add_argument("--max-patients", type=int, default=10000, help="views kept (LRU)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    patients = [f"PAT-{100000 + i}" for i in range(args.patients)]
+    servicenow_data = clone(load_mock_data(SERVICENOW_DATA_PATH), patients)
+    salesforce_data = clone(load_mock_data(SALESFORCE_DATA_PATH), patients)
+    rng = random.Random(args.seed)
+    # Skewed towards a working set, as the patients with open disputes are
+    workload = [patients[min(int(rng.expovariate(10 / args.patients)), args.patients - 1)]
+                for _ in range(args.lookups)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        stores = {name: RecordStore(Path(tmp) / f"{name}.jsonl", compact_min_entries=10 ** 9)
+                  for name in ("servicenow", "salesforce")}
+        n = 0
+        for patient_id in patients:
+            for _ in range(args.records):
+                put(stores, patient_id, n, rng.choice(["open", "closed"]))
+                n += 1
+        views = PatientViews(servicenow_data, salesforce_data, stores["servicenow"],
+                             stores["salesforce"], args.max_patients)
+
+        per_call, materialized, mismatches = [], [], 0
+        for i, patient_id in enumerate(workload):
+            if i % args.write_every == 0:
+                put(stores, rng.choice(workload), n)
+                n += 1
+            start = time.perf_counter()
+            expected = views._build(patient_id).summary()
+            per_call.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            summary = views.summary(patient_id)
+            materialized.append(time.perf_counter() - start)
+            mismatches += summary != expected
+        stats = views.stats()
+        for store in stores.values():
+            store.close()
+
+    print("=" * 72)
+    print(f"PATIENT VIEW: {args.lookups} lookups over {args.patients} patients, {args.records} "
+          f"records each, a write every {args.write_every} lookups")
+    print("=" * 72)
+    for name, samples in (("per call", per_call), ("materialized", materialized)):
+        samples.sort()
+        print(f"  {name:<13} p50 {statistics.median(samples) * 1e6:7.1f}us  "
+              f"p99 {samples[int(len(samples) * 0.99) - 1] * 1e6:7.1f}us  "
+              f"total {sum(samples) * 1e3:8.1f}ms")
+    print(f"  speedup {sum(per_call) / sum(materialized):.1f}x  mismatches {mismatches}  "
+          f"hit ratio {stats['hit_ratio']:.1%}  incremental updates {stats['updates']}  "
+          f"evictions {stats['evictions']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Sustained write throughput of the record store.
+
+Several threads put ticket-sized records as fast as they can for a fixed
+duration, against a scratch log in a temporary directory. Reports put
+throughput and latency, how long a flush takes to make everything durable,
+writes per fsync (the group-commit batch size), compactions, and the time to
+rebuild the index from the log on restart.
+
+Each put takes the log's cross-process lock and writes its line to the page
+cache, but never waits for the disk. Writer threads spinning on puts keep the
+GIL busy, so the flush thread runs less often than ``--fsync-ms`` asks for;
+the "writes per fsync" figure shows the batch size actually achieved.
+
+Usage:
+    python -m scripts.bench_record_store
+    python -m scripts.bench_record_store --threads 16 --seconds 5 --fsync-ms 0 10 50
+"""
+
+import argparse
+import random
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from shared import metrics
+from shared.record_store import RecordStore
+
+
+def writer(store: RecordStore, seconds: float, patients: int, updates: int, seed: int,
+           latencies: list[float]):
+    rng = random.Random(seed)
+    deadline = time.perf_counter() + seconds
+    n = 0
+    while time.perf_counter() < deadline:
+        ticket_id = f"TKT-{seed:02d}{n:06d}"
+        record = {
+            "ticket_id": ticket_id,
+            "patient_id": f"PAT-{rng.randrange(patients):04d}",
+            "category": rng.choice(["billing_dispute", "scheduling", "general"]),
+            "summary": "Incorrect procedure code on cardiology visit",
+            "priority": rng.choice(["low", "medium", "high"]),
+            "status": "open",
+            "_created_at": time.time(),
+        }
+        start = time.perf_counter()
+        store.put("tickets", ticket_id, record)
+        latencies.append(time.perf_counter() - start)
+        n += 1
+        for status in ("in_progress", "resolved", "closed")[:updates]:
+            # Status updates supersede earlier entries, which is what compaction reclaims
+            store.put("tickets", ticket_id, {**record, "status": status})
+
+
+def run(directory: Path, fsync_ms: float, threads: int, seconds: float, patients: int,
+        updates: int) -> dict:
+    path = directory / f"bench-{fsync_ms:g}ms.jsonl"
+    store = RecordStore(path, fsync_interval=fsync_ms / 1000)
+    before = metrics.snapshot()["counters"]
+    per_thread: list[list[float]] = [[] for _ in range(threads)]
+    workers = [threading.Thread(target=writer, args=(store, seconds, patients, updates, i, per_thread[i]))
+               for i in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    written = time.perf_counter() - start
+    flush_start = time.perf_counter()
+    store.flush()
+    flush_seconds = time.perf_counter() - flush_start
+    stats = store.stats()
+    store.close()
+    after = metrics.snapshot()["counters"]
+    fsyncs, log_writes = (after.get(f"record_store.{k}", 0) - before.get(f"record_store.{k}", 0)
+                          for k in ("fsyncs", "writes"))
+
+    reload_start = time.perf_counter()
+    reloaded = RecordStore(path, fsync_interval=1)
+    reload_seconds = time.perf_counter() - reload_start
+    assert reloaded.stats()["records"] == stats["records"], "reload lost records"
+    reloaded.close()
+
+    latencies = sorted(l for thread in per_thread for l in thread)
+    return {
+        "puts": len(latencies),
+        "puts_per_second": len(latencies) / written,
+        "p50_us": statistics.median(latencies) * 1e6,
+        "p99_us": latencies[int(len(latencies) * 0.99) - 1] * 1e6,
+        "flush_ms": flush_seconds * 1000,
+        "writes_per_fsync": log_writes / max(fsyncs, 1),
+        "compactions": stats["compactions"],
+        "live_records": sum(stats["records"].values()),
+        "log_mb": path.stat().st_size / 1e6,
+        "reload_ms": reload_seconds * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=3)
+    parser.add_argument("--patients", type=int, default=2000)
+    parser.add_argument("--updates", type=int, default=2, choices=range(4),
+                        help="status updates written after each new ticket")
+    parser.add_argument("--fsync-ms", type=float, nargs="+", default=[1, 10, 50])
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"RECORD STORE: {args.threads} writer threads for {args.seconds:g}s per setting")
+    print("=" * 60)
+    with tempfile.TemporaryDirectory() as tmp:
+        for fsync_ms in args.fsync_ms:
+            r = run(Path(tmp), fsync_ms, args.threads, args.seconds, args.patients, args.updates)
+            print(f"\nfsync every {fsync_ms:g} ms")
+            print(f"  puts     {r['puts']:,} ({r['puts_per_second']:,.0f}/s)  "
+                  f"latency p50 {r['p50_us']:.1f}us  p99 {r['p99_us']:.1f}us")
+            print(f"  durable  flush {r['flush_ms']:.1f}ms after last put, "
+                  f"{r['writes_per_fsync']:.0f} writes per fsync")
+            print(f"  log      {r['live_records']:,} live records, {r['log_mb']:.1f} MB, "
+                  f"{r['compactions']} compactions, reload {r['reload_ms']:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
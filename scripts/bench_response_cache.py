@@ -0,0 +1,114 @@
+"""Semantic response cache: hit ratio, wrong hits and latency saved.
+
+Replays a stream of patient messages through ``shared.response_cache``. The
+stream mixes paraphrases of general questions, which should hit once one of
+them has been answered, with near-miss general questions that need a
+different answer and with patient-specific messages, which must never hit.
+Every miss is "answered" by an orchestrator turn of ``--turn-seconds`` and
+stored as the server would store it.
+
+For each similarity threshold, reports the hit ratio, wrong hits (answered
+with the response to a different question), lookup latency and the turn
+time saved.
+
+Usage:
+    python -m scripts.bench_response_cache
+    python -m scripts.bench_response_cache --thresholds 0.8 0.9 --repeat 20
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from shared.response_cache import ResponseCache
+
+GENERAL = {
+    "correction_time": ["How long does a billing correction take?",
+                        "how long do billing corrections take",
+                        "How long does a billing correction usually take?",
+                        "how long will a billing correction take"],
+    "modifier_25": ["What does modifier -25 mean?", "what does the modifier -25 mean",
+                    "What does a modifier 25 mean?"],
+    "office_hours": ["What are your office hours?", "what are the office hours",
+                     "What are your office hours on weekends?"],
+    "update_insurance": ["How do I update my insurance information?",
+                         "how can I update my insurance information",
+                         "How do I update my insurance info?"],
+    "deductible": ["What is a deductible?", "what's a deductible", "What is a deductible exactly?"],
+    "appointment_length": ["How long does an appointment take?", "how long do appointments take"],
+    "dispute_time": ["How long does a billing dispute take?", "how long do billing disputes take"],
+    "copay": ["What is a copay?", "what is a co-pay"],
+}
+
+PATIENT_SPECIFIC = [
+    "Why was I charged $2,400 for my cardiology visit?",
+    "What is my bill for PAT-2847?",
+    "Is BILL-90421 correct?",
+    "What is my deductible?",
+    "When is my next appointment?",
+    "Can you fix the bill from 2026-01-14?",
+]
+
+
+def workload(repeat: int, seed: int) -> list[tuple[str | None, str]]:
+    """(intent or None for patient-specific, message) in random order."""
+    items = [(intent, q) for intent, qs in GENERAL.items() for q in qs] * repeat
+    items += [(None, m) for m in PATIENT_SPECIFIC] * repeat
+    random.Random(seed).shuffle(items)
+    return items
+
+
+def run(threshold: float, items, turn_seconds: float) -> dict:
+    cache = ResponseCache(threshold=threshold)
+    answers: dict[str, str] = {}  # response text -> intent it answers
+    hits = wrong = patient_hits = 0
+    lookups: list[float] = []
+    for intent, message in items:
+        start = time.perf_counter()
+        cached = cache.lookup(message)
+        lookups.append(time.perf_counter() - start)
+        if cached:
+            entry, _ = cached
+            cache.record_saving(entry, lookups[-1])
+            hits += 1
+            if intent is None:
+                patient_hits += 1
+            elif answers[entry.response] != intent:
+                wrong += 1
+            continue
+        # Miss: the orchestrator answers; general answers are stored
+        if intent is not None:
+            response = f"General answer about {intent.replace('_', ' ')} ({len(answers)})"
+            answers[response] = intent
+            cache.store(message, response, turn_seconds)
+    lookups.sort()
+    return {"hits": hits, "wrong": wrong, "patient_hits": patient_hits, "total": len(items),
+            "p50_us": statistics.median(lookups) * 1e6,
+            "p99_us": lookups[int(len(lookups) * 0.99) - 1] * 1e6,
+            "saved": cache.saved_seconds}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.8, 0.85, 0.9, 0.95])
+    parser.add_argument("--repeat", type=int, default=10, help="times each message recurs")
+    parser.add_argument("--turn-seconds", type=float, default=6.0, help="cost of an uncached turn")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    items = workload(args.repeat, args.seed)
+    general = sum(1 for intent, _ in items if intent is not None)
+    print("=" * 72)
+    print(f"RESPONSE CACHE: {len(items)} messages ({general} general, {len(items) - general} "
+          f"patient-specific), {args.turn_seconds:g}s per uncached turn")
+    print("=" * 72)
+    for threshold in args.thresholds:
+        r = run(threshold, items, args.turn_seconds)
+        print(f"  threshold {threshold:.2f}  hit ratio {r['hits'] / r['total']:5.1%}  "
+              f"wrong hits {r['wrong']:>3}  patient hits {r['patient_hits']}  "
+              f"lookup p50 {r['p50_us']:5.0f}us p99 {r['p99_us']:5.0f}us  saved {r['saved']:7.1f}s")
+
+
+if __name__ == "__main__":
+    main()
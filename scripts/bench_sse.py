@@ -0,0 +1,178 @@
+"""SSE frame serialization and delivery benchmark (no server, no models).
+
+Encodes a representative billing-dispute turn (tool start/end events with
+500-character outputs, orchestrator thinking with full thoughts, visual
+data, metrics, final response) and reports:
+
+* serialization CPU per frame: the old per-event ``json.dumps`` f-string,
+  the stdlib fallback and orjson (if installed);
+* writes per turn when frames published in bursts are coalesced;
+* gzip ratio and CPU per frame;
+* a slow client: frames dropped and bytes sent while it lags behind.
+
+Usage:
+    python -m scripts.bench_sse
+    python -m scripts.bench_sse --frames 20000 --slow-read-ms 20
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import zlib
+
+from shared import sse
+from shared.runs import Run
+
+OUTPUT = ("Billing record BILL-90421 for PAT-2847: cardiology visit on 2026-01-14, CPT 99214 billed "
+          "at $2,400.00 without modifier -25 although a separately identifiable E/M service was "
+          "documented alongside procedure 93000. Insurer denied the claim as bundled; patient "
+          "responsibility shown as the full amount. Recommended correction: append modifier -25 "
+          "and resubmit; expected patient responsibility after 90% coverage is $240.00.")[:500]
+
+THOUGHT = ("The patient disputes a $2,400 cardiology bill and says insurance should cover it. I need "
+           "the billing record to check the coding and the insurance record to confirm coverage; "
+           "these are independent, so both sub-agents can be asked in parallel. ") * 3
+
+
+def turn_frames() -> list[dict]:
+    """Frames of one billing-dispute turn, as the server publishes them."""
+    def trace(event_type, agent, title, detail, icon, status, data):
+        return {"type": "trace", "event": {"type": event_type, "timestamp": 1.23, "agent": agent,
+                                           "title": title, "detail": detail, "icon": icon,
+                                           "status": status, "data": data}}
+    frames = [{"type": "run", "run_id": "run-0123456789abcdef", "session_id": "sess-1"},
+              trace("orchestrator_start", "Orchestrator", "Analyzing request", "New patient message",
+                    "🎯", "running", None)]
+    for _ in range(4):
+        frames.append(trace("thinking", "Orchestrator", "Reasoning", THOUGHT[:200] + "...", "💭",
+                            "info", {"full_thought": THOUGHT}))
+    for agent in ("ServiceNow", "Salesforce"):
+        frames.append(trace("tool_start", agent, "Billing Lookup", "Request: Look up billing records",
+                            "🔧", "running", {"input": "Look up billing records for PAT-2847"}))
+        frames.append(trace("tool_end", agent, "Found coding error", "Bill: BILL-90421 | Missing modifier -25",
+                            "✅", "complete", {"output": OUTPUT, "visual": {
+                                "bill_id": "BILL-90421", "amount": "$2,400.00", "code": "99214"}}))
+    frames.append(trace("orchestrator_end", "Orchestrator", "Response ready", "2 sub-agent calls",
+                        "✨", "complete", None))
+    frames.append({"type": "metrics", "data": {"total_time": 7.9, "timings": {"servicenow": 3.1},
+                                               "tokens": {"input": 5200, "output": 640},
+                                               "estimated_cost": 0.0252}})
+    frames.append({"type": "response", "text": OUTPUT * 2, "session_id": "sess-1"})
+    frames.append({"type": "done"})
+    return frames
+
+
+def per_frame_us(encode, frames: list[dict], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for i, frame in enumerate(frames):
+            encode(i, frame)
+    return (time.perf_counter() - start) / (repeat * len(frames)) * 1e6
+
+
+def serialization(frames: list[dict], repeat: int):
+    def legacy(seq, frame):
+        return f"data: {json.dumps(frame)}\n\n".encode()
+
+    def stdlib(seq, frame):
+        return b"id: %d\n" % seq + b"data: " + json.dumps(
+            frame, default=str, separators=(",", ":")).encode() + b"\n\n"
+
+    print("\nSerialization (per frame)")
+    baseline = per_frame_us(legacy, frames, repeat)
+    print(f"  json.dumps f-string (before)  {baseline:7.2f} us")
+    fallback = per_frame_us(stdlib, frames, repeat)
+    print(f"  stdlib compact               {fallback:7.2f} us  x{baseline / fallback:.1f}")
+    if sse.orjson is not None:
+        fast = per_frame_us(sse.encode_frame, frames, repeat)
+        print(f"  orjson (shared.sse)          {fast:7.2f} us  x{baseline / fast:.1f}")
+    else:
+        print("  orjson                       not installed")
+
+
+def gzip_cost(frames: list[dict], repeat: int):
+    encoded = [sse.encode_frame(i, f) for i, f in enumerate(frames)]
+    raw = sum(map(len, encoded))
+    start = time.perf_counter()
+    for _ in range(repeat):
+        compressor = sse._Gzip()
+        compressed = sum(len(compressor.compress(chunk)) for chunk in encoded) + len(compressor.finish())
+    us = (time.perf_counter() - start) / (repeat * len(encoded)) * 1e6
+    print(f"\nGzip (flushed per write): {raw:,} -> {compressed:,} bytes per turn "
+          f"({compressed / raw:.0%}), {us:.1f} us per frame")
+    compressor = sse._Gzip()
+    body = b"".join(compressor.compress(chunk) for chunk in encoded) + compressor.finish()
+    assert zlib.decompress(body, 31) == b"".join(encoded)
+
+
+async def coalescing(frames: list[dict], poll_ms: float):
+    run = Run("bench", buffer_size=1000, grace=0)
+
+    async def producer():
+        # Frames arrive in bursts: tool start/end pairs and thinking runs a few ms apart
+        for i, frame in enumerate(frames):
+            run.publish(frame)
+            if i % 3 == 2:
+                await asyncio.sleep(0.03)
+        run.finish()
+
+    writes = 0
+    task = asyncio.create_task(producer())
+    async for _ in sse.stream_run(run, 0, poll=poll_ms / 1000, max_lag=10_000):
+        writes += 1
+    await task
+    print(f"\nCoalescing ({poll_ms:g} ms window): {len(frames)} frames in {writes} writes")
+
+
+async def slow_client(frames: list[dict], count: int, read_ms: float, max_lag: int):
+    run = Run("bench", buffer_size=1000, grace=0)
+    total = 0
+    sent_bytes = 0
+    dropped_before = sse_metric("sse.frames_dropped")
+
+    async def producer():
+        for i in range(count):
+            run.publish(frames[i % len(frames)])
+            if i % 50 == 0:
+                await asyncio.sleep(0)
+        run.finish()
+
+    task = asyncio.create_task(producer())
+    async for chunk in sse.stream_run(run, 0, poll=0.01, max_lag=max_lag):
+        total += chunk.count(b"\ndata: ") + chunk.startswith(b"data: ")
+        sent_bytes += len(chunk)
+        await asyncio.sleep(read_ms / 1000)  # the client drains slowly
+    await task
+    print(f"\nSlow client ({read_ms:g} ms per read, max lag {max_lag}): {count} frames published, "
+          f"{total} sent, {sse_metric('sse.frames_dropped') - dropped_before:.0f} thinking frames dropped, "
+          f"{sse_metric('sse.frames_lost'):.0f} lost to the replay buffer, {sent_bytes / 1e6:.1f} MB sent")
+
+
+def sse_metric(name: str) -> float:
+    from shared import metrics
+    return metrics.get(name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=2000, help="turns to encode per measurement")
+    parser.add_argument("--coalesce-ms", type=float, default=10)
+    parser.add_argument("--frames", type=int, default=5000, help="frames in the slow-client run")
+    parser.add_argument("--slow-read-ms", type=float, default=5)
+    parser.add_argument("--max-lag", type=int, default=200)
+    args = parser.parse_args()
+
+    frames = turn_frames()
+    print("=" * 60)
+    print(f"SSE: {len(frames)} frames per turn, "
+          f"{sum(len(sse.encode_frame(i, f)) for i, f in enumerate(frames)):,} bytes")
+    print("=" * 60)
+    serialization(frames, args.repeat)
+    gzip_cost(frames, max(1, args.repeat // 4))
+    asyncio.run(coalescing(frames, args.coalesce_ms))
+    asyncio.run(slow_client(frames, args.frames, args.slow_read_ms, args.max_lag))
+
+
+if __name__ == "__main__":
+    main()
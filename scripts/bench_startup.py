@@ -0,0 +1,91 @@
+"""Startup benchmark: import cost of each entry module and first-use costs.
+
+Runs each import in a fresh interpreter with ``-X importtime`` so results are
+cold-process numbers, then reports the heaviest imports underneath it.
+
+Usage:
+    python -m scripts.bench_startup
+    python -m scripts.bench_startup --top 15 server agents.orchestrator.agent
+"""
+
+import argparse
+import json
+import re
+import subprocess
+import sys
+import time
+
+DEFAULT_MODULES = [
+    "server",
+    "agents.orchestrator.agent",
+    "agents.servicenow.agent",
+    "agents.salesforce.agent",
+]
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def import_profile(module: str) -> tuple[float, int, list[tuple[int, str]]]:
+    """Return (wall seconds, module cumulative us, [(cumulative_us, child)])."""
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    # Children are printed before their parent, one indent level deeper
+    children: list[tuple[int, str]] = []
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative, depth, name = int(match.group(2)), len(match.group(3)) // 2, match.group(4)
+        if depth == 0:
+            if name == module:
+                return wall, cumulative, children
+            children = []
+        elif depth == 1:
+            children.append((cumulative, name))
+    return wall, 0, []
+
+
+def first_use_timings() -> dict:
+    """Time warm-up steps in a fresh interpreter (imports, data, agent build)."""
+    code = (
+        "import json, time; t = time.perf_counter(); "
+        "from agents.warmup import warm_up; "
+        "r = warm_up(build_agents=True); r['total'] = round(time.perf_counter() - t, 4); "
+        "print(json.dumps(r))"
+    )
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr else "failed"}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--top", type=int, default=8, help="heaviest imports to list")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("STARTUP: cold import cost (python -X importtime)")
+    print("=" * 60)
+    for module in args.modules:
+        wall, total, children = import_profile(module)
+        print(f"\n{module}: {total / 1000:.1f} ms import, {wall * 1000:.0f} ms process wall")
+        for cumulative, name in sorted(children, reverse=True)[:args.top]:
+            print(f"    {cumulative / 1000:8.1f} ms  {name}")
+
+    print("\n" + "=" * 60)
+    print("FIRST USE: warm_up(build_agents=True) in a fresh process")
+    print("=" * 60)
+    for step, seconds in first_use_timings().items():
+        print(f"    {step:10s} {seconds}")
+
+
+if __name__ == "__main__":
+    main()
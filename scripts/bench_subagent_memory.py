@@ -0,0 +1,99 @@
+"""Sub-agent input tokens per call over process uptime, by memory policy.
+
+Drives one long-lived ServiceNow agent instance (as a pooled or module-level
+agent is) through ``--calls`` billing lookups spread over ``--patients``
+patients. The model is a stub that calls ``billing_lookup`` and then answers
+with a ``SubAgentResult``; it reports as input tokens the size of everything
+it was sent (system prompt and messages, about 4 characters per token), so
+the numbers show how much history each call drags along:
+
+* before: strands' default conversation manager (a 40-message sliding
+  window), which is what sub-agents used to run with;
+* fresh / patient: ``shared.agent_memory`` policies.
+
+Usage:
+    python -m scripts.bench_subagent_memory
+    python -m scripts.bench_subagent_memory --calls 500 --patients 20 --budget 4000
+"""
+
+import argparse
+import asyncio
+import json
+
+PAYLOAD = {"status": "success", "skill_used": "billing_lookup",
+           "summary": "BILL-90421 ($2,400.00) was denied because 99214 lacked modifier -25; "
+                      "resubmitted as 99214-25 the patient owes $240.00.",
+           "references": {"bill_id": "BILL-90421"},
+           "billing": {"bill_id": "BILL-90421", "amount": "$2,400.00", "correct_amount": "$240.00",
+                       "procedure_code": "99214", "correct_code": "99214-25",
+                       "error": "Missing modifier -25"}}
+
+
+def reply(messages: list, system_prompt: str | None) -> list[dict]:
+    """Calls billing_lookup, then answers with the structured result."""
+    from scripts.stub_model import tool_use
+
+    sent = len(json.dumps(messages, default=str)) + len(system_prompt or "")
+    last = messages[-1]["content"]
+    answered = any("toolResult" in block for block in last)
+    patient = next(block["text"].split()[-1] for m in messages[::-1] if m["role"] == "user"
+                   for block in m["content"] if "text" in block)
+    name, tool_input = (("SubAgentResult", PAYLOAD) if answered
+                        else ("billing_lookup", {"patient_id": patient}))
+    return tool_use(name, tool_input, sent // 4, 60)
+
+
+def build_agent(policy: str, budget: int):
+    from strands import Agent
+
+    from agents.servicenow.agent import _strands_tools
+    from agents.servicenow.prompts import SERVICENOW_SYSTEM_PROMPT
+    from scripts.stub_model import StubModel
+    from shared.agent_memory import SubAgentMemory, WindowStore
+
+    memory = {}
+    if policy != "before":
+        memory["conversation_manager"] = SubAgentMemory(
+            f"bench-{policy}", policy, budget, WindowStore(1000, 3600) if policy == "patient" else None)
+    return Agent(name="ServiceNow AI Agent", model=StubModel(reply), system_prompt=SERVICENOW_SYSTEM_PROMPT,
+                 tools=_strands_tools(), callback_handler=None, **memory)
+
+
+async def run(policy: str, calls: int, patients: int, budget: int) -> list[int]:
+    from shared.contracts import SubAgentResult
+
+    agent = build_agent(policy, budget)
+    per_call = []
+    seen = 0
+    for i in range(calls):
+        result = await agent.invoke_async(f"Look up billing records for patient PAT-{2847 + i % patients}",
+                                          structured_output_model=SubAgentResult)
+        # Without SubAgentMemory usage accumulates over the instance's life
+        total = result.metrics.accumulated_usage["inputTokens"]
+        per_call.append(total - seen if policy == "before" else total)
+        seen = total
+    return per_call
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--patients", type=int, default=10)
+    parser.add_argument("--budget", type=int, default=2000, help="patient window token budget")
+    args = parser.parse_args()
+
+    checkpoints = sorted({1, 2, 10, args.calls // 2, args.calls} - {0})
+    print("=" * 72)
+    print(f"SUB-AGENT MEMORY: {args.calls} calls over {args.patients} patients on one agent instance, "
+          f"budget {args.budget}")
+    print("=" * 72)
+    print(f"  {'policy':<8}" + "".join(f"{'call ' + str(n):>11}" for n in checkpoints) + f"{'mean':>9}")
+    for policy in ("before", "fresh", "patient"):
+        per_call = asyncio.run(run(policy, args.calls, args.patients, args.budget))
+        print(f"  {policy:<8}" + "".join(f"{per_call[n - 1]:>11}" for n in checkpoints)
+              + f"{sum(per_call) / len(per_call):>9.0f}")
+    print("  (input tokens sent to the sub-agent model per call, all cycles)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""Orchestrator input tokens per sub-agent call: free-text vs. structured results.
+
+Replays the tool results of a billing-dispute turn through the orchestrator's
+conversation: billing lookup and insurance verification in the first cycle,
+the correction and the case in the second, the answer in the third. Every
+tool result stays in the conversation, so each one is re-read by every later
+orchestrator cycle.
+
+* before: the sub-agent's answer as it used to be returned, the prose-wrapped
+  JSON artifact the old prompts asked for (findings, analysis,
+  recommendations, references);
+* after: ``SubAgentResult.view()`` for the same findings.
+
+Tokens are estimated offline (words, digit groups of three and punctuation
+each count as one token), which tracks BPE counts closely enough for JSON and
+prose to compare the two; the ratio is what matters.
+
+Usage:
+    python -m scripts.bench_subagent_tokens
+    python -m scripts.bench_subagent_tokens --show
+"""
+
+import argparse
+import json
+import re
+
+from shared.contracts import SubAgentResult
+
+TOKEN = re.compile(r"[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]")
+
+BEFORE = {
+    "billing_lookup": """Here is my analysis of the billing records for patient PAT-2847.
+
+```json
+{
+  "skill_used": "billing-lookup",
+  "status": "success",
+  "findings": {
+    "bill_id": "BILL-90421",
+    "account_number": "ACCT-7291",
+    "date_of_service": "2026-01-15",
+    "provider": "Dr. Raj Patel, MD — Cardiology",
+    "facility": "MidAtlantic Health — Main Campus",
+    "procedure_code": "99214",
+    "procedure_description": "Office/outpatient visit, established patient, moderate complexity",
+    "billed_amount": 2400.00,
+    "insurance_applied": false,
+    "rejection_reason": "MODIFIER_MISSING",
+    "error_flags": ["MODIFIER_MISSING", "INSURANCE_NOT_APPLIED"],
+    "correct_code": "99214-25",
+    "expected_insurance_payment": 2160.00,
+    "expected_patient_responsibility": 240.00,
+    "status": "disputed",
+    "due_date": "2026-02-20"
+  },
+  "analysis": "The $2,400.00 charge on BILL-90421 is the full billed amount because insurance was never applied. Procedure code 99214 was submitted without modifier -25, which is required when a significant, separately identifiable E&M service is billed on the same day as another procedure by the same physician. Without the modifier the payer auto-rejected the claim as a duplicate service, so the entire charge fell to the patient. Once the claim is resubmitted as 99214-25, insurance should pay $2,160.00 (90%) and the patient's responsibility drops to $240.00. The bill is currently disputed and due 2026-02-20, so collections should be paused while the correction is processed.",
+  "recommendations": [
+    "Resubmit the claim for BILL-90421 with procedure code 99214-25",
+    "Request insurance reprocessing after the code correction",
+    "Place the account on hold until the corrected claim is adjudicated",
+    "Notify the patient of the corrected balance of $240.00"
+  ],
+  "references": {"bill_id": "BILL-90421", "account_number": "ACCT-7291"}
+}
+```
+
+In short, this is a coding error (missing modifier -25) rather than a coverage problem, and it is correctable.""",
+    "insurance_verify": """```json
+{
+  "skill_used": "insurance-verify",
+  "status": "success",
+  "findings": {
+    "carrier": "Blue Cross Blue Shield",
+    "plan_name": "BCBS PPO",
+    "policy_number": "BCBS-PA-9928471",
+    "group_number": "GRP-44102",
+    "subscriber": "Maria Santos",
+    "relationship": "Self",
+    "effective_date": "2025-01-01",
+    "policy_status": "active",
+    "cardiology_coverage": {"covered": true, "coverage_rate": "90%", "specialist_copay": 40.00, "pre_auth_required": false},
+    "deductible": {"annual_amount": 1500.00, "amount_met": 1500.00, "remaining": 0.00, "status": "fully met"},
+    "out_of_pocket_max": {"annual_amount": 6000.00, "amount_spent": 2100.00, "remaining": 3900.00},
+    "expected_patient_responsibility_99214": "$40.00 copay + 10% of allowed amount"
+  },
+  "analysis": "Maria Santos has active BCBS PPO coverage (policy BCBS-PA-9928471, effective 2025-01-01, no termination date). Cardiology visits are covered at 90% after a $40 specialist copay, and no pre-authorization is required for an E&M visit such as 99214. The 2026 deductible of $1,500.00 has been fully met, so no deductible applies to this claim. She has $3,900.00 remaining before her out-of-pocket maximum. For the disputed cardiology visit, the expected patient responsibility is the $40 copay plus 10% of the allowed amount, which is consistent with the $240.00 balance ServiceNow calculated once the claim is reprocessed.",
+  "recommendations": [
+    "Confirm to the patient that her coverage was active on the date of service",
+    "Proceed with insurance reprocessing of the corrected claim"
+  ],
+  "references": {"patient_id": "PAT-2847", "policy_number": "BCBS-PA-9928471"}
+}
+```""",
+    "billing_correct": """```json
+{
+  "skill_used": "billing-correct",
+  "status": "success",
+  "findings": {
+    "correction_id": "CORR-7F3A21",
+    "bill_id": "BILL-90421",
+    "correction_type": "procedure_code",
+    "original_code": "99214",
+    "corrected_code": "99214-25",
+    "original_amount": 2400.00,
+    "corrected_patient_amount": 240.00,
+    "patient_savings": 2160.00,
+    "timeline": "24-48 hours for the code correction, then 5-7 business days for insurance reprocessing",
+    "status": "submitted"
+  },
+  "analysis": "I submitted correction CORR-7F3A21 for BILL-90421, changing procedure code 99214 to 99214-25 so the E&M service is recognized as separately identifiable. The code correction typically completes within 24-48 hours; the claim will then be resubmitted to Blue Cross Blue Shield for reprocessing, which takes 5-7 business days. After reprocessing, insurance should cover $2,160.00 and the patient's balance will drop from $2,400.00 to $240.00, a saving of $2,160.00.",
+  "recommendations": [
+    "Hold collections on BILL-90421 until reprocessing completes",
+    "Send the patient the corrected statement once the payer responds"
+  ],
+  "references": {"correction_id": "CORR-7F3A21", "bill_id": "BILL-90421"}
+}
+```""",
+    "case_create": """```json
+{
+  "skill_used": "case-create",
+  "status": "success",
+  "findings": {
+    "case_id": "CASE-4B91C0",
+    "case_type": "billing_dispute",
+    "subject": "Billing correction for BILL-90421 (missing modifier -25)",
+    "priority": "High",
+    "status": "Open",
+    "owner": "Billing Resolution Team",
+    "linked_records": ["BILL-90421", "CORR-7F3A21"],
+    "follow_up_method": "email",
+    "follow_up_address": "maria.santos@email.com"
+  },
+  "analysis": "I opened case CASE-4B91C0 to track the billing dispute for BILL-90421 and linked correction CORR-7F3A21. Because the patient is facing a $2,400.00 charge that should be $240.00, the case is set to High priority and assigned to the Billing Resolution Team. The patient prefers email, so follow-up notifications will go to her email address on file.",
+  "recommendations": [
+    "Billing Resolution Team to confirm the payer received the corrected claim",
+    "Email the patient when reprocessing completes"
+  ],
+  "references": {"case_id": "CASE-4B91C0"}
+}
+```""",
+}
+
+AFTER = {
+    "billing_lookup": {
+        "status": "success", "skill_used": "billing_lookup",
+        "summary": "BILL-90421 charged the full $2,400.00 because 99214 was billed without modifier -25 "
+                   "and the payer rejected it; resubmitted as 99214-25 the patient owes $240.00.",
+        "references": {"patient_id": "PAT-2847", "bill_id": "BILL-90421"},
+        "billing": {"bill_id": "BILL-90421", "amount": "$2,400.00", "correct_amount": "$240.00",
+                    "procedure_code": "99214", "correct_code": "99214-25", "error": "Missing modifier -25",
+                    "provider": "Dr. Raj Patel, MD", "date": "2026-01-15", "status": "disputed"},
+        "recommendations": ["Resubmit BILL-90421 as 99214-25 and request insurance reprocessing"],
+    },
+    "insurance_verify": {
+        "status": "success", "skill_used": "insurance_verify",
+        "summary": "Active BCBS PPO coverage; cardiology is covered at 90% after a $40 copay and the "
+                   "$1,500 deductible is met, consistent with a $240.00 balance after reprocessing.",
+        "references": {"patient_id": "PAT-2847"},
+        "patient_name": "Maria Santos",
+        "insurance": {"carrier": "Blue Cross Blue Shield", "plan": "BCBS PPO",
+                      "policy_number": "BCBS-PA-9928471", "subscriber": "Maria Santos", "status": "Active",
+                      "coverage_rate": "90%", "copay": "$40.00", "deductible_met": True,
+                      "deductible_amount": "$1,500.00"},
+    },
+    "billing_correct": {
+        "status": "success", "skill_used": "billing_correct",
+        "summary": "Correction CORR-7F3A21 resubmits BILL-90421 as 99214-25; the balance drops from "
+                   "$2,400.00 to $240.00 after 5-7 business days of insurance reprocessing.",
+        "references": {"correction_id": "CORR-7F3A21", "bill_id": "BILL-90421"},
+        "correction": {"correction_id": "CORR-7F3A21", "original_amount": "$2,400.00",
+                       "corrected_amount": "$240.00", "savings": "$2,160.00",
+                       "timeline": "5-7 business days"},
+    },
+    "case_create": {
+        "status": "success", "skill_used": "case_create",
+        "summary": "Opened high-priority case CASE-4B91C0 for the BILL-90421 dispute with the Billing "
+                   "Resolution Team; the patient will be updated by email.",
+        "references": {"case_id": "CASE-4B91C0"},
+        "case": {"case_id": "CASE-4B91C0", "status": "Open", "team": "Billing Resolution Team",
+                 "priority": "High"},
+    },
+}
+
+# (skill, orchestrator cycle that called it)
+TURN = [("billing_lookup", 1), ("insurance_verify", 1), ("billing_correct", 2), ("case_create", 2)]
+CYCLES = 3  # two tool cycles and the final answer
+MESSAGE = "I was charged $2,400 for my cardiology visit (PAT-2847). That's way more than it should be."
+
+
+def tokens(text: str) -> int:
+    return len(TOKEN.findall(text))
+
+
+def turn_input_tokens(results: dict[str, str], base: int) -> int:
+    """Orchestrator input tokens over the turn: every cycle re-reads earlier results."""
+    total = 0
+    for cycle in range(1, CYCLES + 1):
+        total += base + sum(tokens(results[skill]) for skill, called in TURN if called < cycle)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--show", action="store_true", help="print the structured views")
+    args = parser.parse_args()
+
+    from agents.orchestrator.prompts import ORCHESTRATOR_SYSTEM_PROMPT
+
+    before = BEFORE
+    after = {skill: SubAgentResult.model_validate(payload).view() for skill, payload in AFTER.items()}
+    # Old-style answers still parse through the free-text fallback
+    fallback = {skill: SubAgentResult.from_text(text) for skill, text in BEFORE.items()}
+    base = tokens(ORCHESTRATOR_SYSTEM_PROMPT) + tokens(MESSAGE)
+
+    print("=" * 72)
+    print(f"ORCHESTRATOR INPUT TOKENS: {len(TURN)} sub-agent calls over {CYCLES} orchestrator cycles "
+          f"(base {base} tokens per cycle)")
+    print("=" * 72)
+    for skill, cycle in TURN:
+        reads = CYCLES - cycle
+        old, new = tokens(before[skill]), tokens(after[skill])
+        print(f"  {skill:<17} result {old:>4} -> {new:>4} tokens  x{reads} reads  "
+              f"{old * reads:>5} -> {new * reads:>5}  -{1 - new / old:.0%}")
+    old_total, new_total = turn_input_tokens(before, base), turn_input_tokens(after, base)
+    per_call_old = (old_total - base * CYCLES) / len(TURN)
+    per_call_new = (new_total - base * CYCLES) / len(TURN)
+    print(f"  {'per tool call':<17} {per_call_old:7.0f} -> {per_call_new:5.0f} orchestrator input tokens  "
+          f"-{1 - per_call_new / per_call_old:.0%}")
+    print(f"  {'whole turn':<17} {old_total:7d} -> {new_total:5d} orchestrator input tokens  "
+          f"-{1 - new_total / old_total:.0%}")
+    print(f"  free-text fallback kept every reference: "
+          f"{all(r.references for r in fallback.values())}")
+    if args.show:
+        for skill, view in after.items():
+            print(f"\n{skill}: {view}")
+        print(f"\nfallback: {json.dumps(fallback['billing_lookup'].references)}")
+
+
+if __name__ == "__main__":
+    main()
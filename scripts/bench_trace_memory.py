@@ -0,0 +1,124 @@
+"""Memory per trace event: dict events vs. slotted TraceEvents (tracemalloc).
+
+Replays the events of a long multi-tool turn (thinking with full thoughts,
+tool starts with the task, tool ends with sub-agent output) and measures the
+bytes allocated per event for:
+
+* before: a dict per event with copied 500/200-character excerpts, kept in
+  the trace list and, for streamed turns, with the frame dict in the run's
+  replay buffer next to its encoded bytes;
+* after: a slotted ``TraceEvent`` with interned strings and payloads held by
+  reference (``Excerpt``) in the trace's ring buffer or, for streamed turns,
+  only in the run's replay buffer, encoded when sent rather than kept encoded.
+
+Tool outputs and thoughts themselves are allocated up front: they live in
+the agent's conversation for the whole turn either way.
+
+Usage:
+    python -m scripts.bench_trace_memory
+    python -m scripts.bench_trace_memory --events 5000 --output-chars 4000
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+from collections import deque
+
+THOUGHT = ("The patient disputes a cardiology bill and says insurance should cover it; I need the "
+           "billing record and the insurance record, and both sub-agents can be asked in parallel. ")
+
+
+def payloads(n: int, output_chars: int) -> list[tuple[str, str]]:
+    """Distinct (kind, text) per event, as the agent would hold them."""
+    kinds = ("thinking", "tool_start", "tool_end")
+    out = []
+    for i in range(n):
+        kind = kinds[i % 3]
+        if kind == "thinking":
+            text = f"[{i}] " + THOUGHT * 3
+        elif kind == "tool_start":
+            text = f"[{i}] Look up billing records and insurance coverage for patient PAT-2847"
+        else:
+            text = (f"[{i}] " + '{"bill_id": "BILL-90421", "amount": 2400.00, "cpt": "99214"} ' * 100)[:output_chars]
+        out.append((kind, text))
+    return out
+
+
+def before(items: list[tuple[str, str]], streamed: bool):
+    """The previous TraceCollector.add: a dict per event, excerpts copied."""
+    from shared.sse import encode_frame
+
+    events, frames = [], deque(maxlen=len(items) + 1)
+    start = time.time()
+    for seq, (kind, text) in enumerate(items, 1):
+        if kind == "thinking":
+            detail, icon, data = text[:200] + "...", "💭", {"full_thought": text}
+        elif kind == "tool_start":
+            detail, icon, data = f"Request: {text[:100]}", "🔧", {"input": text}
+        else:
+            detail, icon, data = "Bill: BILL-90421 | Missing modifier -25", "✅", {
+                "output": text[:500], "visual": None, "prefetched": False}
+        event = {"type": kind, "timestamp": round(time.time() - start, 2), "agent": "ServiceNow",
+                 "title": "Billing Lookup", "detail": detail, "icon": icon, "status": "complete",
+                 "data": data}
+        events.append(event)
+        if streamed:
+            frame = {"type": "trace", "event": event}
+            frames.append((seq, frame, encode_frame(seq, frame)))
+    return events, frames
+
+
+def after(items: list[tuple[str, str]], streamed: bool):
+    """TraceCollector as it is now."""
+    from server import TraceCollector
+    from shared.runs import Run
+    from shared.tracing import Excerpt
+
+    run = Run("bench", buffer_size=len(items) + 1, grace=0) if streamed else None
+    trace = TraceCollector(run, max_events=len(items))
+    for kind, text in items:
+        if kind == "thinking":
+            trace.add_thinking("ServiceNow", text)
+        elif kind == "tool_start":
+            trace.add(kind, "ServiceNow", "Billing Lookup", f"Request: {text[:100]}", "🔧", "running",
+                      {"input": text})
+        else:
+            trace.add(kind, "ServiceNow", "Billing Lookup", "Bill: BILL-90421 | Missing modifier -25",
+                      "✅", "complete", {"output": Excerpt(text, 500), "visual": None, "prefetched": False})
+    return trace, run
+
+
+def measure(build, items, streamed: bool) -> float:
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    kept = build(items, streamed)
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del kept
+    return used / len(items)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--output-chars", type=int, default=2000, help="sub-agent output size")
+    args = parser.parse_args()
+
+    import server  # noqa: F401  (import cost outside the measurement)
+
+    items = payloads(args.events, args.output_chars)
+    print("=" * 60)
+    print(f"TRACE MEMORY: {args.events} events, sub-agent outputs of {args.output_chars} chars")
+    print("=" * 60)
+    for streamed in (False, True):
+        old = measure(before, items, streamed)
+        new = measure(after, items, streamed)
+        label = "streamed (trace + replay)" if streamed else "trace only (/api/chat)"
+        print(f"  {label:<27} before {old:7.0f} B/event  after {new:7.0f} B/event  "
+              f"-{1 - new / old:.0%}")
+
+
+if __name__ == "__main__":
+    main()
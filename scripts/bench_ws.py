@@ -0,0 +1,183 @@
+"""Chat transport benchmark: SSE per turn vs. one multiplexed WebSocket.
+
+Starts the API server with the orchestrator replaced by a stub turn that
+emits ``--events`` trace events ``--event-gap-ms`` apart, so only transport
+cost is measured. ``--sessions`` dashboard sessions each send ``--turns``
+turns back to back:
+
+* SSE: one POST /api/chat/stream per turn (httpx, keep-alive pool);
+* WebSocket: every session multiplexed over a single /ws connection.
+
+Reports TCP connections opened by the client, time to the first frame and
+to ``done`` per turn, and total wall time.
+
+Usage:
+    python -m scripts.bench_ws
+    python -m scripts.bench_ws --sessions 50 --turns 5 --events 40
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+
+def stub_app():
+    """App factory for the server process: the real API with a stub turn."""
+    import server
+
+    events = int(os.environ["BENCH_EVENTS"])
+    gap = float(os.environ["BENCH_EVENT_GAP_MS"]) / 1000
+
+    async def stub_turn(message, trace, session, deadline=None):
+        for i in range(events):
+            trace.add("tool_end" if i % 2 else "thinking", "ServiceNow", f"Step {i}",
+                      "Bill: BILL-90421 | Missing modifier -25", "✅", "complete",
+                      {"output": "BILL-90421 $2,400.00 CPT 99214 " * 8})
+            await asyncio.sleep(gap)
+        return f"Answer to: {message}"
+
+    server.run_agent_with_thinking_async = stub_turn
+    return server.app
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(args) -> tuple[subprocess.Popen, int]:
+    port = _free_port()
+    env = {**os.environ, "BENCH_EVENTS": str(args.events), "BENCH_EVENT_GAP_MS": str(args.event_gap_ms),
+           "WS_MAX_ACTIVE_RUNS": str(args.sessions)}
+    code = ("import uvicorn; uvicorn.run('scripts.bench_ws:stub_app', factory=True, "
+            f"host='127.0.0.1', port={port}, log_level='error')")
+    proc = subprocess.Popen([sys.executable, "-c", code], env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return proc, port
+
+
+async def wait_ready(port: int, timeout: float = 60):
+    import httpx
+
+    started = time.monotonic()
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() - started < timeout:
+            try:
+                if (await client.get(f"http://127.0.0.1:{port}/api/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+async def bench_sse(port: int, args) -> dict:
+    import httpx
+
+    first, total, ports = [], [], set()
+
+    async def session(client: httpx.AsyncClient, n: int):
+        for turn in range(args.turns):
+            start = time.perf_counter()
+            got_first = False
+            async with client.stream("POST", f"http://127.0.0.1:{port}/api/chat/stream",
+                                     json={"message": f"turn {turn}", "session_id": f"sse-{n}"}) as r:
+                ports.add(r.extensions["network_stream"].get_extra_info("client_addr")[1])
+                async for line in r.aiter_lines():
+                    if not line.startswith("data: "):
+                        continue
+                    if not got_first:
+                        first.append(time.perf_counter() - start)
+                        got_first = True
+            total.append(time.perf_counter() - start)
+
+    limits = httpx.Limits(max_connections=args.sessions, max_keepalive_connections=args.sessions)
+    async with httpx.AsyncClient(timeout=60, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(session(client, n) for n in range(args.sessions)))
+        wall = time.perf_counter() - started
+    return {"connections": len(ports), "first": first, "total": total, "wall": wall}
+
+
+async def bench_ws(port: int, args) -> dict:
+    import websockets
+
+    first, total = [], []
+    pending: dict[str, asyncio.Future] = {}
+    started_at: dict[str, float] = {}
+    seen_first: set[str] = set()
+
+    async with websockets.connect(f"ws://127.0.0.1:{port}/ws", max_size=None) as ws:
+        async def reader():
+            async for message in ws:
+                for envelope in json.loads(message):
+                    session_id = envelope.get("session_id")
+                    if session_id not in started_at:
+                        continue
+                    if session_id not in seen_first:
+                        seen_first.add(session_id)
+                        first.append(time.perf_counter() - started_at[session_id])
+                    if envelope["frame"]["type"] == "done":
+                        total.append(time.perf_counter() - started_at.pop(session_id))
+                        pending.pop(session_id).set_result(None)
+
+        async def session(n: int):
+            session_id = f"ws-{n}"
+            for turn in range(args.turns):
+                done = pending[session_id] = asyncio.get_running_loop().create_future()
+                seen_first.discard(session_id)
+                started_at[session_id] = time.perf_counter()
+                await ws.send(json.dumps({"type": "chat", "session_id": session_id,
+                                          "message": f"turn {turn}"}))
+                await done
+
+        read_task = asyncio.create_task(reader())
+        started = time.perf_counter()
+        await asyncio.gather(*(session(n) for n in range(args.sessions)))
+        wall = time.perf_counter() - started
+        read_task.cancel()
+    return {"connections": 1, "first": first, "total": total, "wall": wall}
+
+
+def _report(name: str, r: dict):
+    def ms(values, q):
+        values = sorted(values)
+        return values[min(len(values) - 1, int(len(values) * q))] * 1000
+
+    print(f"  {name:<10} connections {r['connections']:>4}  "
+          f"first frame p50 {statistics.median(r['first']) * 1000:6.1f}ms p99 {ms(r['first'], 0.99):6.1f}ms  "
+          f"turn p50 {statistics.median(r['total']) * 1000:6.0f}ms p99 {ms(r['total'], 0.99):6.0f}ms  "
+          f"wall {r['wall']:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=30)
+    parser.add_argument("--turns", type=int, default=3, help="turns per session, back to back")
+    parser.add_argument("--events", type=int, default=20, help="trace events per turn")
+    parser.add_argument("--event-gap-ms", type=float, default=5)
+    args = parser.parse_args()
+
+    print("=" * 72)
+    print(f"CHAT TRANSPORT: {args.sessions} sessions x {args.turns} turns, "
+          f"{args.events} events per turn {args.event_gap_ms:g} ms apart")
+    print("=" * 72)
+    proc, port = start_server(args)
+    try:
+        asyncio.run(wait_ready(port))
+        _report("SSE", asyncio.run(bench_sse(port, args)))
+        _report("WebSocket", asyncio.run(bench_ws(port, args)))
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
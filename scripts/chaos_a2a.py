@@ -0,0 +1,193 @@
+"""Chaos test of the A2A client's circuit breakers, hedging and failover.
+
+Starts local stand-in A2A servers (no models, no AWS) that answer after an
+injected latency, and drives sub-agent calls through the real A2A path in
+``agents.orchestrator.a2a_tools`` while faults are injected into some
+replicas:
+
+* ``baseline``    two healthy replicas
+* ``slow-tail``   one replica answers 10% of calls after ``--slow-seconds``
+* ``hung``        one replica stops answering mid-run
+* ``down``        one replica returns HTTP 500 for every call
+* ``outage``      every replica fails; calls should get the degraded answer fast
+
+For each scenario it reports call latency, breaker trips, hedged calls,
+failovers and degraded answers.
+
+Usage:
+    python -m scripts.chaos_a2a
+    python -m scripts.chaos_a2a --calls 300 --concurrency 16 --scenarios slow-tail hung
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import statistics
+import threading
+import time
+
+os.environ["AGENT_MODE"] = "a2a"
+os.environ.setdefault("A2A_BREAKER_OPEN_SECONDS", "2")
+os.environ.setdefault("A2A_BREAKER_SLOW_SECONDS", "2")
+os.environ.setdefault("A2A_TIMEOUT_SECONDS", "5")
+os.environ.setdefault("A2A_HEDGE_MIN_SECONDS", "0.05")
+
+SCENARIOS = ["baseline", "slow-tail", "hung", "down", "outage"]
+
+
+class Fault:
+    """Mutable fault settings of one stand-in replica."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.slow_fraction = 0.0
+        self.slow_seconds = 0.0
+        self.hung = False
+        self.failing = False
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_replica(fault: Fault, rng: random.Random) -> str:
+    """Serve a stand-in A2A agent on a background thread; returns its URL."""
+    import uvicorn
+    from a2a.server.agent_execution import AgentExecutor
+    from a2a.server.apps import A2AStarletteApplication
+    from a2a.server.request_handlers import DefaultRequestHandler
+    from a2a.server.tasks import InMemoryTaskStore
+    from a2a.types import AgentCapabilities, AgentCard
+    from a2a.utils import new_agent_text_message
+    from starlette.middleware.base import BaseHTTPMiddleware
+    from starlette.responses import PlainTextResponse
+
+    class StandIn(AgentExecutor):
+        async def execute(self, context, event_queue):
+            if fault.hung:
+                await asyncio.sleep(3600)
+            slow = rng.random() < fault.slow_fraction
+            await asyncio.sleep(fault.slow_seconds if slow else fault.latency)
+            await event_queue.enqueue_event(new_agent_text_message(
+                f"Billing records for PAT-2847: BILL-90421 $2,400.00 ({context.get_user_input()[:30]})"))
+
+        async def cancel(self, context, event_queue):
+            pass
+
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}"
+    card = AgentCard(name="Stand-in Agent", description="Chaos test stand-in", url=url + "/",
+                     version="0.0.1", capabilities=AgentCapabilities(streaming=False),
+                     default_input_modes=["text"], default_output_modes=["text"], skills=[])
+    app = A2AStarletteApplication(card, DefaultRequestHandler(StandIn(), InMemoryTaskStore())).build()
+
+    async def inject_errors(request, call_next):
+        if fault.failing and request.method == "POST":
+            return PlainTextResponse("injected failure", status_code=500)
+        return await call_next(request)
+
+    app.add_middleware(BaseHTTPMiddleware, dispatch=inject_errors)
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="error"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return url
+
+
+async def run_scenario(name: str, urls: list[str], faults: list[Fault], calls: int,
+                       concurrency: int, slow_seconds: float) -> dict:
+    from agents.orchestrator import a2a_tools
+    from shared import metrics
+
+    a2a_tools._endpoint_group.cache_clear()  # fresh breakers and latency per scenario
+    os.environ["SERVICENOW_AGENT_URL"] = ",".join(urls)
+    for fault in faults:
+        fault.slow_fraction, fault.hung, fault.failing = 0.0, False, False
+        fault.slow_seconds = slow_seconds
+    before = metrics.snapshot()["counters"]
+
+    latencies: list[float] = []
+    degraded = errors = 0
+    issued = 0
+
+    async def worker():
+        nonlocal degraded, errors, issued
+        while issued < calls:
+            issued += 1
+            if issued == calls // 4:  # faults start once latency history exists
+                if name == "slow-tail":
+                    faults[0].slow_fraction = 0.1
+                elif name == "hung":
+                    faults[0].hung = True
+                elif name == "down":
+                    faults[0].failing = True
+                elif name == "outage":
+                    for fault in faults:
+                        fault.failing = True
+            start = time.perf_counter()
+            try:
+                output = await a2a_tools._run_agent_async(
+                    "servicenow", f"Look up billing records for patient PAT-2847 (call {issued})")
+                degraded += output.status == "unavailable"
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    after = metrics.snapshot()["counters"]
+
+    def delta(key: str) -> float:
+        return after.get(key, 0) - before.get(key, 0)
+
+    latencies.sort()
+    return {
+        "calls": len(latencies),
+        "seconds": elapsed,
+        "p50": statistics.median(latencies),
+        "p99": latencies[max(0, int(len(latencies) * 0.99) - 1)],
+        "max": latencies[-1],
+        "errors": errors,
+        "degraded": degraded,
+        "hedged": delta("resilience.hedged"),
+        "backup_wins": delta("resilience.backup_wins"),
+        "failovers": delta("resilience.failovers"),
+        "breaker_trips": delta("resilience.breaker_opened"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--replicas", type=int, default=2)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.05, help="normal reply latency (s)")
+    parser.add_argument("--slow-seconds", type=float, default=1.5)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    faults = [Fault(args.latency) for _ in range(args.replicas)]
+    urls = [start_replica(fault, rng) for fault in faults]
+
+    print("=" * 72)
+    print(f"A2A CHAOS: {args.replicas} stand-in replicas, {args.calls} calls x{args.concurrency}")
+    print("=" * 72)
+    print(f"{'scenario':<11} {'p50':>7} {'p99':>7} {'max':>7} {'errors':>7} {'degraded':>9} "
+          f"{'hedged':>7} {'backup':>7} {'failover':>9} {'trips':>6}")
+    for name in args.scenarios:
+        r = asyncio.run(run_scenario(name, urls, faults, args.calls, args.concurrency,
+                                     args.slow_seconds))
+        print(f"{name:<11} {r['p50']:>6.3f}s {r['p99']:>6.3f}s {r['max']:>6.2f}s {r['errors']:>7} "
+              f"{r['degraded']:>9} {r['hedged']:>7.0f} {r['backup_wins']:>7.0f} "
+              f"{r['failovers']:>9.0f} {r['breaker_trips']:>6.0f}")
+
+
+if __name__ == "__main__":
+    main()
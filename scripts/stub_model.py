@@ -0,0 +1,71 @@
+"""Strands model stand-in for the offline benchmarks (no AWS calls).
+
+``StubModel`` answers every model call with the stream events its ``reply``
+callable builds from the messages and system prompt; ``text`` and
+``tool_use`` build the two kinds of turn the benchmarks need. Import it
+inside the functions that build agents, so ``--help`` works without strands.
+"""
+
+import asyncio
+import json
+import uuid
+from typing import Callable
+
+from strands.models.model import Model
+
+Reply = Callable[[list, str | None], list[dict]]
+
+
+def text(answer: str, input_tokens: int, output_tokens: int, latency_ms: int = 0) -> list[dict]:
+    """Stream events of an assistant turn that answers in text."""
+    return [
+        {"messageStart": {"role": "assistant"}},
+        {"contentBlockDelta": {"delta": {"text": answer}}},
+        {"contentBlockStop": {}},
+        {"messageStop": {"stopReason": "end_turn"}},
+        _metadata(input_tokens, output_tokens, latency_ms),
+    ]
+
+
+def tool_use(name: str, tool_input: dict, input_tokens: int, output_tokens: int,
+             latency_ms: int = 0) -> list[dict]:
+    """Stream events of an assistant turn that calls one tool."""
+    return [
+        {"messageStart": {"role": "assistant"}},
+        {"contentBlockStart": {"start": {"toolUse": {"toolUseId": uuid.uuid4().hex, "name": name}}}},
+        {"contentBlockDelta": {"delta": {"toolUse": {"input": json.dumps(tool_input)}}}},
+        {"contentBlockStop": {}},
+        {"messageStop": {"stopReason": "tool_use"}},
+        _metadata(input_tokens, output_tokens, latency_ms),
+    ]
+
+
+def _metadata(input_tokens: int, output_tokens: int, latency_ms: int) -> dict:
+    return {"metadata": {"usage": {"inputTokens": input_tokens, "outputTokens": output_tokens,
+                                   "totalTokens": input_tokens + output_tokens},
+                         "metrics": {"latencyMs": latency_ms}}}
+
+
+class StubModel(Model):
+    """Replies with ``reply(messages, system_prompt)`` after ``latency`` seconds."""
+
+    def __init__(self, reply: Reply, latency: float = 0.0):
+        self.reply = reply
+        self.latency = latency
+        self.config = {"model_id": "stub"}
+
+    def update_config(self, **kwargs):
+        self.config.update(kwargs)
+
+    def get_config(self):
+        return self.config
+
+    async def structured_output(self, *args, **kwargs):
+        raise NotImplementedError
+        yield
+
+    async def stream(self, messages, tool_specs=None, system_prompt=None, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        for event in self.reply(messages, system_prompt):
+            yield event
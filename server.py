@@ -1,21 +1,56 @@
 """API server with real-time streaming, thinking, memory, and full observability."""
 
-import json
 import uuid
 import time
 import asyncio
-import queue
-import threading
 import re
+from collections import deque
 from datetime import datetime
 from typing import Optional
-from fastapi import FastAPI, HTTPException
+from contextlib import ExitStack, asynccontextmanager, nullcontext
+from fastapi import FastAPI, HTTPException, Header, Request, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.responses import FileResponse, StreamingResponse, PlainTextResponse
 from pydantic import BaseModel
 
-app = FastAPI(title="AgentCore CX Demo")
+from shared.config import (
+    PROFILING_ENABLED, PROFILING_INTERVAL_MS, PREFORK_WARMUP, SERVER_WORKERS, SPECULATIVE_PREFETCH,
+    BATCH_CONCURRENCY, BATCH_MAX_CONCURRENCY, BATCH_MAX_ITEMS, BATCH_MAX_JOBS,
+    REQUEST_DEADLINE_SECONDS, RUN_REPLAY_BUFFER, RUN_RECONNECT_GRACE_SECONDS, RUN_RETENTION_SECONDS,
+    SSE_CLIENT_MAX_LAG, SSE_COALESCE_MS, SSE_GZIP, WS_MAX_ACTIVE_RUNS, TRACE_MAX_EVENTS,
+    RESPONSE_CACHE_ENABLED, RESPONSE_CACHE_THRESHOLD, RESPONSE_CACHE_TTL_SECONDS,
+    RESPONSE_CACHE_MAX_ENTRIES, PATIENT_VIEW_ENABLED,
+)
+from shared import metrics
+from shared.contracts import SubAgentResult
+from shared.deadline import Deadline, DeadlineExceeded, RequestCancelled, current_deadline
+from shared.batch import BatchManager, batch_stats, parse_jsonl, stream_results
+from shared.profiling import SamplingProfiler
+from shared.response_cache import CachedTurn, ResponseCache
+from shared.runs import Run, RunRegistry
+from shared.singleflight import SingleFlight
+from shared.sse import stream_run
+from shared.tracing import Excerpt, TraceEvent
+from shared.turns import SessionTurns, turn_key
+from shared.ws import ChatMultiplexer
+
+if PREFORK_WARMUP:
+    # Load strands and mock data before workers fork so they share the pages
+    # (gunicorn --preload; uvicorn's workers are spawned and import afresh)
+    from agents.warmup import warm_up
+    warm_up(freeze=True)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Open the patient views (mock data, record store files) in each worker,
+    # off the event loop, rather than inside the first chat turn
+    await asyncio.to_thread(_patient_views)
+    yield
+
+
+app = FastAPI(title="AgentCore CX Demo", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -76,12 +111,18 @@ def get_or_create_session(session_id: Optional[str]) -> ConversationSession:
 class TraceCollector:
     """Collects trace events with timing and token metrics."""
 
-    def __init__(self):
-        self.events: list[dict] = []
+    def __init__(self, run: Run | None = None, max_events: int = TRACE_MAX_EVENTS):
+        # Ring buffer: a runaway turn keeps its latest events, not all of them. A
+        # streamed turn publishes each event to its run instead, and the run's
+        # replay buffer is the only copy.
+        self._events: deque[TraceEvent] | None = deque(maxlen=max_events) if run is None else None
+        self.events_dropped = 0
         self.start_time = time.time()
-        self.queue = queue.Queue()
+        self.run = run
         self.timings: dict[str, float] = {}
         self.tokens = {"input": 0, "output": 0}
+        self.model_calls: dict[str, dict] = {}  # Sub-agent usage per model tier
+        self.speculation: dict | None = None
         self._timing_stack: list[tuple[str, float]] = []
 
     def elapsed(self) -> float:
@@ -97,29 +138,46 @@ class TraceCollector:
                 self._timing_stack.pop(i)
                 break
 
+    def add_timing(self, label: str, seconds: float):
+        self.timings[label] = self.timings.get(label, 0) + seconds
+
+    def record_model_call(self, tier: str, seconds: float, input_tokens: int,
+                          output_tokens: int, cost: float):
+        stats = self.model_calls.setdefault(
+            tier, {"calls": 0, "seconds": 0.0, "input_tokens": 0, "output_tokens": 0, "cost": 0.0})
+        stats["calls"] += 1
+        stats["seconds"] = round(stats["seconds"] + seconds, 3)
+        stats["input_tokens"] += input_tokens
+        stats["output_tokens"] += output_tokens
+        stats["cost"] = round(stats["cost"] + cost, 5)
+
     def add_tokens(self, input_tokens: int, output_tokens: int):
         self.tokens["input"] += input_tokens
         self.tokens["output"] += output_tokens
 
-    def add(self, event_type: str, agent: str, title: str, detail: str = "",
+    def add(self, event_type: str, agent: str, title: str, detail: str | Excerpt = "",
             icon: str = "⚡", status: str = "running", data: dict = None):
-        event = {
-            "type": event_type,
-            "timestamp": self.elapsed(),
-            "agent": agent,
-            "title": title,
-            "detail": detail,
-            "icon": icon,
-            "status": status,
-            "data": data  # For expandable JSON view
-        }
-        self.events.append(event)
-        self.queue.put(event)
+        # data is for the expandable JSON view; large values go in as Excerpts
+        event = TraceEvent(event_type, self.elapsed(), agent, title, detail, icon, status, data)
+        full = self.run.full if self.run is not None else len(self._events) == self._events.maxlen
+        if full:
+            self.events_dropped += 1
+            metrics.incr("trace.events_dropped")
+        if self.run is not None:
+            self.run.publish({"type": "trace", "event": event})
+        else:
+            self._events.append(event)
+
+    @property
+    def events(self) -> list[TraceEvent]:
+        if self.run is None:
+            return list(self._events)
+        frames, _ = self.run.since(0)
+        return [f.frame["event"] for f in frames if f.frame["type"] == "trace"]
 
     def add_thinking(self, agent: str, thought: str):
         """Add agent reasoning/thinking event."""
-        self.add("thinking", agent, "Reasoning",
-                thought[:200] + "..." if len(thought) > 200 else thought,
+        self.add("thinking", agent, "Reasoning", Excerpt(thought, 200, "..."),
                 "💭", "info", {"full_thought": thought})
 
     def get_summary(self) -> dict:
@@ -128,76 +186,89 @@ class TraceCollector:
         # Estimate cost (Claude Sonnet pricing approximation)
         input_cost = (self.tokens["input"] / 1000) * 0.003
         output_cost = (self.tokens["output"] / 1000) * 0.015
+        subagent_cost = sum(t["cost"] for t in self.model_calls.values())
         return {
             "total_time": total_time,
             "timings": self.timings,
             "tokens": self.tokens,
-            "estimated_cost": round(input_cost + output_cost, 4)
+            "model_tiers": self.model_calls,
+            "speculation": self.speculation,
+            "events_dropped": self.events_dropped,
+            "estimated_cost": round(input_cost + output_cost + subagent_cost, 4)
         }
 
 
+# ═══════════════════════════════════════════════════════════════════
+# Profiling
+# ═══════════════════════════════════════════════════════════════════
+
+profiler = SamplingProfiler(interval=PROFILING_INTERVAL_MS / 1000)
+
+
+def profiling_scope(x_profile: str | None):
+    """Profile this request if enabled globally or via the X-Profile header."""
+    if PROFILING_ENABLED or (x_profile or "").lower() in ("1", "true", "yes"):
+        return profiler.session()
+    return nullcontext()
+
+
 # Thread-local storage for current trace
 import contextvars
-_current_trace: contextvars.ContextVar[TraceCollector | None] = contextvars.ContextVar('trace', default=None)
+from shared.tracing import current_trace as _current_trace  # shared with agent-side code
 _current_session: contextvars.ContextVar[ConversationSession | None] = contextvars.ContextVar('session', default=None)
+_current_speculator: contextvars.ContextVar = contextvars.ContextVar('speculator', default=None)
 
 
 # ═══════════════════════════════════════════════════════════════════
 # Visual Data Extraction
 # ═══════════════════════════════════════════════════════════════════
 
-def extract_visual_data(result: str, data_type: str) -> dict | None:
-    """Extract structured data for visual cards."""
-    if data_type == "billing":
-        # Extract billing info for visual card
-        bill_match = re.search(r'BILL-[A-Z0-9]+', result)
-        amount_match = re.search(r'\$[\d,]+\.?\d*', result)
-        code_match = re.search(r'99214', result)
-        return {
-            "type": "billing",
-            "bill_id": bill_match.group() if bill_match else None,
-            "amount": "$2,400.00",
-            "correct_amount": "$240.00",
-            "procedure_code": "99214",
-            "correct_code": "99214-25",
-            "error": "Missing modifier -25",
-            "provider": "Dr. Raj Patel, MD",
-            "date": "2026-01-15",
-            "status": "disputed"
-        }
-    elif data_type == "insurance":
-        return {
-            "type": "insurance",
-            "carrier": "Blue Cross Blue Shield",
-            "plan": "BCBS PPO",
-            "policy_number": "BCBS-PA-9928471",
-            "subscriber": "Maria Santos",
-            "status": "Active",
-            "coverage_rate": "90%",
-            "copay": "$40.00",
-            "deductible_met": True,
-            "deductible_amount": "$1,500.00"
-        }
-    elif data_type == "correction":
-        corr_match = re.search(r'CORR-[A-Z0-9]+', result)
-        return {
-            "type": "correction",
-            "correction_id": corr_match.group() if corr_match else "CORR-XXXXXX",
-            "original_amount": "$2,400.00",
-            "corrected_amount": "$240.00",
-            "savings": "$2,160.00",
-            "timeline": "5-7 business days"
-        }
-    elif data_type == "case":
-        case_match = re.search(r'CASE-[A-Z0-9]+', result)
-        return {
-            "type": "case",
-            "case_id": case_match.group() if case_match else "CASE-XXXXXX",
-            "status": "Open",
-            "team": "Billing Resolution Team",
-            "priority": "High"
-        }
-    return None
+def extract_visual_data(result: SubAgentResult, data_type: str) -> dict | None:
+    """Visual card data from the sub-agent's structured findings."""
+    findings = getattr(result, data_type, None)
+    if findings is None:
+        return None
+    return {"type": data_type, **findings.model_dump(mode="json", exclude_none=True)}
+
+
+# Trace titles for a finished sub-agent call, by the skill it used
+RESULT_TITLES = {
+    "billing_lookup": "Billing reviewed",
+    "billing_correct": "Correction submitted",
+    "ticket_create": "Ticket created",
+    "appointment_schedule": "Appointment scheduled",
+    "patient_lookup": "Patient found",
+    "insurance_verify": "Insurance verified",
+    "care_history": "Care history retrieved",
+    "case_create": "Case created",
+}
+REFERENCE_LABELS = {"bill_id": "Bill", "correction_id": "Reference", "ticket_id": "Ticket",
+                    "case_id": "Case", "appointment_id": "Appointment"}
+
+
+def describe_result(result: SubAgentResult) -> tuple[str, list[str]]:
+    """Trace title and detail items for a sub-agent result."""
+    if result.status != "success":
+        return ("Agent unavailable" if result.status == "unavailable" else "Task failed"), []
+    details = [f"{REFERENCE_LABELS[kind]}: {ref}" for kind, ref in result.references.items()
+               if kind in REFERENCE_LABELS]
+    if result.billing:
+        if result.billing.amount:
+            details.append(f"Amount: {result.billing.amount}")
+        if result.billing.correct_code and result.billing.correct_code != result.billing.procedure_code:
+            details.append(f"Code: {result.billing.procedure_code} → {result.billing.correct_code}")
+        if result.billing.error:
+            details.append(result.billing.error)
+    if result.insurance:
+        details.append(f"Status: {result.insurance.status}")
+        details.append(f"Carrier: {result.insurance.plan or result.insurance.carrier}")
+        if result.insurance.deductible_met:
+            details.append("Deductible: Met")
+        if result.insurance.coverage_rate:
+            details.append(f"Coverage: {result.insurance.coverage_rate}")
+    if result.patient_name:
+        details.append(f"Patient: {result.patient_name}")
+    return RESULT_TITLES.get(result.skill_used, "Completed"), details
 
 
 # ═══════════════════════════════════════════════════════════════════
@@ -206,12 +277,11 @@ def extract_visual_data(result: str, data_type: str) -> dict | None:
 
 def create_traced_tools():
     """Create agent tools with full tracing and visual data extraction."""
-    from agents.servicenow.agent import servicenow_agent
-    from agents.salesforce.agent import salesforce_agent
+    from agents.orchestrator.a2a_tools import call_agent_async
     from strands import tool
 
     @tool
-    def servicenow_agent_tool(task: str) -> str:
+    async def servicenow_agent_tool(task: str) -> str:
         """Send a task to the ServiceNow AI Agent for billing, tickets, or appointments.
 
         Args:
@@ -241,51 +311,31 @@ def create_traced_tools():
                      f"Request: {task[:100]}{'...' if len(task) > 100 else ''}",
                      "🔧", "running", {"input": task})
 
-        result = str(servicenow_agent(task))
+        speculator = _current_speculator.get()
+        result = await speculator.take("servicenow", task) if speculator else None
+        prefetched = result is not None
+        if not prefetched:
+            result = await call_agent_async("servicenow", task)
 
-        # Extract visual data
         visual_data = extract_visual_data(result, visual_type) if visual_type else None
+        if session and "correction_id" in result.references:
+            session.patient_context["correction_id"] = result.references["correction_id"]
 
-        # Extract summary
-        summary = "Completed"
-        details = []
-
-        if "CORR-" in result:
-            match = re.search(r'CORR-[A-Z0-9]+', result)
-            if match:
-                summary = "Correction submitted"
-                details.append(f"Reference: {match.group()}")
-                if session:
-                    session.patient_context["correction_id"] = match.group()
-        if "BILL-" in result:
-            match = re.search(r'BILL-[A-Z0-9]+', result)
-            if match:
-                details.append(f"Bill: {match.group()}")
-            summary = "Found billing issue"
-        if "TKT-" in result:
-            match = re.search(r'TKT-[A-Z0-9]+', result)
-            if match:
-                summary = "Ticket created"
-                details.append(f"Ticket: {match.group()}")
-        if "$2,400" in result or "2400" in result:
-            details.append("Amount: $2,400")
-        if "99214" in result:
-            details.append("Code: 99214 → 99214-25")
-        if "modifier" in result.lower():
-            summary = "Found coding error"
-            details.append("Missing modifier -25")
-
+        summary, details = describe_result(result)
+        if prefetched:
+            details.append("Prefetched")
         if trace:
             trace.end_timing("servicenow")
             trace.add("tool_end", "ServiceNow", summary,
-                     " | ".join(details) if details else "Task completed successfully",
-                     "✅", "complete",
-                     {"output": result[:500], "visual": visual_data})
+                     " | ".join(details) if details else result.summary[:100],
+                     "✅" if result.status == "success" else "⚠️", "complete",
+                     {"output": Excerpt(result.summary, 500), "visual": visual_data,
+                      "prefetched": prefetched})
 
-        return result
+        return result.view()
 
     @tool
-    def salesforce_agent_tool(task: str) -> str:
+    async def salesforce_agent_tool(task: str) -> str:
         """Send a task to the Salesforce Agent for patient data, insurance, or cases.
 
         Args:
@@ -314,51 +364,34 @@ def create_traced_tools():
                      f"Request: {task[:100]}{'...' if len(task) > 100 else ''}",
                      "👤", "running", {"input": task})
 
-        result = str(salesforce_agent(task))
+        speculator = _current_speculator.get()
+        result = await speculator.take("salesforce", task) if speculator else None
+        prefetched = result is not None
+        if not prefetched:
+            result = await call_agent_async("salesforce", task)
 
-        # Extract visual data
         visual_data = extract_visual_data(result, visual_type) if visual_type else None
 
         # Update session with patient context
         if session:
-            if "Maria" in result:
-                session.patient_context["patient_name"] = "Maria Santos"
-            if "PAT-2847" in result:
-                session.patient_context["patient_id"] = "PAT-2847"
-
-        # Extract summary
-        summary = "Completed"
-        details = []
-
-        if "CASE-" in result:
-            match = re.search(r'CASE-[A-Z0-9]+', result)
-            if match:
-                summary = "Case created"
-                details.append(f"Case: {match.group()}")
-                if session:
-                    session.patient_context["case_id"] = match.group()
-        if "active" in result.lower() and "insurance" in result.lower():
-            summary = "Insurance verified"
-            details.append("Status: Active")
-        if "BCBS" in result or "Blue Cross" in result:
-            details.append("Carrier: BCBS PPO")
-        if "deductible" in result.lower() and "met" in result.lower():
-            details.append("Deductible: Met")
-        if "90%" in result:
-            details.append("Coverage: 90%")
-        if "$240" in result:
-            details.append("Patient owes: $240")
-        if "Maria" in result:
-            details.append("Patient: Maria Santos")
-
+            if result.patient_name:
+                session.patient_context["patient_name"] = result.patient_name
+            for kind in ("patient_id", "case_id"):
+                if kind in result.references:
+                    session.patient_context[kind] = result.references[kind]
+
+        summary, details = describe_result(result)
+        if prefetched:
+            details.append("Prefetched")
         if trace:
             trace.end_timing("salesforce")
             trace.add("tool_end", "Salesforce", summary,
-                     " | ".join(details) if details else "Task completed successfully",
-                     "✅", "complete",
-                     {"output": result[:500], "visual": visual_data})
+                     " | ".join(details) if details else result.summary[:100],
+                     "✅" if result.status == "success" else "⚠️", "complete",
+                     {"output": Excerpt(result.summary, 500), "visual": visual_data,
+                      "prefetched": prefetched})
 
-        return result
+        return result.view()
 
     return servicenow_agent_tool, salesforce_agent_tool
 
@@ -367,27 +400,43 @@ def create_traced_tools():
 # Agent Runner with Thinking Stream
 # ═══════════════════════════════════════════════════════════════════
 
-def run_agent_with_thinking(message: str, trace: TraceCollector, session: ConversationSession) -> str:
-    """Run the orchestrator agent with thinking stream and memory."""
-    _current_trace.set(trace)
-    _current_session.set(session)
+def _patient_views():
+    """The materialized patient views, when this process holds both systems' records."""
+    if not PATIENT_VIEW_ENABLED:
+        return None
+    from agents.orchestrator.a2a_tools import AGENT_MODE
+    if AGENT_MODE != "direct":
+        return None
+    from shared.patient_view import patient_views
+    return patient_views()
+
 
+def _prepare_turn(message: str, trace: TraceCollector, session: ConversationSession):
+    """Build the orchestrator for one turn and emit the opening trace events."""
     from strands import Agent
-    from strands.models.bedrock import BedrockModel
-    from shared.config import BEDROCK_MODEL_ID, AWS_REGION
+    from shared.bedrock import create_bedrock_model
+    from shared.config import ORCHESTRATOR_MODEL_TIER
+    from shared.model_router import MODEL_TIERS
     from agents.orchestrator.prompts import ORCHESTRATOR_SYSTEM_PROMPT
 
     servicenow_tool, salesforce_tool = create_traced_tools()
 
-    model = BedrockModel(
-        model_id=BEDROCK_MODEL_ID,
-        region_name=AWS_REGION,
-    )
+    model = create_bedrock_model(MODEL_TIERS[ORCHESTRATOR_MODEL_TIER])
+
+    # Extract patient ID from message if present
+    pat_match = re.search(r'PAT-\d+', message)
+    if pat_match:
+        session.patient_context["patient_id"] = pat_match.group()
 
     # Add conversation context to the prompt
     context_prompt = ""
     if session.patient_context:
         context_prompt = f"\n\n[CONVERSATION CONTEXT: {session.get_context_summary()}]"
+    views = _patient_views()
+    summary = views and session.patient_context.get("patient_id") and views.summary(
+        session.patient_context["patient_id"])
+    if summary:
+        context_prompt += f"\n[PATIENT SUMMARY: {summary}]"
 
     # Build conversation history for the agent
     history_prompt = ""
@@ -409,11 +458,6 @@ def run_agent_with_thinking(message: str, trace: TraceCollector, session: Conver
         tools=[servicenow_tool, salesforce_tool],
     )
 
-    # Extract patient ID from message if present
-    pat_match = re.search(r'PAT-\d+', message)
-    if pat_match:
-        session.patient_context["patient_id"] = pat_match.group()
-
     trace.start_timing("orchestrator")
     trace.add("orchestrator_start", "Orchestrator", "Analyzing request",
               f'"{message[:60]}{"..." if len(message) > 60 else ""}"',
@@ -437,10 +481,12 @@ def run_agent_with_thinking(message: str, trace: TraceCollector, session: Conver
             "Patient wants to schedule an appointment. I'll check ServiceNow for available slots "
             "and find options that match their preferences.")
 
-    # Run the agent
-    result = agent(message)
-    result_str = str(result)
+    return agent, enhanced_prompt
+
 
+def _finish_turn(message: str, result_str: str, enhanced_prompt: str,
+                 trace: TraceCollector, session: ConversationSession) -> str:
+    """Record token estimates, close the trace, and update the session."""
     # Estimate tokens (rough approximation)
     input_tokens = len(message.split()) * 2 + len(enhanced_prompt.split())
     output_tokens = len(result_str.split()) * 2
@@ -459,6 +505,91 @@ def run_agent_with_thinking(message: str, trace: TraceCollector, session: Conver
     return result_str
 
 
+async def run_agent_with_thinking_async(message: str, trace: TraceCollector,
+                                        session: ConversationSession,
+                                        deadline: Deadline | None = None) -> str:
+    """Run the orchestrator agent on the current event loop (no worker thread).
+
+    Raises ``RequestCancelled`` (or ``DeadlineExceeded``) if ``deadline`` is
+    cancelled before the turn completes; the turn is then not recorded.
+    """
+    _current_trace.set(trace)
+    _current_session.set(session)
+    deadline = deadline or Deadline(REQUEST_DEADLINE_SECONDS)
+    current_deadline.set(deadline)
+    deadline.arm()
+    try:
+        # One turn at a time per session: they share its history and context
+        async with turns.turn(session.session_id) as waited:
+            if waited:
+                trace.add_timing("session_wait", waited)
+                trace.add("session_wait", "Orchestrator", "Waited for previous turn",
+                          f"Queued {waited:.2f}s behind an earlier message in this conversation",
+                          "⏳", "complete", {"wait_seconds": round(waited, 3)})
+            # Only the opening message of a conversation stands on its own: a
+            # follow-up ("what does that mean?") depends on history the cached
+            # answer was not given, and its answer on history others lack
+            standalone = not session.messages and not session.patient_context
+            cached = response_cache.lookup(message) if RESPONSE_CACHE_ENABLED and standalone else None
+            if cached:
+                return _answer_from_cache(message, *cached, trace, session)
+            started = time.monotonic()
+            agent, enhanced_prompt = _prepare_turn(message, trace, session)
+            speculator = _start_speculation(message, trace) if SPECULATIVE_PREFETCH else None
+            try:
+                result = await agent.invoke_async(message, cancel_signal=deadline.signal)
+                if deadline.cancelled:
+                    raise deadline.error()
+            finally:
+                if speculator:
+                    trace.speculation = await speculator.finish()
+            # ...and is general if no patient came up and no sub-agent was called
+            if (RESPONSE_CACHE_ENABLED and standalone and not session.patient_context
+                    and not any(event.type == "tool_start" for event in trace.events)):
+                response_cache.store(message, str(result), time.monotonic() - started)
+            return _finish_turn(message, str(result), enhanced_prompt, trace, session)
+    finally:
+        deadline.disarm()
+        deadline.record_stop()
+
+
+def _answer_from_cache(message: str, entry: CachedTurn, similarity: float,
+                       trace: TraceCollector, session: ConversationSession) -> str:
+    """Answer a general question with the cached response to a similar one."""
+    trace.add("cache_hit", "Orchestrator", "Answered from cache",
+              f'Same question as "{entry.question[:60]}" (similarity {similarity:.2f})',
+              "⚡", "complete", {"cached_question": entry.question, "similarity": round(similarity, 3),
+                                "original_seconds": round(entry.latency, 2)})
+    response_cache.record_saving(entry, trace.elapsed())
+    session.add_message("user", message)
+    session.add_message("assistant", entry.response)
+    return entry.response
+
+
+def _start_speculation(message: str, trace: TraceCollector):
+    """Prefetch the sub-agent lookups this message will most likely need."""
+    from agents.orchestrator.a2a_tools import call_agent_async
+    from agents.orchestrator.speculation import Speculator
+
+    speculator = Speculator(call_agent_async)
+    _current_speculator.set(speculator)
+    for agent_name, intent, patient_id in speculator.start(message):
+        trace.add("speculation", "ServiceNow" if agent_name == "servicenow" else "Salesforce",
+                  "Prefetching " + intent.replace("_", " "), f"Speculative call for {patient_id}",
+                  "🔮", "info", {"intent": intent, "patient_id": patient_id})
+    return speculator
+
+
+def run_agent_with_thinking(message: str, trace: TraceCollector, session: ConversationSession) -> str:
+    """Run the orchestrator agent with thinking stream and memory."""
+    _current_trace.set(trace)
+    _current_session.set(session)
+
+    agent, enhanced_prompt = _prepare_turn(message, trace, session)
+    result = agent(message)
+    return _finish_turn(message, str(result), enhanced_prompt, trace, session)
+
+
 # ═══════════════════════════════════════════════════════════════════
 # API Endpoints
 # ═══════════════════════════════════════════════════════════════════
@@ -468,79 +599,251 @@ class ChatRequest(BaseModel):
     session_id: str | None = None
 
 
-@app.post("/api/chat/stream")
-async def chat_stream(request: ChatRequest):
-    """Stream chat response with real-time trace events via SSE."""
-    session = get_or_create_session(request.session_id)
-    trace = TraceCollector()
-    result_holder = {"response": None, "error": None}
+runs = RunRegistry(RUN_REPLAY_BUFFER, RUN_RECONNECT_GRACE_SECONDS, RUN_RETENTION_SECONDS)
+metrics.register_provider("runs", runs.stats)
+turns = SessionTurns()
+metrics.register_provider("turns", turns.stats)
+response_cache = ResponseCache(RESPONSE_CACHE_THRESHOLD, RESPONSE_CACHE_TTL_SECONDS,
+                               RESPONSE_CACHE_MAX_ENTRIES)
+metrics.register_provider("response_cache", response_cache.stats)
 
-    def run_in_thread():
+
+def _sse_frames(run: Run, last_event_id: int, accept_encoding: str | None = None):
+    """SSE stream of a run's frames after ``last_event_id``, ids included."""
+    gzip = SSE_GZIP and "gzip" in (accept_encoding or "")
+    headers = {"Cache-Control": "no-cache", "Connection": "keep-alive", "X-Run-ID": run.run_id}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        stream_run(run, last_event_id, poll=SSE_COALESCE_MS / 1000, max_lag=SSE_CLIENT_MAX_LAG,
+                   gzip=gzip),
+        media_type="text/event-stream",
+        headers=headers
+    )
+
+
+def _start_run(message: str, session: ConversationSession, x_profile: str | None = None) -> Run:
+    """Start a turn as a resumable run; its frames are published as they happen.
+
+    Returns the run already in flight if this session is answering the same
+    message; otherwise the new turn queues behind the session's earlier ones.
+    """
+    key = turn_key(session.session_id, message)
+    existing = turns.attach(key)
+    if existing is not None:
+        return existing
+    run = runs.create(session.session_id)
+    turns.track(key, run)
+    trace = TraceCollector(run)
+    deadline = run.deadline = Deadline(REQUEST_DEADLINE_SECONDS)
+    # Nobody reattached within the grace period: stop the agents working for it
+    run.on_abandoned = lambda: deadline.cancel("client_disconnected")
+    run.publish({"type": "run", "run_id": run.run_id, "session_id": session.session_id})
+
+    async def run_turn():
+        response = error = None
+        # Opened by the task itself, so a turn that never starts never holds a profiling session
+        profiling = ExitStack()
         try:
-            result_holder["response"] = run_agent_with_thinking(
-                request.message, trace, session
-            )
+            profiling.enter_context(profiling_scope(x_profile))
+            response = await run_agent_with_thinking_async(message, trace, session, deadline)
+        except RequestCancelled as e:
+            error = ("The request took too long and was stopped."
+                     if isinstance(e, DeadlineExceeded) else "The request was cancelled.")
         except Exception as e:
             import traceback
             traceback.print_exc()
-            result_holder["error"] = str(e)
+            error = str(e)
         finally:
-            trace.queue.put(None)
+            profiling.close()
+            if error is None and response is None:
+                error = "The request was cancelled."  # task cancelled, e.g. on shutdown
+            run.publish({"type": "metrics", "data": trace.get_summary()})
+            if error:
+                run.publish({"type": "error", "message": error})
+            else:
+                run.publish({"type": "response", "text": response, "session_id": session.session_id})
+            run.publish({"type": "done"})
+            run.finish()
+            turns.forget(key, run)
 
-    thread = threading.Thread(target=run_in_thread)
-    thread.start()
+    run.task = asyncio.create_task(run_turn())
+    return run
 
-    async def event_generator():
-        while True:
-            try:
-                event = trace.queue.get(timeout=0.1)
-                if event is None:
-                    break
-                yield f"data: {json.dumps({'type': 'trace', 'event': event})}\n\n"
-            except queue.Empty:
-                if not thread.is_alive():
-                    break
-                await asyncio.sleep(0.05)
-
-        thread.join()
-
-        # Send metrics
-        summary = trace.get_summary()
-        yield f"data: {json.dumps({'type': 'metrics', 'data': summary})}\n\n"
-
-        # Send final response
-        if result_holder["error"]:
-            yield f"data: {json.dumps({'type': 'error', 'message': result_holder['error']})}\n\n"
-        else:
-            yield f"data: {json.dumps({'type': 'response', 'text': result_holder['response'], 'session_id': session.session_id})}\n\n"
 
-        yield "data: {\"type\": \"done\"}\n\n"
+@app.post("/api/chat/stream")
+async def chat_stream(request: ChatRequest, x_profile: str | None = Header(default=None),
+                      accept_encoding: str | None = Header(default=None)):
+    """Stream chat response with real-time trace events via SSE.
 
-    return StreamingResponse(
-        event_generator(),
-        media_type="text/event-stream",
-        headers={"Cache-Control": "no-cache", "Connection": "keep-alive"}
-    )
+    The turn runs as a resumable run: if the connection drops, reattach with
+    GET /api/runs/{run_id}/stream and Last-Event-ID instead of resending.
+    """
+    session = get_or_create_session(request.session_id)
+    run = _start_run(request.message, session, x_profile)
+    return _sse_frames(run, 0, accept_encoding)
+
+
+@app.websocket("/ws")
+async def chat_socket(websocket: WebSocket):
+    """Chat turns of many sessions multiplexed over one WebSocket (see shared.ws)."""
+    async def start_turn(session_id: str | None, message: str) -> Run:
+        return _start_run(message, get_or_create_session(session_id))
+
+    await ChatMultiplexer(websocket, start_turn, runs, poll=SSE_COALESCE_MS / 1000,
+                          max_lag=SSE_CLIENT_MAX_LAG, max_runs=WS_MAX_ACTIVE_RUNS).serve()
+
+
+@app.get("/api/runs/{run_id}/stream")
+async def resume_run(run_id: str, last_event_id: int = 0,
+                     last_event_id_header: str | None = Header(default=None, alias="Last-Event-ID"),
+                     accept_encoding: str | None = Header(default=None)):
+    """Reattach to a run: replays frames after Last-Event-ID, then follows it live."""
+    run = runs.get(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Run not found or expired")
+    if last_event_id_header and last_event_id_header.isdigit():
+        last_event_id = int(last_event_id_header)
+    metrics.incr("runs.resumed")
+    return _sse_frames(run, last_event_id, accept_encoding)
+
+
+@app.get("/api/runs/{run_id}")
+async def get_run(run_id: str):
+    """Run status and the id of its latest event."""
+    run = runs.get(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Run not found or expired")
+    return run.status()
+
+
+async def _cancel_on_disconnect(http_request: Request, task: asyncio.Task, disconnected: asyncio.Event):
+    """Cancel ``task`` (the request handler) once the client has gone."""
+    while True:
+        if await http_request.is_disconnected():
+            disconnected.set()
+            task.cancel()
+            return
+        await asyncio.sleep(0.25)
+
+
+chat_turns = SingleFlight("chat_turns")
 
 
 @app.post("/api/chat")
-async def chat(request: ChatRequest):
-    """Non-streaming chat endpoint."""
+async def chat(request: ChatRequest, http_request: Request,
+               x_profile: str | None = Header(default=None)):
+    """Non-streaming chat endpoint.
+
+    A request repeating a message that is still being answered in the same
+    session waits for that turn and gets its response.
+    """
     session = get_or_create_session(request.session_id)
-    trace = TraceCollector()
 
-    try:
-        response_text = run_agent_with_thinking(request.message, trace, session)
+    async def run_chat_turn() -> dict:
+        trace = TraceCollector()
+        deadline = Deadline(REQUEST_DEADLINE_SECONDS)
+        try:
+            with profiling_scope(x_profile):
+                response_text = await run_agent_with_thinking_async(request.message, trace, session,
+                                                                    deadline)
+        except asyncio.CancelledError:
+            deadline.cancel("client_disconnected")  # every request waiting for it has gone
+            raise
         return {
             "response": response_text,
             "session_id": session.session_id,
-            "trace": trace.events,
+            "trace": [event.to_dict() for event in trace.events],
             "metrics": trace.get_summary()
         }
+
+    handler = asyncio.current_task()
+    disconnected = asyncio.Event()
+    watcher = asyncio.create_task(_cancel_on_disconnect(http_request, handler, disconnected))
+    try:
+        result, _ = await chat_turns.do(turn_key(session.session_id, request.message), run_chat_turn)
+        return result
+    except asyncio.CancelledError:
+        if not disconnected.is_set():
+            raise
+        handler.uncancel()
+        # Nobody is left to read this response
+        raise HTTPException(status_code=499, detail="client_disconnected")
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except RequestCancelled as e:
+        raise HTTPException(status_code=499, detail=str(e))
     except Exception as e:
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        watcher.cancel()
+
+
+# ═══════════════════════════════════════════════════════════════════
+# Batch Jobs
+# ═══════════════════════════════════════════════════════════════════
+
+async def run_batch_item(job_id: str, item: dict) -> dict:
+    """Run one batch item as its own single-turn conversation."""
+    trace = TraceCollector()
+    # Namespaced by job: item ids ("item-1", ...) repeat across jobs; not kept in the session store
+    session = ConversationSession(f"{job_id}:{item['id']}")
+    response = await run_agent_with_thinking_async(item["message"], trace, session)
+    summary = trace.get_summary()
+    return {
+        "response": response,
+        "patient_context": session.patient_context,
+        "metrics": {k: summary[k] for k in ("total_time", "tokens", "estimated_cost")},
+    }
+
+
+batches = BatchManager(run_batch_item, max_jobs=BATCH_MAX_JOBS)
+metrics.register_provider("batch", lambda: batch_stats(batches))
+
+
+def _get_batch(job_id: str):
+    job = batches.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    return job
+
+
+@app.post("/api/batch", status_code=202)
+async def create_batch(request: Request, concurrency: int = BATCH_CONCURRENCY):
+    """Start a batch job from a JSONL body: one {"message": ..., "id"?: ...} per line."""
+    try:
+        items = parse_jsonl(await request.body())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not items:
+        raise HTTPException(status_code=400, detail="Batch is empty")
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {BATCH_MAX_ITEMS} items")
+    job = batches.submit(items, max(1, min(concurrency, BATCH_MAX_CONCURRENCY)))
+    return job.progress()
+
+
+@app.get("/api/batch/{job_id}")
+async def get_batch(job_id: str):
+    """Batch job progress."""
+    return _get_batch(job_id).progress()
+
+
+@app.get("/api/batch/{job_id}/results")
+async def get_batch_results(job_id: str, follow: bool = True):
+    """Results as JSONL in completion order; follows the job until it finishes."""
+    job = _get_batch(job_id)
+    return StreamingResponse(stream_results(job, follow), media_type="application/x-ndjson")
+
+
+@app.delete("/api/batch/{job_id}")
+async def cancel_batch(job_id: str):
+    """Cancel a running batch job; finished results are kept."""
+    job = _get_batch(job_id)
+    job.cancel()
+    return {"job_id": job_id, "status": "cancelling" if not job.done else job.status}
 
 
 @app.get("/api/session/{session_id}")
@@ -557,6 +860,18 @@ async def get_session(session_id: str):
     }
 
 
+@app.get("/api/patients/{patient_id}/view")
+async def get_patient_view(patient_id: str):
+    """The materialized cross-system view of one patient (direct mode)."""
+    views = _patient_views()
+    if views is None:
+        raise HTTPException(status_code=404, detail="Patient views are not available in this mode")
+    view = await asyncio.to_thread(views.to_dict, patient_id)  # may read the record stores
+    if view is None:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    return view
+
+
 @app.delete("/api/session/{session_id}")
 async def delete_session(session_id: str):
     """Delete/reset a session."""
@@ -565,6 +880,43 @@ async def delete_session(session_id: str):
     return {"status": "deleted"}
 
 
+@app.get("/api/metrics")
+async def get_metrics():
+    """Process-wide counters plus Bedrock connection and agent pool stats."""
+    # Importing registers the Bedrock and agent pool stats providers
+    import shared.bedrock  # noqa: F401
+    import agents.orchestrator.a2a_tools  # noqa: F401
+    return metrics.snapshot()
+
+
+@app.get("/api/admin/profile")
+async def get_profile(kind: str = "wall"):
+    """Collapsed-stack profile (wall or cpu microseconds) for flamegraph tools."""
+    if kind not in ("wall", "cpu"):
+        raise HTTPException(status_code=400, detail="kind must be 'wall' or 'cpu'")
+    return PlainTextResponse(profiler.collapsed(kind))
+
+
+@app.get("/api/admin/profile/summary")
+async def get_profile_summary(top: int = 10):
+    """Wall/CPU time per hot path and the heaviest stacks."""
+    return profiler.summary(top=top)
+
+
+@app.delete("/api/admin/profile")
+async def reset_profile():
+    """Discard collected profile samples."""
+    profiler.reset()
+    return {"status": "reset"}
+
+
+@app.delete("/api/admin/response-cache")
+async def clear_response_cache():
+    """Drop every cached general answer (e.g. after a prompt or policy change)."""
+    response_cache.clear()
+    return {"status": "cleared"}
+
+
 @app.get("/api/health")
 async def health():
     return {
@@ -590,4 +942,10 @@ if __name__ == "__main__":
     print("\n  🌐 Open: http://localhost:8000")
     print("  ✨ Features: Streaming, Thinking, Memory, Metrics")
     print("\n  Press Ctrl+C to stop\n")
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    if SERVER_WORKERS > 1:
+        if PREFORK_WARMUP:
+            print("  Note: uvicorn spawns fresh workers, so PREFORK_WARMUP shares nothing here;"
+                  " use gunicorn --preload\n")
+        uvicorn.run("server:app", host="0.0.0.0", port=8000, workers=SERVER_WORKERS)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000)
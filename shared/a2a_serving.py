@@ -0,0 +1,212 @@
+"""Production serving for the A2A sub-agent servers.
+
+``A2AServer(agent=...).serve()`` runs one process around one shared agent, so
+every request to a sub-agent is serialized. ``serve`` here runs the same A2A
+protocol as a multi-worker ASGI app instead:
+
+* each worker process builds its own ``AgentPool`` after the fork (boto3
+  clients are not fork-safe) and runs at most ``A2A_SERVER_CONCURRENCY``
+  invocations at once; extra requests queue for a slot, up to
+  ``A2A_SERVER_QUEUE_TIMEOUT`` seconds;
+* ``GET /ready`` answers 200 once the worker's warm agents are built and 503
+  while it drains; ``GET /health`` is plain liveness;
+* on SIGTERM a worker first reports not-ready for ``A2A_DRAIN_SECONDS`` so load
+  balancers (and the orchestrator's breakers) move traffic away, rejects new
+  requests with 503, then lets uvicorn finish in-flight requests for up to
+  ``A2A_SHUTDOWN_TIMEOUT`` seconds;
+* an ``X-Request-Timeout`` header (seconds) from the orchestrator bounds the
+  invocation with the caller's remaining deadline;
+* with an ``output_model`` the agent answers with that structured output,
+  sent as a DataPart after a TextPart carrying its ``summary``.
+
+Every message gets a pooled agent; what it remembers of earlier messages is
+set by the agent's memory policy (shared.agent_memory), as in direct mode.
+"""
+
+import asyncio
+import os
+import signal
+from contextlib import asynccontextmanager
+from typing import Any, Callable
+
+from shared.agent_runtime import AgentPool, ConcurrencyLimiter, RuntimeBusyError
+from shared.deadline import Deadline, current_deadline
+
+DEADLINE_HEADER = "x-request-timeout"
+
+
+class PooledAgentExecutor:
+    """A2A executor that runs each message on an agent leased from a pool."""
+
+    def __init__(self, pool: AgentPool, limiter: ConcurrencyLimiter, default_timeout: float,
+                 output_model: type | None = None):
+        self.pool = pool
+        self.output_model = output_model
+        self.limiter = limiter
+        self.default_timeout = default_timeout
+        self.in_flight = 0
+
+    async def execute(self, context, event_queue):
+        from a2a.types import DataPart, InternalError, Part, TextPart
+        from a2a.utils import new_agent_parts_message, new_agent_text_message
+        from a2a.utils.errors import ServerError
+        from strands.types.exceptions import StructuredOutputException
+
+        headers = context.call_context.state.get("headers", {}) if context.call_context else {}
+        try:
+            budget = min(float(headers[DEADLINE_HEADER]), self.default_timeout)
+        except (KeyError, ValueError):
+            budget = self.default_timeout
+        deadline = Deadline(budget)
+        current_deadline.set(deadline)
+        deadline.arm()
+        self.in_flight += 1
+        try:
+            async with self.limiter.slot_async():
+                with self.pool.lease() as agent:
+                    try:
+                        result = await agent.invoke_async(context.get_user_input(),
+                                                          cancel_signal=deadline.signal,
+                                                          structured_output_model=self.output_model)
+                        structured = result.structured_output
+                    except StructuredOutputException as e:
+                        # Prose even after the result tool was forced: read it as free text
+                        if not hasattr(self.output_model, "from_unstructured"):
+                            raise
+                        structured = self.output_model.from_unstructured(agent.messages, e)
+            if deadline.cancelled:
+                raise deadline.error()
+        except RuntimeBusyError as e:
+            raise ServerError(error=InternalError(message=str(e))) from e
+        finally:
+            self.in_flight -= 1
+            deadline.disarm()
+        if structured is None:
+            await event_queue.enqueue_event(
+                new_agent_text_message(str(result), context.context_id, context.task_id))
+            return
+        await event_queue.enqueue_event(new_agent_parts_message(
+            [Part(root=TextPart(text=getattr(structured, "summary", ""))),
+             Part(root=DataPart(data=structured.model_dump(mode="json", exclude_none=True)))],
+            context.context_id, context.task_id))
+
+    async def cancel(self, context, event_queue):
+        from a2a.types import UnsupportedOperationError
+        from a2a.utils.errors import ServerError
+        raise ServerError(error=UnsupportedOperationError())
+
+
+def agent_card(agent: Any, url: str, structured: bool = False):
+    """A2A agent card for ``agent``, with one skill per tool."""
+    from a2a.types import AgentCapabilities, AgentCard, AgentSkill
+
+    return AgentCard(
+        name=agent.name,
+        description=agent.description,
+        url=url.rstrip("/") + "/",
+        version="0.0.1",
+        skills=[AgentSkill(name=c["name"], id=c["name"], description=c["description"], tags=[])
+                for c in agent.tool_registry.get_all_tools_config().values()],
+        default_input_modes=["text"],
+        default_output_modes=["text", "application/json"] if structured else ["text"],
+        capabilities=AgentCapabilities(streaming=False),
+    )
+
+
+def create_a2a_app(factory: Callable[[], Any], public_url: str, output_model: type | None = None):
+    """ASGI app serving agents built by ``factory`` over A2A, one pool per worker."""
+    from a2a.server.apps import A2AStarletteApplication
+    from a2a.server.request_handlers import DefaultRequestHandler
+    from a2a.server.tasks import InMemoryTaskStore
+    from starlette.middleware import Middleware
+    from starlette.responses import JSONResponse
+    from starlette.routing import Route
+
+    from shared.config import (
+        A2A_DRAIN_SECONDS, A2A_SERVER_CONCURRENCY, A2A_SERVER_QUEUE_TIMEOUT,
+        A2A_SERVER_WARM_AGENTS, REQUEST_DEADLINE_SECONDS,
+    )
+
+    state = {"ready": False, "draining": False}
+    pool = AgentPool(factory, max_idle=A2A_SERVER_CONCURRENCY)
+    executor = PooledAgentExecutor(pool, ConcurrencyLimiter(A2A_SERVER_CONCURRENCY,
+                                                            A2A_SERVER_QUEUE_TIMEOUT),
+                                   REQUEST_DEADLINE_SECONDS, output_model)
+
+    def status() -> dict:
+        return {"pid": os.getpid(), "in_flight": executor.in_flight,
+                "concurrency": A2A_SERVER_CONCURRENCY, "rejected": executor.limiter.rejected,
+                "pool": pool.stats()}
+
+    async def ready(request):
+        if state["ready"] and not state["draining"]:
+            return JSONResponse({"status": "ready", **status()})
+        return JSONResponse({"status": "draining" if state["draining"] else "starting", **status()},
+                            status_code=503)
+
+    async def health(request):
+        return JSONResponse({"status": "ok", **status()})
+
+    def start_drain(uvicorn_handler):
+        loop = asyncio.get_running_loop()
+
+        def on_signal(sig, frame):
+            if state["draining"]:
+                uvicorn_handler(sig, frame)  # second signal: stop now
+                return
+            state["draining"] = True
+            loop.call_soon_threadsafe(loop.call_later, A2A_DRAIN_SECONDS, uvicorn_handler, sig, frame)
+
+        return on_signal
+
+    @asynccontextmanager
+    async def lifespan(app):
+        handler = signal.getsignal(signal.SIGTERM)
+        if callable(handler):  # uvicorn's handler; only settable from the main thread
+            try:
+                signal.signal(signal.SIGTERM, start_drain(handler))
+            except ValueError:
+                pass
+        # Build warm agents in the worker, off the event loop
+        agents = await asyncio.gather(*(asyncio.to_thread(pool.acquire)
+                                        for _ in range(A2A_SERVER_WARM_AGENTS)))
+        for agent in agents:
+            pool.release(agent)
+        state["ready"] = True
+        yield
+        state["draining"] = True
+
+    class RejectWhileDraining:
+        def __init__(self, app):
+            self.app = app
+
+        async def __call__(self, scope, receive, send):
+            if scope["type"] == "http" and state["draining"] and scope["method"] == "POST":
+                response = JSONResponse({"error": "draining"}, status_code=503,
+                                        headers={"Connection": "close"})
+                await response(scope, receive, send)
+                return
+            await self.app(scope, receive, send)
+
+    card_agent = pool.acquire()
+    pool.release(card_agent)
+    return A2AStarletteApplication(
+        agent_card=agent_card(card_agent, public_url, structured=output_model is not None),
+        http_handler=DefaultRequestHandler(agent_executor=executor, task_store=InMemoryTaskStore()),
+    ).build(
+        routes=[Route("/ready", ready), Route("/health", health)],
+        middleware=[Middleware(RejectWhileDraining)],
+        lifespan=lifespan,
+    )
+
+
+def serve(app_factory: str, port: int, name: str):
+    """Run ``app_factory`` (an import string) with ``A2A_SERVER_WORKERS`` workers."""
+    import uvicorn
+
+    from shared.config import A2A_SERVER_CONCURRENCY, A2A_SERVER_WORKERS, A2A_SHUTDOWN_TIMEOUT
+
+    print(f"Starting {name} A2A Server on port {port} "
+          f"({A2A_SERVER_WORKERS} workers x {A2A_SERVER_CONCURRENCY} concurrent)...")
+    uvicorn.run(app_factory, factory=True, host="0.0.0.0", port=port,
+                workers=A2A_SERVER_WORKERS, timeout_graceful_shutdown=A2A_SHUTDOWN_TIMEOUT)
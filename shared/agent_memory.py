@@ -0,0 +1,268 @@
+"""Conversation memory of sub-agent instances.
+
+A strands ``Agent`` keeps every message it has exchanged, and sub-agent
+instances are long-lived (pooled, or module-level singletons). Each task
+used to carry the history of earlier, unrelated patients, so input tokens
+and latency grew with process uptime. ``SubAgentMemory`` is the conversation
+manager of every sub-agent instance and sets the history a call starts from:
+
+* ``fresh``: none;
+* ``patient``: earlier calls about the patient the task names (a ``PAT-``
+  ID), shared by every instance of the agent type in the process; a task
+  naming no patient starts fresh;
+* ``session``: the instance's own earlier calls, for AgentCore sessions
+  where one instance serves one conversation.
+
+A call is remembered as its task and its answer (the structured result, not
+the raw tool payloads). Recent calls get three quarters of ``token_budget``;
+past that the oldest are folded into one line each (task and summary), and
+those lines get the remaining quarter. Every call also starts with fresh usage metrics, so per-call
+token counts do not accumulate either. History tokens carried into each call
+are under ``subagent_memory`` in /api/metrics.
+"""
+
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from strands.agent.conversation_manager import ConversationManager
+from strands.hooks import AfterInvocationEvent, BeforeInvocationEvent
+from strands.telemetry.metrics import EventLoopMetrics
+
+from shared import metrics
+
+POLICIES = ("fresh", "patient", "session")
+PATIENT_ID = re.compile(r"PAT-\d+")
+CHARS_PER_TOKEN = 4  # estimate for kept history; real usage is reported by the model
+SUMMARY_LINE_CHARS = 240
+
+
+def estimate_tokens(messages: list) -> int:
+    return len(json.dumps(messages, default=str, ensure_ascii=False)) // CHARS_PER_TOKEN
+
+
+@dataclass(slots=True)
+class _Call:
+    messages: list  # [task, answer]
+    line: str  # what the call folds into
+    tokens: int
+
+
+@dataclass
+class Window:
+    """Kept history: summary lines of older calls, then recent calls verbatim."""
+
+    summaries: list[str] = field(default_factory=list)
+    calls: list[_Call] = field(default_factory=list)
+    used: float = field(default_factory=time.monotonic)
+
+    def messages(self) -> list:
+        history = []
+        if self.summaries:
+            history += [_message("user", "Earlier tasks in this conversation, summarised:\n"
+                                 + "\n".join(self.summaries)),
+                        _message("assistant", "Noted.")]
+        for call in self.calls:
+            history += call.messages
+        return history
+
+    def add(self, call: _Call, budget: int) -> int:
+        """Append ``call``; returns how many of the oldest calls were folded."""
+        self.calls.append(call)
+        self.used = time.monotonic()
+        folded = 0
+        while self.calls and sum(c.tokens for c in self.calls) > budget - budget // 4:
+            self.summaries.append(self.calls.pop(0).line)
+            folded += 1
+        while self.summaries and sum(map(len, self.summaries)) // CHARS_PER_TOKEN > budget // 4:
+            self.summaries.pop(0)
+        return folded
+
+
+class WindowStore:
+    """Windows by key, least recently used evicted past ``max_windows``."""
+
+    def __init__(self, max_windows: int, ttl: float):
+        self.max_windows = max_windows
+        self.ttl = ttl
+        self._windows: OrderedDict[str, Window] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def history(self, key: str) -> list:
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None:
+                return []
+            if time.monotonic() - window.used > self.ttl:
+                del self._windows[key]
+                return []
+            return window.messages()
+
+    def add(self, key: str, call: _Call, budget: int) -> int:
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or time.monotonic() - window.used > self.ttl:
+                window = self._windows[key] = Window()
+            self._windows.move_to_end(key)
+            folded = window.add(call, budget)
+            while len(self._windows) > self.max_windows:
+                self._windows.popitem(last=False)
+            return folded
+
+    def __len__(self) -> int:
+        return len(self._windows)
+
+
+class _Stats:
+    __slots__ = ("agent_name", "policy", "calls", "history_tokens", "max_history_tokens", "last_history_tokens",
+                 "input_tokens", "folded")
+
+    def __init__(self, agent_name: str, policy: str):
+        self.agent_name = agent_name
+        self.policy = policy
+        self.calls = self.history_tokens = self.max_history_tokens = self.last_history_tokens = 0
+        self.input_tokens = self.folded = 0
+
+    def to_dict(self) -> dict:
+        calls = self.calls or 1
+        return {"policy": self.policy, "calls": self.calls,
+                "avg_history_tokens": round(self.history_tokens / calls),
+                "max_history_tokens": self.max_history_tokens,
+                "last_history_tokens": self.last_history_tokens,
+                "avg_input_tokens": round(self.input_tokens / calls), "folded": self.folded}
+
+
+_stores: dict[str, WindowStore] = {}
+_stats: dict[str, _Stats] = {}
+_lock = threading.Lock()
+
+metrics.register_provider("subagent_memory", lambda: {
+    name: {**stats.to_dict(),
+           "patients": len(_stores[stats.agent_name]) if stats.policy == "patient" else 0}
+    for name, stats in list(_stats.items())
+})
+
+
+class SubAgentMemory(ConversationManager):
+    """Conversation manager applying a memory policy (see module docstring)."""
+
+    def __init__(self, agent_name: str, policy: str, token_budget: int,
+                 store: WindowStore | None = None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown sub-agent memory policy {policy!r}; expected one of {POLICIES}")
+        super().__init__()
+        self.agent_name = agent_name
+        self.policy = policy
+        self.token_budget = token_budget
+        self.store = store
+        self._own = Window() if policy == "session" else None
+        self._key: str | None = None
+        self._carried = 0
+        with _lock:
+            stats = _stats.setdefault(f"{agent_name}:{policy}", _Stats(agent_name, policy))
+        self._stats = stats
+
+    def register_hooks(self, registry, **kwargs):
+        super().register_hooks(registry, **kwargs)
+        registry.add_callback(BeforeInvocationEvent, self._before)
+        registry.add_callback(AfterInvocationEvent, self._after)
+
+    def _before(self, event: BeforeInvocationEvent):
+        agent = event.agent
+        # Usage (and the per-invocation records) would otherwise add up for life
+        agent.event_loop_metrics = EventLoopMetrics()
+        agent.event_loop_metrics.reset_usage_metrics()
+        self._key = None
+        if self.policy == "session":
+            history = self._own.messages()
+        elif self.policy == "patient":
+            patient = PATIENT_ID.search(_text(event.messages or []))
+            self._key = patient.group() if patient else None
+            history = self.store.history(self._key) if self._key else []
+        else:
+            history = []
+        agent.messages[:] = history
+        self._carried = len(history)
+        tokens = estimate_tokens(history) if history else 0
+        stats = self._stats
+        stats.calls += 1
+        stats.history_tokens += tokens
+        stats.last_history_tokens = tokens
+        stats.max_history_tokens = max(stats.max_history_tokens, tokens)
+        metrics.incr("subagent_memory.history_tokens", tokens)
+
+    def _after(self, event: AfterInvocationEvent):
+        result = event.result
+        if result is None:
+            return
+        self._stats.input_tokens += result.metrics.accumulated_usage.get("inputTokens", 0)
+        if self.policy == "fresh" or (self.policy == "patient" and self._key is None):
+            return
+        call = _remembered(event.agent.messages[self._carried:], result)
+        if call is None:
+            return
+        if self.policy == "session":
+            folded = self._own.add(call, self.token_budget)
+        else:
+            folded = self.store.add(self._key, call, self.token_budget)
+        self._stats.folded += folded
+        metrics.incr("subagent_memory.folded", folded)
+
+    def apply_management(self, agent, **kwargs):
+        pass  # history is set per call in _before
+
+    def reduce_context(self, agent, e: Exception | None = None, **kwargs):
+        """On overflow, drop the history carried into this call."""
+        if self._carried:
+            del agent.messages[:self._carried]
+            self.removed_message_count += self._carried
+            self._carried = 0
+            metrics.incr("subagent_memory.overflow_dropped")
+        elif e is not None:
+            raise e
+
+
+def subagent_memory(agent_name: str, policy: str | None = None) -> SubAgentMemory:
+    """Conversation manager for a new ``agent_name`` instance (configured policy by default)."""
+    from shared.config import (
+        SUBAGENT_MEMORY, SUBAGENT_MEMORY_MAX_PATIENTS, SUBAGENT_MEMORY_TOKEN_BUDGET,
+        SUBAGENT_MEMORY_TTL_SECONDS,
+    )
+    policy = policy or SUBAGENT_MEMORY
+    store = None
+    if policy == "patient":
+        with _lock:
+            store = _stores.setdefault(agent_name, WindowStore(SUBAGENT_MEMORY_MAX_PATIENTS,
+                                                               SUBAGENT_MEMORY_TTL_SECONDS))
+    return SubAgentMemory(agent_name, policy, SUBAGENT_MEMORY_TOKEN_BUDGET, store)
+
+
+def _message(role: str, text: str) -> dict:
+    return {"role": role, "content": [{"text": text}]}
+
+
+def _text(messages: list) -> str:
+    return "\n".join(block["text"] for message in messages
+                     for block in message.get("content", []) if "text" in block)
+
+
+def _remembered(messages: list, result) -> _Call | None:
+    """A call as [task, answer]: the structured result rather than tool payloads."""
+    task = _text([m for m in messages[:1] if m.get("role") == "user"])
+    if not task:
+        return None
+    structured = result.structured_output
+    if structured is not None:
+        answer = structured.view() if hasattr(structured, "view") else structured.model_dump_json()
+        summary = getattr(structured, "summary", "") or answer
+    else:
+        answer = str(result).strip()
+        summary = answer
+    kept = [_message("user", task), _message("assistant", answer)]
+    line = f"- {' '.join(task.split())} → {' '.join(summary.split())}"
+    if len(line) > SUMMARY_LINE_CHARS:
+        line = line[:SUMMARY_LINE_CHARS - 3] + "..."
+    return _Call(kept, line, estimate_tokens(kept))
@@ -0,0 +1,372 @@
+"""Runtime helpers for serving Strands agents to concurrent callers.
+
+A Strands ``Agent`` refuses concurrent invocations, so a single module-level
+instance either raises or serializes every caller. The helpers here hand each
+in-flight invocation its own instance: a warm pool for stateless calls and a
+per-session cache for conversations, behind a per-container concurrency cap.
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Callable
+
+
+class AgentPool:
+    """Idle instances of one agent type, leased one invocation at a time.
+
+    Instances are created on demand when the pool is empty; up to ``max_idle``
+    are kept warm after release. A released instance goes back without the
+    conversation and usage metrics of the call it served, so the next,
+    unrelated caller starts fresh.
+    """
+
+    def __init__(self, factory: Callable[[], Any], max_idle: int = 8, warm: int = 0):
+        self._factory = factory
+        self._max_idle = max_idle
+        self._idle: list[Any] = []
+        self._lock = threading.Lock()
+        self.created = 0
+        self.in_use = 0
+        for _ in range(min(warm, max_idle)):
+            self._idle.append(self._create())
+
+    def _create(self) -> Any:
+        agent = self._factory()
+        with self._lock:
+            self.created += 1
+        return agent
+
+    def acquire(self) -> Any:
+        with self._lock:
+            self.in_use += 1
+            if self._idle:
+                return self._idle.pop()
+        try:
+            return self._create()
+        except BaseException:
+            with self._lock:
+                self.in_use -= 1
+            raise
+
+    def release(self, agent: Any):
+        _reset(agent)
+        with self._lock:
+            self.in_use -= 1
+            if len(self._idle) < self._max_idle:
+                self._idle.append(agent)
+
+    def discard(self, agent: Any):
+        """Drop a leased instance whose state can no longer be trusted."""
+        with self._lock:
+            self.in_use -= 1
+
+    @contextmanager
+    def lease(self):
+        agent = self.acquire()
+        try:
+            yield agent
+        except BaseException:
+            # Interrupted mid-invocation (e.g. task cancellation): its conversation
+            # may hold a tool call without a result, so it is not reused
+            self.discard(agent)
+            raise
+        self.release(agent)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"idle": len(self._idle), "in_use": self.in_use, "created": self.created}
+
+
+def _reset(agent: Any):
+    """Forget a pooled Strands agent's conversation and usage."""
+    messages = getattr(agent, "messages", None)
+    if isinstance(messages, list):
+        messages.clear()
+    loop_metrics = getattr(agent, "event_loop_metrics", None)
+    if loop_metrics is not None:
+        agent.event_loop_metrics = type(loop_metrics)()
+        if hasattr(agent.event_loop_metrics, "reset_usage_metrics"):
+            agent.event_loop_metrics.reset_usage_metrics()  # start_cycle expects a current invocation
+
+
+class SessionAgentCache:
+    """One agent per session so conversation history never mixes.
+
+    Least-recently-used sessions are evicted beyond ``max_sessions`` and any
+    session idle for longer than ``ttl`` seconds is dropped. Each entry carries
+    a lock, so turns within one session run one at a time while different
+    sessions run in parallel. An entry is never evicted while a lease holds
+    or waits for it, so a session cannot end up with two agents.
+    """
+
+    def __init__(self, factory: Callable[[], Any], max_sessions: int = 256,
+                 ttl: float = 1800):
+        self._factory = factory
+        self._max_sessions = max_sessions
+        self._ttl = ttl
+        self._entries: OrderedDict[str, _SessionEntry] = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+    def _entry(self, session_id: str) -> "_SessionEntry":
+        """The session's entry, counted as leased (pinned) until ``_unpin``."""
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            entry = self._entries.get(session_id)
+            if entry is not None:
+                self._entries.move_to_end(session_id)
+                entry.last_used = now
+                entry.leases += 1
+                return entry
+        # Build outside the cache lock; first writer wins a racing insert
+        agent = self._factory()
+        with self._lock:
+            entry = self._entries.setdefault(session_id, _SessionEntry(agent, now))
+            self._entries.move_to_end(session_id)
+            entry.leases += 1
+            return entry
+
+    def _unpin(self, entry: "_SessionEntry"):
+        with self._lock:
+            entry.leases -= 1
+            entry.last_used = time.monotonic()
+
+    def _evict(self, now: float):
+        for session_id in [s for s, e in self._entries.items()
+                           if now - e.last_used > self._ttl and not e.leases]:
+            del self._entries[session_id]
+            self.evicted += 1
+        while len(self._entries) > self._max_sessions:
+            session_id = next((s for s, e in self._entries.items() if not e.leases), None)
+            if session_id is None:
+                break
+            del self._entries[session_id]
+            self.evicted += 1
+
+    @contextmanager
+    def lease(self, session_id: str):
+        entry = self._entry(session_id)
+        try:
+            entry.lock.acquire()
+            try:
+                yield entry.agent
+            finally:
+                entry.lock.release()
+        finally:
+            self._unpin(entry)
+
+    @asynccontextmanager
+    async def lease_async(self, session_id: str):
+        entry = self._entry(session_id)
+        try:
+            await entry.lock.acquire_async()
+            try:
+                yield entry.agent
+            finally:
+                entry.lock.release()
+        finally:
+            self._unpin(entry)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"sessions": len(self._entries), "evicted": self.evicted}
+
+
+class _SessionEntry:
+    __slots__ = ("agent", "lock", "last_used", "leases")
+
+    def __init__(self, agent: Any, last_used: float):
+        self.agent = agent
+        self.lock = _Permits(1)
+        self.last_used = last_used
+        self.leases = 0  # leases holding or waiting for the lock; guarded by the cache lock
+
+
+class ConcurrencyLimiter:
+    """Caps the number of invocations one container runs at once."""
+
+    def __init__(self, max_concurrent: int, timeout: float = 30):
+        self._permits = _Permits(max_concurrent)
+        self._timeout = timeout
+        self.max_concurrent = max_concurrent
+        self.rejected = 0
+
+    @contextmanager
+    def slot(self):
+        if not self._permits.acquire(self._timeout):
+            self.rejected += 1
+            raise RuntimeBusyError(f"All {self.max_concurrent} invocation slots are busy")
+        try:
+            yield
+        finally:
+            self._permits.release()
+
+    @asynccontextmanager
+    async def slot_async(self):
+        if not await self._permits.acquire_async(self._timeout):
+            self.rejected += 1
+            raise RuntimeBusyError(f"All {self.max_concurrent} invocation slots are busy")
+        try:
+            yield
+        finally:
+            self._permits.release()
+
+
+class RuntimeBusyError(RuntimeError):
+    """Raised when no invocation slot frees up within the queue timeout."""
+
+
+class _Permits:
+    """A semaphore that both threads and event-loop tasks wait on, first come first served.
+
+    ``release`` hands the permit straight to the oldest waiter: a thread's
+    ``threading.Event`` is set, a task's future is resolved on its own loop.
+    A waiter that gives up but was handed a permit meanwhile keeps it (on a
+    timeout) or passes it on (on cancellation).
+    """
+
+    def __init__(self, permits: int):
+        self._mutex = threading.Lock()
+        self._free = permits
+        self._waiters: deque = deque()  # threading.Event | (loop, future)
+
+    def locked(self) -> bool:
+        return self._free == 0
+
+    def _try(self, waiter) -> bool:
+        with self._mutex:
+            if self._free and not self._waiters:
+                self._free -= 1
+                return True
+            self._waiters.append(waiter)
+            return False
+
+    def _withdraw(self, waiter) -> bool:
+        """Stop waiting; False if a permit was already handed over."""
+        with self._mutex:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+                return True
+            return False
+
+    def acquire(self, timeout: float | None = None) -> bool:
+        waiter = threading.Event()
+        if self._try(waiter):
+            return True
+        waiter.wait(timeout)
+        return not self._withdraw(waiter)
+
+    async def acquire_async(self, timeout: float | None = None) -> bool:
+        loop = asyncio.get_running_loop()
+        waiter = (loop, loop.create_future())
+        if self._try(waiter):
+            return True
+        try:
+            await asyncio.wait({waiter[1]}, timeout=timeout)
+        except BaseException:
+            if not self._withdraw(waiter):
+                self.release()
+            raise
+        return not self._withdraw(waiter)
+
+    def release(self):
+        with self._mutex:
+            if not self._waiters:
+                self._free += 1
+                return
+            waiter = self._waiters.popleft()
+        if isinstance(waiter, threading.Event):
+            waiter.set()
+        else:
+            loop, future = waiter
+            try:
+                loop.call_soon_threadsafe(_resolve, future)
+            except RuntimeError:  # its loop has closed: nobody is waiting any more
+                self.release()
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+# ── AgentCore entrypoint glue ───────────────────────────────────
+
+class AgentRuntime:
+    """Session-aware, concurrency-capped invocation of one agent type.
+
+    Calls that carry a session id reuse that session's agent, built by
+    ``session_factory`` if given (one that keeps its conversation); stateless
+    calls lease a warm agent from a pool. ``"stream": true`` in the payload
+    returns an async generator of events instead of a single response.
+    """
+
+    def __init__(self, factory: Callable[[], Any], session_factory: Callable[[], Any] | None = None):
+        from shared.config import (
+            AGENTCORE_MAX_CONCURRENCY, AGENTCORE_QUEUE_TIMEOUT,
+            AGENTCORE_SESSION_CACHE_SIZE, AGENTCORE_SESSION_TTL_SECONDS,
+            AGENTCORE_WARM_AGENTS,
+        )
+        self.pool = AgentPool(factory, max_idle=AGENTCORE_MAX_CONCURRENCY,
+                              warm=AGENTCORE_WARM_AGENTS)
+        self.sessions = SessionAgentCache(session_factory or factory, AGENTCORE_SESSION_CACHE_SIZE,
+                                          AGENTCORE_SESSION_TTL_SECONDS)
+        self.limiter = ConcurrencyLimiter(AGENTCORE_MAX_CONCURRENCY, AGENTCORE_QUEUE_TIMEOUT)
+
+    def _lease(self, session_id: str | None):
+        return self.sessions.lease(session_id) if session_id else self.pool.lease()
+
+    def _lease_async(self, session_id: str | None):
+        if session_id:
+            return self.sessions.lease_async(session_id)
+        return _as_async(self.pool.lease())
+
+    def handle(self, input_data: dict, context: Any = None):
+        """Entrypoint body: a response dict, or an async generator when streaming."""
+        text, session_id, stream = parse_invocation(input_data, context)
+        if stream:
+            return self.stream(text, session_id)
+        try:
+            with self.limiter.slot(), self._lease(session_id) as agent:
+                result = agent(text)
+        except RuntimeBusyError as e:
+            return {"error": {"type": "busy", "message": str(e)}, "session_id": session_id}
+        return {"output": {"text": str(result)}, "session_id": session_id}
+
+    async def stream(self, text: str, session_id: str | None):
+        try:
+            async with self.limiter.slot_async(), self._lease_async(session_id) as agent:
+                async for event in agent.stream_async(text):
+                    if "data" in event:
+                        yield {"type": "delta", "text": event["data"]}
+                    elif "result" in event:
+                        yield {"type": "result", "text": str(event["result"]),
+                               "session_id": session_id}
+        except RuntimeBusyError as e:
+            yield {"type": "error", "error": {"type": "busy", "message": str(e)}}
+
+    def stats(self) -> dict:
+        return {"pool": self.pool.stats(), "sessions": self.sessions.stats(),
+                "rejected": self.limiter.rejected}
+
+
+def parse_invocation(input_data: dict, context: Any = None) -> tuple[str, str | None, bool]:
+    """Extract (text, session_id, stream) from an AgentCore payload."""
+    body = input_data.get("input", {}) or {}
+    text = body.get("text", "")
+    session_id = (
+        input_data.get("session_id") or input_data.get("sessionId")
+        or body.get("session_id") or getattr(context, "session_id", None)
+    )
+    stream = bool(input_data.get("stream", body.get("stream", False)))
+    return text, session_id, stream
+
+
+@asynccontextmanager
+async def _as_async(sync_cm):
+    with sync_cm as value:
+        yield value
@@ -0,0 +1,242 @@
+"""Batch jobs: many orchestrator tasks run by a fixed pool of workers.
+
+A job is a list of items (one JSON object per line of the upload). A fixed
+number of worker coroutines pull items from the job's queue, so memory and
+scheduling cost depend on the pool size rather than the item count.
+
+The number of workers allowed to run at once adapts to Bedrock throttling
+(additive increase, multiplicative decrease): an item that failed with a
+throttle halves the limit and goes back on the queue after a backoff; each run
+of successes adds one slot back, up to the configured concurrency. Only the
+item's own error counts, not throttles other requests ran into meanwhile.
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+from shared import metrics
+from shared.rate_limit import current_lane, is_throttle
+
+MAX_THROTTLE_RETRIES = 5
+
+
+def parse_jsonl(body: bytes) -> list[dict]:
+    """Parse a JSONL upload into items; raises ValueError naming the bad line."""
+    items = []
+    for number, line in enumerate(body.decode("utf-8").splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"line {number}: invalid JSON ({e})") from None
+        if not isinstance(item, dict) or not str(item.get("message", "")).strip():
+            raise ValueError(f"line {number}: expected an object with a non-empty 'message'")
+        item.setdefault("id", f"item-{number}")
+        items.append(item)
+    return items
+
+
+class AdaptiveLimit:
+    """AIMD concurrency limit shared by a job's workers.
+
+    Items in flight together usually see the same burst of throttling, so the
+    limit is halved at most once per ``cooldown`` seconds.
+    """
+
+    def __init__(self, maximum: int, increase_after: int = 5, cooldown: float = 1.0):
+        self.maximum = maximum
+        self.limit = maximum
+        self.active = 0
+        self.increase_after = increase_after
+        self.cooldown = cooldown
+        self._successes = 0
+        self._last_decrease = 0.0
+        self._changed = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.active < self.limit)
+            self.active += 1
+
+    async def release(self, throttled: bool):
+        async with self._changed:
+            self.active -= 1
+            if throttled:
+                self._successes = 0
+                now = time.monotonic()
+                if now - self._last_decrease >= self.cooldown:
+                    self._last_decrease = now
+                    self.limit = max(1, self.limit // 2)
+                    metrics.incr("batch.throttle_backoffs")
+            else:
+                self._successes += 1
+                if self._successes >= self.increase_after and self.limit < self.maximum:
+                    self.limit += 1
+                    self._successes = 0
+            self._changed.notify_all()
+
+
+class BatchJob:
+    """One uploaded batch: its items, progress and results in completion order."""
+
+    def __init__(self, items: list[dict], concurrency: int):
+        self.job_id = f"batch-{uuid.uuid4().hex[:12]}"
+        self.items = items
+        self.concurrency = concurrency
+        self.status = "queued"
+        self.results: list[dict] = []
+        self.succeeded = 0
+        self.failed = 0
+        self.retries = 0
+        self.created_at = time.time()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.limit = AdaptiveLimit(concurrency)
+        self._task: asyncio.Task | None = None
+        self._updated = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completed", "cancelled", "failed")
+
+    def progress(self) -> dict:
+        completed = len(self.results)
+        elapsed = ((self.finished_at or time.time()) - self.started_at) if self.started_at else 0.0
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "total": len(self.items),
+            "completed": completed,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "retries": self.retries,
+            "in_flight": self.limit.active,
+            "concurrency": {"max": self.concurrency, "current": self.limit.limit},
+            "elapsed_seconds": round(elapsed, 2),
+            "items_per_second": round(completed / elapsed, 3) if elapsed else 0.0,
+        }
+
+    def _add_result(self, result: dict):
+        self.results.append(result)
+        if result["status"] == "ok":
+            self.succeeded += 1
+        else:
+            self.failed += 1
+        self._updated.set()
+
+    async def wait_for_results(self, seen: int):
+        """Return once there are more than ``seen`` results or the job is done."""
+        while len(self.results) <= seen and not self.done:
+            self._updated.clear()
+            await self._updated.wait()
+
+    def cancel(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+
+
+class BatchManager:
+    """Starts, tracks and cancels batch jobs on the server's event loop."""
+
+    def __init__(self, run_item: Callable[[str, dict], Awaitable[dict]], max_jobs: int = 100):
+        self._run_item = run_item
+        self._max_jobs = max_jobs
+        self.jobs: OrderedDict[str, BatchJob] = OrderedDict()
+
+    def submit(self, items: list[dict], concurrency: int) -> BatchJob:
+        job = BatchJob(items, concurrency)
+        self.jobs[job.job_id] = job
+        self._evict()
+        job._task = asyncio.create_task(self._run(job))
+        metrics.incr("batch.jobs")
+        metrics.incr("batch.items", len(items))
+        return job
+
+    def get(self, job_id: str) -> BatchJob | None:
+        return self.jobs.get(job_id)
+
+    def _evict(self):
+        finished = [j for j in self.jobs.values() if j.done]
+        while len(self.jobs) > self._max_jobs and finished:
+            del self.jobs[finished.pop(0).job_id]
+
+    async def _run(self, job: BatchJob):
+        pending: asyncio.Queue[tuple[dict, int]] = asyncio.Queue()
+        for item in job.items:
+            pending.put_nowait((item, 0))
+        job.status = "running"
+        job.started_at = time.time()
+        workers = [asyncio.create_task(self._worker(job, pending))
+                   for _ in range(min(job.concurrency, len(job.items)))]
+        try:
+            await pending.join()
+            job.status = "completed"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+        except Exception:
+            job.status = "failed"
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            job.limit.active = 0  # cancelled workers never released their slots
+            job.finished_at = time.time()
+            job._updated.set()
+
+    async def _worker(self, job: BatchJob, pending: asyncio.Queue):
+        current_lane.set("batch")  # model calls queue behind interactive chat
+        while True:
+            item, attempt = await pending.get()
+            try:
+                await job.limit.acquire()
+                started = time.perf_counter()
+                throttled = False
+                try:
+                    output = await self._run_item(job.job_id, item)
+                    result = {"id": item["id"], "status": "ok", **output}
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    throttled = is_throttle(e)
+                    result = {"id": item["id"], "status": "error",
+                              "error": f"{type(e).__name__}: {e}"}
+                await job.limit.release(throttled)
+
+                if result["status"] == "error" and throttled and attempt < MAX_THROTTLE_RETRIES:
+                    job.retries += 1
+                    metrics.incr("batch.retries")
+                    await asyncio.sleep(min(2 ** attempt, 30))
+                    pending.put_nowait((item, attempt + 1))
+                    continue
+                result["seconds"] = round(time.perf_counter() - started, 3)
+                result["attempts"] = attempt + 1
+                job._add_result(result)
+                metrics.incr(f"batch.items_{'succeeded' if result['status'] == 'ok' else 'failed'}")
+            finally:
+                pending.task_done()
+
+
+async def stream_results(job: BatchJob, follow: bool = True):
+    """Yield results as JSON lines, waiting for new ones while the job runs."""
+    sent = 0
+    while True:
+        while sent < len(job.results):
+            yield json.dumps(job.results[sent]) + "\n"
+            sent += 1
+        if job.done or not follow:
+            return
+        await job.wait_for_results(sent)
+
+
+def batch_stats(manager: BatchManager) -> dict[str, Any]:
+    jobs = list(manager.jobs.values())
+    return {
+        "jobs": len(jobs),
+        "running": sum(1 for j in jobs if j.status == "running"),
+        "in_flight_items": sum(j.limit.active for j in jobs),
+    }
@@ -0,0 +1,163 @@
+"""Process-wide Bedrock runtime client shared by every agent.
+
+Each ``BedrockModel`` normally creates its own boto3 client, and with it its
+own urllib3 connection pool: every agent (and every per-request orchestrator)
+repeats TLS setup and competes for a default pool of 10 connections. Models
+built with ``create_bedrock_model`` all use one client configured from
+``shared.config``: pool size, retry attempts and mode, and timeouts. The
+model is handed that client when it is constructed (through a session whose
+``client()`` returns it), so building a model per turn creates no boto3
+client. They are also metered by the per-model limiter in ``shared.rate_limit``.
+"""
+
+import threading
+from functools import cache
+from typing import TYPE_CHECKING, Any
+
+from shared import metrics
+from shared.config import (
+    AWS_REGION, BEDROCK_MODEL_ID, BEDROCK_MAX_POOL_CONNECTIONS, BEDROCK_MAX_ATTEMPTS,
+    BEDROCK_RETRY_MODE, BEDROCK_CONNECT_TIMEOUT, BEDROCK_READ_TIMEOUT,
+    RATE_LIMIT_ENABLED, RATE_LIMIT_EXPECTED_OUTPUT_TOKENS,
+)
+
+if TYPE_CHECKING:
+    from strands.models.bedrock import BedrockModel
+
+THROTTLING_CODES = {"ThrottlingException", "TooManyRequestsException", "ServiceUnavailableException"}
+
+_session = None
+_client = None
+_lock = threading.Lock()
+
+
+def get_boto_session():
+    """Shared boto3 session (caches service models and credentials)."""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                import boto3
+                _session = boto3.Session(region_name=AWS_REGION)
+    return _session
+
+
+def get_bedrock_client():
+    """The process-wide ``bedrock-runtime`` client, created on first use."""
+    global _client
+    if _client is None:
+        session = get_boto_session()
+        with _lock:
+            if _client is None:
+                from botocore.config import Config
+                client = session.client(
+                    "bedrock-runtime",
+                    config=Config(
+                        user_agent_extra="strands-agents",
+                        max_pool_connections=BEDROCK_MAX_POOL_CONNECTIONS,
+                        retries={"total_max_attempts": BEDROCK_MAX_ATTEMPTS, "mode": BEDROCK_RETRY_MODE},
+                        connect_timeout=BEDROCK_CONNECT_TIMEOUT,
+                        read_timeout=BEDROCK_READ_TIMEOUT,
+                        tcp_keepalive=True,
+                    ),
+                )
+                client.meta.events.register("before-send.bedrock-runtime", _on_before_send)
+                client.meta.events.register("after-call.bedrock-runtime", _on_after_call)
+                _client = client
+    return _client
+
+
+@cache
+def _metered_model_class() -> type:
+    """BedrockModel whose calls queue on the model's rate limiter first."""
+    from strands.models.bedrock import BedrockModel
+    from shared.deadline import current_deadline
+    from shared.rate_limit import estimate_tokens, limiter_for
+
+    class MeteredBedrockModel(BedrockModel):
+        async def stream(self, messages, tool_specs=None, system_prompt=None, **kwargs):
+            limiter = limiter_for(self.get_config().get("model_id") or BEDROCK_MODEL_ID)
+            tokens = estimate_tokens(messages, system_prompt, RATE_LIMIT_EXPECTED_OUTPUT_TOKENS)
+            request_deadline = current_deadline.get()
+            async with limiter.request(tokens) as usage:
+                async for event in super().stream(messages, tool_specs, system_prompt, **kwargs):
+                    if "metadata" in event:
+                        usage.update(event["metadata"].get("usage", {}))
+                    yield event
+                if request_deadline is not None and request_deadline.cancelled and not usage:
+                    # Stopped mid-stream: the rest of this response was never generated
+                    metrics.incr("cancellation.model_calls_aborted")
+                    metrics.incr("cancellation.tokens_saved_estimate", RATE_LIMIT_EXPECTED_OUTPUT_TOKENS)
+
+    return MeteredBedrockModel
+
+
+class _SharedClientSession:
+    """What BedrockModel needs of a boto3 session: the region, and the shared client."""
+
+    region_name = AWS_REGION
+
+    def client(self, *args, **kwargs):
+        return get_bedrock_client()
+
+
+def create_bedrock_model(model_id: str | None = None, **model_config: Any) -> "BedrockModel":
+    """Build a strands BedrockModel that uses the shared client."""
+    if RATE_LIMIT_ENABLED:
+        BedrockModel = _metered_model_class()
+    else:
+        from strands.models.bedrock import BedrockModel
+
+    return BedrockModel(
+        model_id=model_id or BEDROCK_MODEL_ID,
+        boto_session=_SharedClientSession(),
+        **model_config,
+    )
+
+
+# ── Stats ───────────────────────────────────────────────────────
+
+def _on_before_send(**_):
+    metrics.incr("bedrock.http_attempts")
+
+
+def _on_after_call(parsed=None, **_):
+    metrics.incr("bedrock.calls")
+    if not parsed:
+        return
+    retries = parsed.get("ResponseMetadata", {}).get("RetryAttempts", 0)
+    if retries:
+        metrics.incr("bedrock.retries", retries)
+    if parsed.get("Error", {}).get("Code") in THROTTLING_CODES:
+        metrics.incr("bedrock.throttled")
+
+
+def bedrock_client_stats() -> dict:
+    """Connection pool usage of the shared client (empty until first use)."""
+    if _client is None:
+        return {"created": False}
+    opened = served = 0
+    pools = 0
+    try:
+        manager = _client._endpoint.http_session._manager
+        for key in list(manager.pools.keys()):
+            pool = manager.pools.get(key)
+            if pool is None:
+                continue
+            pools += 1
+            opened += pool.num_connections
+            served += pool.num_requests
+    except AttributeError:
+        pass  # botocore internals moved; counters below still work
+    return {
+        "created": True,
+        "max_pool_connections": BEDROCK_MAX_POOL_CONNECTIONS,
+        "retry_mode": BEDROCK_RETRY_MODE,
+        "pools": pools,
+        "connections_opened": opened,
+        "requests_served": served,
+        "connection_reuse_ratio": round(1 - opened / served, 3) if served else None,
+    }
+
+
+metrics.register_provider("bedrock", bedrock_client_stats)
@@ -0,0 +1,192 @@
+"""Rule-based billing anomaly scan over every bill at once.
+
+``billing_lookup`` used to hand raw bills to the model and ask it to find the
+errors. The errors it looks for are mechanical: a procedure code billed
+without the modifier its correct code carries, an insurance payment that was
+expected but not applied, a patient charged more than their expected
+responsibility. ``BillingScan`` evaluates those rules over all bills in
+column-wise passes (one boolean mask per rule) and keeps the result as a
+per-bill findings index. ``billing_lookup`` attaches a patient's findings,
+so the model explains them instead of deriving them.
+
+Bills are held as columns (``BillColumns``), NumPy arrays when NumPy is
+installed. Without it the same rule expressions are evaluated bill by bill,
+which gives the same findings more slowly. Rules therefore only use
+operators that work on both arrays and scalars (``&``, ``|``, comparisons,
+arithmetic, ``abs``). A missing amount is NaN, and a comparison with NaN is
+false, so a rule never fires on data a bill does not have.
+"""
+
+import math
+import time
+from dataclasses import dataclass, fields
+from types import SimpleNamespace
+from typing import Callable, Iterable
+
+try:
+    import numpy as np
+except ImportError:  # optional: rules then run bill by bill, orders of magnitude slower on large scans
+    np = None
+
+from shared import metrics
+
+CENT = 0.005  # amounts within half a cent are equal
+
+
+@dataclass
+class BillColumns:
+    """Bills as columns, one entry per bill. Numbers and flags are arrays with NumPy."""
+
+    bill_id: list[str]
+    patient_id: list[str]
+    procedure_code: list[str]
+    correct_code: list[str]
+    rejection_reason: list[str]
+    billed: "np.ndarray | list[float]"
+    insurer_expected: "np.ndarray | list[float]"  # expected insurance payment
+    patient_expected: "np.ndarray | list[float]"  # expected patient responsibility
+    insurance_applied: "np.ndarray | list[bool]"
+    insurance_not_applied: "np.ndarray | list[bool]"  # rules cannot use ~ on scalars
+    modifier_missing: "np.ndarray | list[bool]"
+
+    NUMERIC = ("billed", "insurer_expected", "patient_expected")
+    FLAGS = ("insurance_applied", "insurance_not_applied", "modifier_missing")
+
+    def __post_init__(self):
+        if np is not None:
+            for name in self.NUMERIC:
+                setattr(self, name, np.asarray(getattr(self, name), dtype=np.float64))
+            for name in self.FLAGS:
+                setattr(self, name, np.asarray(getattr(self, name), dtype=bool))
+
+    def __len__(self) -> int:
+        return len(self.bill_id)
+
+    @classmethod
+    def from_bills(cls, bills: Iterable[dict]) -> "BillColumns":
+        columns = {f.name: [] for f in fields(cls)}
+        for bill in bills:
+            code = bill.get("procedure_code") or ""
+            correct = bill.get("correct_code") or ""
+            applied = bool(bill.get("insurance_applied"))
+            for name, value in (
+                ("bill_id", bill["bill_id"]), ("patient_id", bill.get("patient_id", "")),
+                ("procedure_code", code), ("correct_code", correct),
+                ("rejection_reason", bill.get("insurance_rejection_reason") or ""),
+                ("billed", _amount(bill.get("billed_amount"))),
+                # Nothing expected from the insurer is 0, not unknown
+                ("insurer_expected", _amount(bill.get("expected_insurance_payment"), 0.0)),
+                ("patient_expected", _amount(bill.get("expected_patient_responsibility"))),
+                ("insurance_applied", applied), ("insurance_not_applied", not applied),
+                ("modifier_missing", bool(code) and correct.startswith(code + "-")),
+            ):
+                columns[name].append(value)
+        return cls(**columns)
+
+    def row(self, i: int) -> SimpleNamespace:
+        """One bill's values, as scalars."""
+        return SimpleNamespace(**{f.name: _scalar(getattr(self, f.name)[i]) for f in fields(self)})
+
+
+@dataclass(frozen=True, slots=True)
+class Rule:
+    name: str
+    test: Callable  # columns (or one row) -> bool mask (or bool)
+    detail: Callable[[SimpleNamespace], str]
+
+
+def _patient_charged(c):
+    # Without insurance applied the patient is billed the full amount
+    return c.billed - c.insurer_expected * c.insurance_applied
+
+
+RULES = (
+    Rule("MODIFIER_MISSING", lambda c: c.modifier_missing,
+         lambda r: f"{r.procedure_code} billed without its modifier; the correct code is {r.correct_code}"),
+    Rule("INSURANCE_NOT_APPLIED", lambda c: c.insurance_not_applied & (c.insurer_expected > CENT),
+         lambda r: f"expected insurance payment of ${r.insurer_expected:,.2f} was not applied"
+                   + (f" (claim rejected: {r.rejection_reason})" if r.rejection_reason else "")),
+    Rule("PATIENT_OVERCHARGED", lambda c: _patient_charged(c) - c.patient_expected > CENT,
+         lambda r: f"patient charged ${_patient_charged(r):,.2f} against an expected responsibility "
+                   f"of ${r.patient_expected:,.2f}"),
+    Rule("SPLIT_MISMATCH",
+         lambda c: abs(c.insurer_expected + c.patient_expected - c.billed) > CENT,
+         lambda r: f"expected insurance (${r.insurer_expected:,.2f}) and patient (${r.patient_expected:,.2f}) "
+                   f"shares do not add up to the billed ${r.billed:,.2f}"),
+)
+
+
+class BillingScan:
+    """Anomaly findings for every bill, computed once and looked up by bill or patient."""
+
+    def __init__(self, columns: BillColumns, rules: tuple[Rule, ...] = RULES):
+        if len(rules) > 32:
+            raise ValueError("at most 32 rules fit the findings bitmask")
+        self.columns = columns
+        self.rules = rules
+        start = time.perf_counter()
+        self.mask = self._scan()
+        self.scan_seconds = time.perf_counter() - start
+        self._rows = {bill_id: i for i, bill_id in enumerate(columns.bill_id)}
+        self._by_patient: dict[str, list[int]] = {}
+        for i, patient_id in enumerate(columns.patient_id):
+            self._by_patient.setdefault(patient_id, []).append(i)
+        metrics.incr("billing_scan.scans")
+
+    @classmethod
+    def from_bills(cls, bills: Iterable[dict]) -> "BillingScan":
+        return cls(BillColumns.from_bills(bills))
+
+    def _scan(self):
+        if np is not None:
+            return scan_columns(self.columns, self.rules)
+        return scan_rows(self.columns, self.rules)
+
+    def findings(self, bill_id: str) -> dict | None:
+        i = self._rows.get(bill_id)
+        return None if i is None else self._findings(i)
+
+    def for_patient(self, patient_id: str) -> list[dict]:
+        return [self._findings(i) for i in self._by_patient.get(patient_id, ())]
+
+    def _findings(self, i: int) -> dict:
+        bits = int(self.mask[i])
+        row = self.columns.row(i)
+        found = {"bill_id": row.bill_id,
+                 "anomalies": [{"rule": rule.name, "detail": rule.detail(row)}
+                               for bit, rule in enumerate(self.rules) if bits >> bit & 1]}
+        if not math.isnan(row.patient_expected):
+            found["expected_patient_responsibility"] = row.patient_expected
+            overcharge = _patient_charged(row) - row.patient_expected
+            if overcharge > CENT:
+                found["overcharge"] = round(overcharge, 2)
+        return found
+
+    def stats(self) -> dict:
+        counts = {rule.name: sum(1 for bits in self.mask if int(bits) >> bit & 1) if np is None
+                  else int(np.count_nonzero(self.mask & np.uint32(1 << bit)))
+                  for bit, rule in enumerate(self.rules)}
+        return {"bills": len(self.columns), "vectorized": np is not None,
+                "scan_ms": round(self.scan_seconds * 1000, 2), "anomalies": counts}
+
+
+def scan_columns(c: BillColumns, rules: tuple[Rule, ...] = RULES) -> "np.ndarray":
+    """One bit per rule for every bill: a vectorized pass per rule."""
+    mask = np.zeros(len(c), dtype=np.uint32)
+    for bit, rule in enumerate(rules):
+        mask[np.asarray(rule.test(c), dtype=bool)] |= np.uint32(1 << bit)
+    return mask
+
+
+def scan_rows(c: BillColumns, rules: tuple[Rule, ...] = RULES) -> list[int]:
+    """Same as ``scan_columns``, bill by bill (without NumPy)."""
+    rows = (c.row(i) for i in range(len(c)))
+    return [sum(1 << bit for bit, rule in enumerate(rules) if rule.test(row)) for row in rows]
+
+
+def _amount(value, missing: float = math.nan) -> float:
+    return missing if value is None else float(value)
+
+
+def _scalar(value):
+    return value.item() if hasattr(value, "item") else value
@@ -1,5 +1,6 @@
 """Centralized configuration loaded from environment variables."""
 
+import json
 import os
 from dotenv import load_dotenv
 
@@ -30,3 +31,150 @@ import pathlib
 DATA_DIR = pathlib.Path(__file__).parent / "mock_data"
 SERVICENOW_DATA_PATH = DATA_DIR / "servicenow.json"
 SALESFORCE_DATA_PATH = DATA_DIR / "salesforce.json"
+
+# Profiling (opt-in sampling profiler; per request via the X-Profile header)
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILING_INTERVAL_MS = float(os.getenv("PROFILING_INTERVAL_MS", "5"))
+
+# AgentCore runtime (per-container invocation handling)
+AGENTCORE_MAX_CONCURRENCY = int(os.getenv("AGENTCORE_MAX_CONCURRENCY", "8"))
+AGENTCORE_QUEUE_TIMEOUT = float(os.getenv("AGENTCORE_QUEUE_TIMEOUT", "30"))
+AGENTCORE_WARM_AGENTS = int(os.getenv("AGENTCORE_WARM_AGENTS", "2"))
+AGENTCORE_SESSION_CACHE_SIZE = int(os.getenv("AGENTCORE_SESSION_CACHE_SIZE", "256"))
+AGENTCORE_SESSION_TTL_SECONDS = float(os.getenv("AGENTCORE_SESSION_TTL_SECONDS", "1800"))
+
+# A2A sub-agent servers (agents/*/a2a_server.py) — worker processes, concurrent
+# invocations per worker, warm agents per worker, and graceful drain: seconds
+# /ready reports 503 before a terminating worker stops accepting, then seconds
+# allowed for in-flight requests to finish. Workers share the record store.
+A2A_SERVER_WORKERS = int(os.getenv("A2A_SERVER_WORKERS", "1"))
+A2A_SERVER_CONCURRENCY = int(os.getenv("A2A_SERVER_CONCURRENCY", "8"))
+A2A_SERVER_WARM_AGENTS = int(os.getenv("A2A_SERVER_WARM_AGENTS", "2"))
+A2A_SERVER_QUEUE_TIMEOUT = float(os.getenv("A2A_SERVER_QUEUE_TIMEOUT", "30"))
+A2A_DRAIN_SECONDS = float(os.getenv("A2A_DRAIN_SECONDS", "5"))
+A2A_SHUTDOWN_TIMEOUT = float(os.getenv("A2A_SHUTDOWN_TIMEOUT", "30"))
+
+# Startup — PREFORK_WARMUP loads strands and mock data when server.py is
+# imported. It only pays off under `gunicorn --preload`, where workers fork
+# from the warmed master: uvicorn's workers (SERVER_WORKERS for
+# `python server.py`) are spawned fresh and each warms up on its own.
+PREFORK_WARMUP = os.getenv("PREFORK_WARMUP", "false").lower() == "true"
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "1"))
+
+# Shared Bedrock runtime client (one connection pool for all agents)
+BEDROCK_MAX_POOL_CONNECTIONS = int(os.getenv("BEDROCK_MAX_POOL_CONNECTIONS", "64"))
+BEDROCK_MAX_ATTEMPTS = int(os.getenv("BEDROCK_MAX_ATTEMPTS", "4"))
+BEDROCK_RETRY_MODE = os.getenv("BEDROCK_RETRY_MODE", "adaptive")  # legacy | standard | adaptive
+BEDROCK_CONNECT_TIMEOUT = float(os.getenv("BEDROCK_CONNECT_TIMEOUT", "5"))
+BEDROCK_READ_TIMEOUT = float(os.getenv("BEDROCK_READ_TIMEOUT", "120"))
+
+# Model tiering — sub-agents set to "auto" route lookups/summaries to the fast
+# model and escalate to BEDROCK_MODEL_ID when the fast answer fails validation
+BEDROCK_FAST_MODEL_ID = os.getenv(
+    "BEDROCK_FAST_MODEL_ID",
+    "us.anthropic.claude-3-5-haiku-20241022-v1:0"
+)
+MODEL_ROUTING_ENABLED = os.getenv("MODEL_ROUTING_ENABLED", "true").lower() == "true"
+ORCHESTRATOR_MODEL_TIER = os.getenv("ORCHESTRATOR_MODEL_TIER", "large")  # fast | large
+SERVICENOW_MODEL_TIER = os.getenv("SERVICENOW_MODEL_TIER", "auto")      # auto | fast | large
+SALESFORCE_MODEL_TIER = os.getenv("SALESFORCE_MODEL_TIER", "auto")      # auto | fast | large
+
+# Speculative prefetch — start likely billing/insurance lookups in parallel
+# with the orchestrator's first model call (server async path only)
+SPECULATIVE_PREFETCH = os.getenv("SPECULATIVE_PREFETCH", "true").lower() == "true"
+
+# Idempotent writes — repeated billing corrections, tickets and cases within
+# this window return the record created by the first call
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+
+# Record store — append-only logs of created tickets, cases and corrections,
+# shared by every process on the host that uses the same directory
+RECORD_STORE_DIR = os.getenv("RECORD_STORE_DIR", str(pathlib.Path(__file__).parent.parent / "var" / "records"))
+RECORD_STORE_FSYNC_MS = float(os.getenv("RECORD_STORE_FSYNC_MS", "50"))
+RECORD_STORE_COMPACT_MIN_ENTRIES = int(os.getenv("RECORD_STORE_COMPACT_MIN_ENTRIES", "1000"))
+
+# Batch jobs (/api/batch) — concurrent items per job (backs off on throttling)
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "64"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "10000"))
+BATCH_MAX_JOBS = int(os.getenv("BATCH_MAX_JOBS", "100"))
+
+# Client-side Bedrock rate limiting — per model ID requests/tokens per minute
+# and concurrent calls; BEDROCK_RATE_LIMITS overrides them per model as JSON,
+# e.g. {"us.anthropic.claude-3-5-haiku-20241022-v1:0": {"rpm": 400, "tpm": 800000}}.
+# RATE_LIMIT_SHARED_FILE keeps the buckets in one file for all local workers.
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+BEDROCK_RPM = float(os.getenv("BEDROCK_RPM", "200"))
+BEDROCK_TPM = float(os.getenv("BEDROCK_TPM", "400000"))
+BEDROCK_MAX_CONCURRENCY = int(os.getenv("BEDROCK_MAX_CONCURRENCY", "32"))
+
+
+def _rate_limits(raw: str) -> dict:
+    """Parse BEDROCK_RATE_LIMITS, failing with the variable name rather than a bare JSON error."""
+    try:
+        limits = json.loads(raw or "{}")
+    except json.JSONDecodeError as e:
+        raise ValueError(f"BEDROCK_RATE_LIMITS is not valid JSON ({e}): {raw!r}") from None
+    if not isinstance(limits, dict) or not all(
+        isinstance(v, dict) and all(k in ("rpm", "tpm", "concurrency") and isinstance(n, (int, float))
+                                    for k, n in v.items())
+        for v in limits.values()
+    ):
+        raise ValueError('BEDROCK_RATE_LIMITS must map model IDs to {"rpm", "tpm", "concurrency"} '
+                         f"numbers: {raw!r}")
+    return limits
+
+
+BEDROCK_RATE_LIMITS: dict = _rate_limits(os.getenv("BEDROCK_RATE_LIMITS", "{}"))
+RATE_LIMIT_SHARED_FILE = os.getenv("RATE_LIMIT_SHARED_FILE", "")
+RATE_LIMIT_EXPECTED_OUTPUT_TOKENS = int(os.getenv("RATE_LIMIT_EXPECTED_OUTPUT_TOKENS", "500"))
+
+# Request deadline — seconds a chat turn (or batch item) may run before its
+# agents and model calls are cancelled; client disconnects cancel immediately
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "120"))
+
+# Resumable runs — SSE frames kept per streamed turn for Last-Event-ID replay,
+# seconds a disconnected turn keeps running while the client may reconnect,
+# and how long finished runs stay replayable
+RUN_REPLAY_BUFFER = int(os.getenv("RUN_REPLAY_BUFFER", "1000"))
+RUN_RECONNECT_GRACE_SECONDS = float(os.getenv("RUN_RECONNECT_GRACE_SECONDS", "30"))
+RUN_RETENTION_SECONDS = float(os.getenv("RUN_RETENTION_SECONDS", "300"))
+
+# SSE delivery — events produced within SSE_COALESCE_MS go out in one write;
+# a client more than SSE_CLIENT_MAX_LAG frames behind gets essential frames
+# only (thinking events are dropped); SSE_GZIP compresses the stream for
+# clients that accept it
+SSE_COALESCE_MS = float(os.getenv("SSE_COALESCE_MS", "10"))
+SSE_CLIENT_MAX_LAG = int(os.getenv("SSE_CLIENT_MAX_LAG", "200"))
+SSE_GZIP = os.getenv("SSE_GZIP", "false").lower() == "true"
+
+# WebSocket transport (/ws) — turns one connection may have running at once
+WS_MAX_ACTIVE_RUNS = int(os.getenv("WS_MAX_ACTIVE_RUNS", "64"))
+
+# Trace events kept per non-streamed turn (ring buffer; the oldest are dropped
+# past the cap). Streamed turns keep theirs in the run's RUN_REPLAY_BUFFER.
+TRACE_MAX_EVENTS = int(os.getenv("TRACE_MAX_EVENTS", "500"))
+
+# Semantic response cache — answers to general questions (no patient in
+# context, no sub-agent call, no identifiers) reused for messages at least
+# RESPONSE_CACHE_THRESHOLD cosine-similar, for RESPONSE_CACHE_TTL_SECONDS
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_THRESHOLD = float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.9"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+
+# Sub-agent conversation memory — "fresh" starts every call with an empty
+# history; "patient" carries earlier calls about the same patient (PAT-...)
+# in a window of about SUBAGENT_MEMORY_TOKEN_BUDGET tokens, older calls
+# folded into one-line summaries. AgentCore sessions keep their own
+# conversation under the same budget.
+SUBAGENT_MEMORY = os.getenv("SUBAGENT_MEMORY", "fresh")  # fresh | patient
+SUBAGENT_MEMORY_TOKEN_BUDGET = int(os.getenv("SUBAGENT_MEMORY_TOKEN_BUDGET", "2000"))
+SUBAGENT_MEMORY_MAX_PATIENTS = int(os.getenv("SUBAGENT_MEMORY_MAX_PATIENTS", "1000"))
+SUBAGENT_MEMORY_TTL_SECONDS = float(os.getenv("SUBAGENT_MEMORY_TTL_SECONDS", "1800"))
+
+# Materialized patient view (shared.patient_view) — both systems' records for
+# one patient joined once and kept current on writes; the orchestrator gets
+# its one-line summary. Direct mode only (the join needs both record stores).
+PATIENT_VIEW_ENABLED = os.getenv("PATIENT_VIEW_ENABLED", "true").lower() == "true"
+PATIENT_VIEW_MAX_PATIENTS = int(os.getenv("PATIENT_VIEW_MAX_PATIENTS", "10000"))
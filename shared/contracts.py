@@ -0,0 +1,146 @@
+"""Result contract between the orchestrator and its sub-agents.
+
+A sub-agent used to answer in prose (or prose-wrapped JSON) that the
+orchestrator model re-read in full and the server regex-scraped for IDs and
+amounts. Sub-agents now return a ``SubAgentResult``: a short summary, the IDs
+they found or generated, and typed findings per skill. In direct mode it is
+the agent's structured output; in A2A mode it travels as a DataPart next to a
+TextPart carrying the summary.
+
+The orchestrator reads ``view()``, the result without empty fields, and the
+visual cards read the findings directly. ``from_text`` keeps answers from
+agents that do not speak the contract (older A2A servers, AgentCore) usable,
+and so does ``from_unstructured`` for a model that answered in prose even
+after strands forced the result tool (``StructuredOutputException``).
+"""
+
+import json
+import re
+from typing import Literal
+
+from pydantic import BaseModel, Field, ValidationError
+
+from shared import metrics
+
+
+class BillingFindings(BaseModel):
+    """One bill under review."""
+
+    bill_id: str
+    amount: str = Field(description="Billed amount, e.g. $2,400.00")
+    correct_amount: str | None = Field(None, description="What the patient should owe once corrected")
+    procedure_code: str | None = None
+    correct_code: str | None = Field(None, description="Procedure code with any missing modifier, e.g. 99214-25")
+    error: str | None = Field(None, description="The billing error in a few words, e.g. Missing modifier -25")
+    provider: str | None = None
+    date: str | None = Field(None, description="Date of service, YYYY-MM-DD")
+    status: str | None = None
+
+
+class CorrectionFindings(BaseModel):
+    """A submitted billing correction."""
+
+    correction_id: str
+    original_amount: str | None = None
+    corrected_amount: str | None = None
+    savings: str | None = None
+    timeline: str | None = Field(None, description="Expected resolution time, e.g. 5-7 business days")
+
+
+class InsuranceFindings(BaseModel):
+    """Coverage determination for a patient's policy."""
+
+    carrier: str
+    plan: str | None = None
+    policy_number: str | None = None
+    subscriber: str | None = None
+    status: str = Field(description="Active, Inactive or Terminated")
+    coverage_rate: str | None = Field(None, description="Coverage for the service in question, e.g. 90%")
+    copay: str | None = None
+    deductible_met: bool | None = None
+    deductible_amount: str | None = None
+
+
+class CaseFindings(BaseModel):
+    """A patient case opened or updated."""
+
+    case_id: str
+    status: str | None = None
+    team: str | None = Field(None, description="Team or owner the case is assigned to")
+    priority: str | None = None
+
+
+class SubAgentResult(BaseModel):
+    """A sub-agent's answer to one task."""
+
+    status: Literal["success", "error", "unavailable"]
+    skill_used: str = Field("", description="The tool (skill) that served the task, e.g. billing_lookup")
+    summary: str = Field(description="At most two sentences for the orchestrator: the outcome, "
+                                     "with the amounts, codes and IDs that matter")
+    references: dict[str, str] = Field(
+        default_factory=dict,
+        description="IDs found or generated, keyed by kind: patient_id, bill_id, correction_id, "
+                    "ticket_id, case_id, appointment_id")
+    patient_name: str | None = None
+    billing: BillingFindings | None = None
+    correction: CorrectionFindings | None = None
+    insurance: InsuranceFindings | None = None
+    case: CaseFindings | None = None
+    recommendations: list[str] = Field(default_factory=list,
+                                       description="Next actions, one short line each")
+
+    def view(self) -> str:
+        """Compact JSON for the orchestrator: unset and empty fields left out."""
+        return self.model_dump_json(exclude_none=True, exclude_defaults=True)
+
+    @classmethod
+    def from_text(cls, text: str) -> "SubAgentResult":
+        """Best-effort result from a free-text answer.
+
+        A JSON answer that validates is used as is; otherwise the whole text
+        becomes the summary, so nothing the agent said is lost, and IDs in it
+        are collected into ``references``.
+        """
+        payload = _json_object(text)
+        if payload is not None:
+            try:
+                return cls.model_validate(payload)
+            except ValidationError:
+                pass
+        metrics.incr("contracts.unstructured")
+        references = {}
+        for match in REFERENCE.finditer(text):
+            references.setdefault(REFERENCE_KINDS[match.group(1)], match.group())
+        return cls(status="success", summary=text.strip(), references=references)
+
+    @classmethod
+    def from_unstructured(cls, messages: list, error: Exception) -> "SubAgentResult":
+        """Best-effort result from an agent that never produced the structured output.
+
+        ``messages`` is the agent's conversation; its last answer is read as free text.
+        """
+        metrics.incr("contracts.structured_output_failed")
+        for message in reversed(messages):
+            if message.get("role") == "assistant":
+                text = "\n".join(block["text"] for block in message.get("content", []) if "text" in block)
+                if text.strip():
+                    return cls.from_text(text)
+        return cls(status="error", summary=f"The agent returned no answer ({error}).")
+
+
+REFERENCE = re.compile(r"\b(PAT|BILL|CORR|TKT|CASE|APPT)-[A-Z0-9]+\b")
+REFERENCE_KINDS = {"PAT": "patient_id", "BILL": "bill_id", "CORR": "correction_id",
+                   "TKT": "ticket_id", "CASE": "case_id", "APPT": "appointment_id"}
+FENCED_JSON = re.compile(r"```(?:json)?\s*(\{.*\})\s*```", re.DOTALL)
+
+
+def _json_object(text: str) -> dict | None:
+    fenced = FENCED_JSON.search(text)
+    candidate = fenced.group(1) if fenced else text.strip()
+    if not candidate.startswith("{"):
+        return None
+    try:
+        payload = json.loads(candidate)
+    except ValueError:
+        return None
+    return payload if isinstance(payload, dict) else None
@@ -0,0 +1,127 @@
+"""Per-request deadline and cancellation token.
+
+server.py creates a ``Deadline`` for each chat turn and sets it in
+``current_deadline``; everything the turn starts (orchestrator, traced tools,
+sub-agents, A2A requests, model calls) reads it from the context. The token
+is cancelled when the client disconnects or the budget runs out:
+
+* strands agents receive ``deadline.signal`` as their ``cancel_signal`` and
+  stop at the next safe point, which keeps pooled agents reusable;
+* awaits that strands cannot interrupt (A2A requests, joined single-flight
+  calls, rate-limiter queues) are raced against the token with ``race``;
+* A2A requests get ``remaining()`` as their HTTP timeout.
+
+Outside a request there is no deadline and these helpers are no-ops.
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+
+from shared import metrics
+
+current_deadline: contextvars.ContextVar["Deadline | None"] = contextvars.ContextVar(
+    "deadline", default=None)
+
+
+class RequestCancelled(Exception):
+    """The request's work was cancelled (client gone or budget exhausted)."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class DeadlineExceeded(RequestCancelled):
+    """The request ran out of its time budget."""
+
+
+class Deadline:
+    """Time budget plus a thread-safe cancellation signal for one request."""
+
+    def __init__(self, budget_seconds: float):
+        self.budget = budget_seconds
+        self.started = time.monotonic()
+        self.expires_at = self.started + budget_seconds
+        self.signal = threading.Event()
+        self.reason: str | None = None
+        self.cancelled_at: float | None = None
+        self._timer: asyncio.TimerHandle | None = None
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def cancelled(self) -> bool:
+        if not self.signal.is_set() and time.monotonic() >= self.expires_at:
+            self.cancel("deadline_exceeded")
+        return self.signal.is_set()
+
+    def cancel(self, reason: str = "cancelled"):
+        """Cancel the request; the first reason wins. Safe from any thread."""
+        if self.signal.is_set():
+            return
+        self.reason = reason
+        self.cancelled_at = time.monotonic()
+        self.signal.set()
+        metrics.incr(f"cancellation.{reason}")
+
+    def arm(self):
+        """Cancel automatically when the budget runs out (call on the request's loop)."""
+        self._timer = asyncio.get_running_loop().call_later(
+            self.remaining(), self.cancel, "deadline_exceeded")
+
+    def disarm(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def error(self) -> RequestCancelled:
+        if self.reason == "deadline_exceeded":
+            return DeadlineExceeded(f"Request exceeded its {self.budget:g}s time budget")
+        return RequestCancelled(self.reason or "cancelled")
+
+    def check(self):
+        """Raise if the request has been cancelled or is out of time."""
+        if self.cancelled:
+            raise self.error()
+
+    async def wait(self, poll: float = 0.02):
+        while not self.cancelled:
+            await asyncio.sleep(min(poll, self.remaining() or poll))
+
+    async def race(self, awaitable):
+        """Await ``awaitable`` unless the request is cancelled first."""
+        self.check()
+        work = asyncio.ensure_future(awaitable)
+        watcher = asyncio.ensure_future(self.wait())
+        try:
+            await asyncio.wait({work, watcher}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            watcher.cancel()
+            if not work.done():
+                work.cancel()
+                await asyncio.gather(work, return_exceptions=True)
+        if work.cancelled():
+            raise self.error()
+        return work.result()
+
+    def record_stop(self):
+        """Record how long in-flight work took to wind down after cancellation."""
+        if self.cancelled_at is not None:
+            metrics.incr("cancellation.stop_latency_seconds", time.monotonic() - self.cancelled_at)
+
+
+async def race(awaitable):
+    """``current_deadline.race(awaitable)``, or a plain await outside a request."""
+    deadline = current_deadline.get()
+    if deadline is None:
+        return await awaitable
+    return await deadline.race(awaitable)
+
+
+def check():
+    deadline = current_deadline.get()
+    if deadline is not None:
+        deadline.check()
@@ -0,0 +1,45 @@
+"""Idempotency keys for the write tools.
+
+``billing_correct``, ``ticket_create`` and ``case_create`` each derive a key
+from the fields that identify the write (patient, bill or category, correction
+or case type) plus an optional caller-supplied key. The first call under a key
+creates the record; repeats within the TTL — an LLM retry, a re-asked "fix
+it", the same request landing on another worker — get the same record ID back
+instead of a second record. The key is stored with the record and checked by
+``RecordStore.put_once`` under the log's cross-process lock, so every process
+sharing the store agrees on it, across restarts too.
+"""
+
+import asyncio
+import hashlib
+
+from shared import metrics
+from shared.config import IDEMPOTENCY_TTL_SECONDS
+from shared.record_store import RecordStore
+from shared.tracing import trace_event
+
+
+def write_key(operation: str, *parts: str, client_key: str = "") -> str:
+    """Stable key for a write; parts are compared case- and space-insensitively."""
+    normalized = [" ".join(str(p).lower().split()) for p in (operation, *parts)]
+    if client_key:
+        normalized.append("client:" + client_key.strip())
+    return hashlib.sha256("\x1f".join(normalized).encode()).hexdigest()
+
+
+async def dedupe_write(store: RecordStore, collection: str, record_id: str, record: dict,
+                       key: str, agent: str, label: str) -> tuple[str, bool]:
+    """Store a write record once per key, reporting duplicates to metrics and the trace.
+
+    Returns ``(record_id, duplicate)``; a duplicate carries the ID of the
+    record the first call created. The store's lock is taken off the event loop.
+    """
+    record_id, duplicate = await asyncio.to_thread(
+        store.put_once, collection, record_id, record, key, IDEMPOTENCY_TTL_SECONDS)
+    if duplicate:
+        metrics.incr("idempotency.hits")
+        trace_event("dedupe", agent, f"Duplicate {label} suppressed",
+                    f"Returning existing {record_id}", "♻️", "info", {"record_id": record_id})
+    else:
+        metrics.incr("idempotency.misses")
+    return record_id, duplicate
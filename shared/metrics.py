@@ -0,0 +1,39 @@
+"""Process-wide counters and stats providers, served at /api/metrics.
+
+Modules bump named counters with ``incr`` and may register a provider that
+returns a dict of live stats (pool sizes, connection reuse, ...). Everything is
+in-process and per worker.
+"""
+
+import threading
+from collections import Counter
+from typing import Callable
+
+_counters: Counter[str] = Counter()
+_providers: dict[str, Callable[[], dict]] = {}
+_lock = threading.Lock()
+
+
+def incr(name: str, value: float = 1):
+    with _lock:
+        _counters[name] += value
+
+
+def get(name: str) -> float:
+    with _lock:
+        return _counters.get(name, 0)
+
+
+def register_provider(name: str, provider: Callable[[], dict]):
+    _providers[name] = provider
+
+
+def snapshot() -> dict:
+    with _lock:
+        result: dict = {"counters": dict(_counters)}
+    for name, provider in list(_providers.items()):
+        try:
+            result[name] = provider()
+        except Exception as e:  # a broken provider must not break /api/metrics
+            result[name] = {"error": str(e)}
+    return result
@@ -1 +1,21 @@
 """Mock data for ServiceNow and Salesforce agents."""
+
+import json
+import threading
+from pathlib import Path
+
+_cache: dict[str, dict] = {}
+_lock = threading.Lock()
+
+
+def load_mock_data(path: Path) -> dict:
+    """Parse a mock data file once per process and return the shared dict."""
+    key = str(path)
+    data = _cache.get(key)
+    if data is None:
+        with _lock:
+            data = _cache.get(key)
+            if data is None:
+                with open(path) as f:
+                    data = _cache[key] = json.load(f)
+    return data
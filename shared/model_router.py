@@ -0,0 +1,145 @@
+"""Per-agent, per-task model routing with validation-driven escalation.
+
+Sub-agent work is mostly reformatting tool JSON: looking up a patient,
+summarising coverage, listing bills and their errors. That runs on the fast
+tier. Anything that writes (corrections, tickets, cases, appointments) stays
+on the large tier, as does orchestrator synthesis. If a fast-tier answer fails
+validation, the call is retried once on the large tier.
+
+Decisions, latency, tokens and cost per tier go to the current trace and to
+process metrics.
+"""
+
+import re
+from dataclasses import dataclass
+
+from shared import metrics
+from shared.config import (
+    BEDROCK_MODEL_ID, BEDROCK_FAST_MODEL_ID, MODEL_ROUTING_ENABLED,
+    SERVICENOW_MODEL_TIER, SALESFORCE_MODEL_TIER,
+)
+from shared.tracing import trace_event, add_timing, record_model_call
+
+MODEL_TIERS = {
+    "fast": BEDROCK_FAST_MODEL_ID,
+    "large": BEDROCK_MODEL_ID,
+}
+
+# USD per 1K tokens (input, output); on-demand list prices, approximate
+TIER_PRICING = {
+    "fast": (0.0008, 0.004),
+    "large": (0.003, 0.015),
+}
+
+# Configured tier per sub-agent: "auto" routes per task, otherwise fixed
+AGENT_TIERS = {
+    "servicenow": SERVICENOW_MODEL_TIER,
+    "salesforce": SALESFORCE_MODEL_TIER,
+}
+
+# Writes always stay on the large tier. A write verb always means a write. A
+# write noun ("Billing correction: ...", "New case for ...") means one unless
+# the task also asks to read ("check for open cases"); nouns like "error" or
+# "discrepancy" that every billing lookup mentions are not write signals.
+WRITE_VERB = re.compile(
+    r"\b(correct|fix|reprocess|re-?submit|submit|process|apply|add|remove|change|create|open (a|an|new)"
+    r"|file|raise|log|schedule|reschedule|book|cancel|update|escalate)\b",
+    re.IGNORECASE,
+)
+WRITE_NOUN = re.compile(r"\b(corrections?|modifiers?|tickets?|cases?|appointments?)\b", re.IGNORECASE)
+READ_VERB = re.compile(
+    r"\b(look ?up|list|show|check|verify|retrieve|get|find|review|summari[sz]e|identify|explain"
+    r"|what|which|whether)\b",
+    re.IGNORECASE,
+)
+# A task is fast-tier only if it is a read this agent's fast tier handles;
+# anything unrecognised stays large. "bills?" must not match "BILL-90421".
+FAST_TASK = {
+    "servicenow": re.compile(r"\b(look ?up|billing records?|bills?(?!-)|available|slots?|appointments?)\b", re.IGNORECASE),
+    "salesforce": re.compile(r"\b(patient (record|lookup|details)|look ?up|demographic|insurance|coverage|verify|care history|history)\b", re.IGNORECASE),
+}
+
+PATIENT_ID = re.compile(r"PAT-\d+")
+EVIDENCE = re.compile(r"[A-Z]{2,}-[A-Z0-9]{3,}|\$\d|\d%")  # record IDs, amounts, rates
+REFUSAL = re.compile(r"\b(I (cannot|can't|am unable|'m unable)|I don't have access)\b", re.IGNORECASE)
+MIN_OUTPUT_CHARS = 40
+
+
+@dataclass
+class RoutingDecision:
+    agent: str
+    tier: str
+    reason: str
+    escalated: bool = False
+
+    @property
+    def model_id(self) -> str:
+        return MODEL_TIERS[self.tier]
+
+
+def route(agent: str, task: str) -> RoutingDecision:
+    """Choose the model tier for one sub-agent task."""
+    configured = AGENT_TIERS.get(agent, "large")
+    if not MODEL_ROUTING_ENABLED:
+        return RoutingDecision(agent, "large", "routing disabled")
+    if configured != "auto":
+        return RoutingDecision(agent, configured, f"{agent} pinned to {configured}")
+    if WRITE_VERB.search(task) or (WRITE_NOUN.search(task) and not READ_VERB.search(task)):
+        return RoutingDecision(agent, "large", "write task")
+    pattern = FAST_TASK.get(agent)
+    if pattern and pattern.search(task):
+        return RoutingDecision(agent, "fast", "lookup/summarisation task")
+    return RoutingDecision(agent, "large", "no fast-tier match")
+
+
+def validate(task: str, output: str) -> str | None:
+    """Return why a fast-tier answer is unacceptable, or None if it passes."""
+    if len(output.strip()) < MIN_OUTPUT_CHARS:
+        return "answer too short"
+    if REFUSAL.search(output):
+        return "model declined the task"
+    patient = PATIENT_ID.search(task)
+    if patient and patient.group() not in output and not EVIDENCE.search(output):
+        return f"answer has no data for {patient.group()}"
+    return None
+
+
+def estimate_cost(tier: str, input_tokens: int, output_tokens: int) -> float:
+    input_price, output_price = TIER_PRICING[tier]
+    return input_tokens / 1000 * input_price + output_tokens / 1000 * output_price
+
+
+def usage_of(result) -> tuple[int, int]:
+    """(input, output) tokens from a strands AgentResult, (0, 0) if unknown."""
+    usage = getattr(getattr(result, "metrics", None), "accumulated_usage", None) or {}
+    return usage.get("inputTokens", 0), usage.get("outputTokens", 0)
+
+
+def announce(decision: RoutingDecision, display_name: str):
+    """Record the routing decision in the trace."""
+    metrics.incr(f"model_router.{decision.tier}.routed")
+    trace_event("routing", display_name,
+                f"{'Escalated to' if decision.escalated else 'Model tier:'} {decision.tier}",
+                decision.reason, "🧭", "info",
+                {"tier": decision.tier, "model_id": decision.model_id,
+                 "escalated": decision.escalated})
+
+
+def complete(decision: RoutingDecision, task: str, output: str, seconds: float,
+             input_tokens: int = 0, output_tokens: int = 0) -> RoutingDecision | None:
+    """Record a finished call; return the escalation to run next, if any."""
+    cost = estimate_cost(decision.tier, input_tokens, output_tokens)
+    metrics.incr(f"model_router.{decision.tier}.calls")
+    metrics.incr(f"model_router.{decision.tier}.seconds", seconds)
+    metrics.incr(f"model_router.{decision.tier}.cost_usd", cost)
+    add_timing(f"{decision.agent}:{decision.tier}", seconds)
+    record_model_call(decision.tier, seconds, input_tokens, output_tokens, cost)
+
+    if decision.tier == "large":
+        return None
+    failure = validate(task, output)
+    if failure is None:
+        return None
+    metrics.incr("model_router.escalations")
+    return RoutingDecision(decision.agent, "large", f"fast tier failed validation: {failure}",
+                           escalated=True)
@@ -0,0 +1,207 @@
+"""Materialized cross-system view of one patient.
+
+A billing-dispute turn needs the same joined picture every time: the
+patient's ServiceNow bills, tickets and corrections next to their Salesforce
+record, insurance, care history and cases. ``PatientViews`` builds that join
+once per patient, from the mock data and the record stores of both agents,
+and keeps it in an LRU of ``max_patients`` views, so a lookup is one dict
+access.
+
+Views are refreshed incrementally rather than rebuilt: ``PatientViews``
+subscribes to both record stores, and each new record, whether this process
+or another one sharing the store wrote it, is upserted into the cached view
+of its patient (views not cached are built fresh on their next lookup
+anyway). The mock data is read-only.
+
+The join needs both record stores in this process, which is the case in
+direct mode; in A2A mode each sub-agent server owns its own store.
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from shared import metrics
+from shared.record_store import RecordStore
+
+# Record store collections joined into the view, by the ID field of their records
+COLLECTIONS = {"corrections": "correction_id", "tickets": "ticket_id", "cases": "case_id"}
+SALESFORCE_COLLECTIONS = {"cases"}
+CLOSED = {"closed", "resolved", "completed", "cancelled", "paid"}
+
+
+@dataclass(slots=True)
+class PatientView:
+    """Everything both systems hold about one patient. Treat as read-only."""
+
+    patient_id: str
+    patient: dict | None
+    insurance: dict | None
+    care_history: list[dict]
+    bills: list[dict]
+    # Collections writes can change, by record ID (replaced, not mutated, on update)
+    corrections: dict[str, dict] = field(default_factory=dict)
+    tickets: dict[str, dict] = field(default_factory=dict)
+    cases: dict[str, dict] = field(default_factory=dict)
+    version: int = 0
+    _line: str | None = None
+
+    def upsert(self, collection: str, record: dict):
+        records = getattr(self, collection)
+        setattr(self, collection, {**records, record[COLLECTIONS[collection]]: record})
+        self.version += 1
+        self._line = None
+
+    def summary(self) -> str:
+        """One line for the orchestrator: who, coverage, open bills and open items."""
+        if self._line is None:
+            self._line = _summarise(self)
+        return self._line
+
+    def to_dict(self) -> dict:
+        return {"patient_id": self.patient_id, "version": self.version, "summary": self.summary(),
+                "patient": self.patient, "insurance": self.insurance,
+                "care_history": self.care_history, "bills": self.bills,
+                **{c: list(getattr(self, c).values()) for c in COLLECTIONS}}
+
+
+class PatientViews:
+    """Per-patient views over both systems, least recently used evicted."""
+
+    def __init__(self, servicenow_data: dict, salesforce_data: dict,
+                 servicenow_records: RecordStore, salesforce_records: RecordStore,
+                 max_patients: int = 10000):
+        self.servicenow_data = servicenow_data
+        self.salesforce_data = salesforce_data
+        self.servicenow_records = servicenow_records
+        self.salesforce_records = salesforce_records
+        self.max_patients = max_patients
+        self._views: OrderedDict[str, PatientView] = OrderedDict()
+        # Builds run under the lock too, so a write is either seen by the
+        # build or applied to the view once it is cached. Reentrant: a build's
+        # store read may index other processes' records and notify _on_put.
+        self._lock = threading.RLock()
+        self.hits = self.misses = self.updates = self.evictions = 0
+        servicenow_records.subscribe(self._on_put)
+        salesforce_records.subscribe(self._on_put)
+
+    def get(self, patient_id: str) -> PatientView | None:
+        """The patient's view, or None if neither system knows them."""
+        self.servicenow_records.refresh()  # applies other processes' writes via _on_put
+        self.salesforce_records.refresh()
+        with self._lock:
+            view = self._views.get(patient_id)
+            if view is not None:
+                self._views.move_to_end(patient_id)
+                self.hits += 1
+                return view
+            self.misses += 1
+            view = self._build(patient_id)
+            if view is None:
+                return None
+            self._views[patient_id] = view
+            while len(self._views) > self.max_patients:
+                self._views.popitem(last=False)
+                self.evictions += 1
+            return view
+
+    def summary(self, patient_id: str) -> str | None:
+        view = self.get(patient_id)
+        if view is None:
+            return None
+        with self._lock:
+            return view.summary()
+
+    def to_dict(self, patient_id: str) -> dict | None:
+        """The patient's view as JSON-ready data, copied under the lock."""
+        view = self.get(patient_id)
+        if view is None:
+            return None
+        with self._lock:
+            return view.to_dict()
+
+    def _build(self, patient_id: str) -> PatientView | None:
+        sn, sf = self.servicenow_data, self.salesforce_data
+        patient = sf["patients"].get(patient_id)
+        bills = sn["bills"].get(patient_id, [])
+        if patient is None and not bills:
+            return None
+        view = PatientView(patient_id, patient, sf["insurance"].get(patient_id),
+                           sf["care_history"].get(patient_id, []), bills)
+        seeded = {"tickets": sn["tickets"].get(patient_id, []), "cases": sf["cases"].get(patient_id, [])}
+        for collection, id_field in COLLECTIONS.items():
+            store = self.salesforce_records if collection in SALESFORCE_COLLECTIONS else self.servicenow_records
+            records = {r[id_field]: r for r in seeded.get(collection, ())}
+            records.update((r[id_field], r) for r in store.by_patient(collection, patient_id))
+            setattr(view, collection, records)
+        return view
+
+    def _on_put(self, collection: str, record_id: str, record: dict):
+        if collection not in COLLECTIONS:
+            return
+        with self._lock:
+            view = self._views.get(record.get("patient_id"))
+            if view is None:
+                return
+            view.upsert(collection, record)
+            self.updates += 1
+        metrics.incr("patient_view.updates")
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"patients": len(self._views), "max_patients": self.max_patients,
+                    "hits": self.hits, "misses": self.misses,
+                    "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+                    "updates": self.updates, "evictions": self.evictions}
+
+
+_views: PatientViews | None = None
+_views_lock = threading.Lock()
+
+
+def patient_views() -> PatientViews:
+    """The process-wide views over the mock data and both agents' record stores."""
+    global _views
+    from shared.config import PATIENT_VIEW_MAX_PATIENTS, SALESFORCE_DATA_PATH, SERVICENOW_DATA_PATH
+    from shared.mock_data import load_mock_data
+    from shared.record_store import open_record_store
+    with _views_lock:
+        if _views is None:
+            _views = PatientViews(load_mock_data(SERVICENOW_DATA_PATH), load_mock_data(SALESFORCE_DATA_PATH),
+                                  open_record_store("servicenow"), open_record_store("salesforce"),
+                                  PATIENT_VIEW_MAX_PATIENTS)
+        return _views
+
+
+metrics.register_provider("patient_view", lambda: _views.stats() if _views else {})
+
+
+def _open(records: dict[str, dict]) -> list[str]:
+    return [record_id for record_id, r in records.items()
+            if str(r.get("status", "open")).lower() not in CLOSED]
+
+
+def _summarise(view: PatientView) -> str:
+    parts = [view.patient_id]
+    if view.patient:
+        parts.append(f"{view.patient.get('first_name', '')} {view.patient.get('last_name', '')}".strip())
+    insurance = view.insurance
+    if insurance:
+        deductible = (insurance.get("deductible") or {}).get("status", "unknown").replace("_", " ")
+        parts.append(f"{insurance.get('plan_name') or insurance.get('carrier')} "
+                     f"({insurance.get('status')}, deductible {deductible})")
+    for bill in view.bills:
+        if str(bill.get("status", "")).lower() in CLOSED:
+            continue
+        line = f"{bill['bill_id']} ${bill.get('billed_amount', 0):,.2f} {bill.get('status', '')}"
+        if bill.get("error_flags"):
+            line += f" [{', '.join(bill['error_flags'])}]"
+        parts.append(line)
+    open_items = [i for c in COLLECTIONS for i in _open(getattr(view, c))]
+    if open_items:
+        parts.append("open: " + ", ".join(open_items))
+    if view.care_history:
+        visit = max(view.care_history, key=lambda v: v.get("date", ""))
+        parts.append(f"last visit {visit.get('date')} {visit.get('department', '')}".rstrip())
+    return "; ".join(parts)
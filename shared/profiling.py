@@ -0,0 +1,200 @@
+"""Opt-in sampling profiler for the orchestration hot path.
+
+While at least one profiled request is active, a background thread samples
+every thread's Python stack at a fixed interval. Each sample attributes the
+elapsed wall time to the sampled stack, and the CPU time the thread consumed
+since the previous sample (read from its per-thread CPU clock) to the same
+stack. Threads blocked on the model show up in the wall profile but not in the
+CPU profile, which is what separates our own Python overhead from waiting on
+Bedrock.
+
+Threads with nothing to do are left out: an event loop waiting in its
+selector, a pool worker waiting for work, a thread parked in
+``Condition.wait``. Otherwise those idle stacks outweigh everything else in
+the wall profile. Work of other requests running at the same time is still
+sampled, so profile a request on its own to see only its work.
+
+Results are kept as collapsed stacks (``frame;frame;frame value``), the input
+format of flamegraph.pl and speedscope.
+"""
+
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# Code paths reported individually in the summary. Matched as substrings of
+# the frame label, so nested tools ("create_traced_tools.<locals>.…") count
+# towards their enclosing factory as well.
+HOT_PATHS = (
+    "create_traced_tools",
+    "extract_visual_data",
+    "run_agent_with_thinking",
+    "event_generator",
+    "billing_lookup",
+    "billing_correct",
+    "ticket_create",
+    "appointment_schedule",
+    "patient_lookup",
+    "insurance_verify",
+    "care_history",
+    "case_create",
+    "json:dumps",
+)
+
+MAX_STACK_DEPTH = 128
+
+# Innermost frames of a thread that is idle: selector waits, pool workers
+# blocked on their work queue (a C call, so the worker loop is innermost)
+# and lock/condition waits, which queue.Queue.get ends up in as well.
+IDLE_FRAMES = frozenset({
+    "selectors:EpollSelector.select",
+    "selectors:PollSelector.select",
+    "selectors:KqueueSelector.select",
+    "selectors:SelectSelector.select",
+    "selectors:DevpollSelector.select",
+    "concurrent.futures.thread:_worker",
+    "threading:Condition.wait",
+    "threading:Event.wait",
+    "threading:Semaphore.acquire",
+    "threading:Thread._wait_for_tstate_lock",
+})
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{module}:{name}"
+
+
+def _collapse(frame) -> str:
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return ";".join(labels)
+
+
+def _thread_cpu_time(thread_id: int) -> float | None:
+    """CPU seconds consumed by a thread, or None where unsupported."""
+    try:
+        return time.clock_gettime(time.pthread_getcpuclockid(thread_id))
+    except (AttributeError, OSError, OverflowError):
+        return None
+
+
+class SamplingProfiler:
+    """Samples busy threads' stacks while at least one session is open."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._active = 0
+        self._thread: threading.Thread | None = None
+        self._wall: Counter[str] = Counter()  # microseconds
+        self._cpu: Counter[str] = Counter()   # microseconds
+        self._samples = 0
+        self._sampled_seconds = 0.0
+        self._idle_seconds = 0.0  # thread-seconds skipped as idle
+        self._cpu_clock: dict[int, float] = {}
+
+    @contextmanager
+    def session(self):
+        """Profile everything that runs while this context is open."""
+        with self._lock:
+            self._active += 1
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="sampling-profiler", daemon=True
+                )
+                self._thread.start()
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def _run(self):
+        own_id = threading.get_ident()
+        last = time.perf_counter()
+        while True:
+            time.sleep(self.interval)
+            now = time.perf_counter()
+            elapsed_us = int((now - last) * 1_000_000)
+            last = now
+            frames = sys._current_frames()
+            with self._lock:
+                if self._active == 0:
+                    self._thread = None
+                    self._cpu_clock.clear()
+                    return
+                for thread_id, frame in frames.items():
+                    if thread_id == own_id:
+                        continue
+                    cpu = _thread_cpu_time(thread_id)
+                    previous = self._cpu_clock.get(thread_id)
+                    if cpu is not None:
+                        self._cpu_clock[thread_id] = cpu
+                    if _frame_label(frame) in IDLE_FRAMES:
+                        self._idle_seconds += elapsed_us / 1_000_000
+                        continue
+                    stack = _collapse(frame)
+                    self._wall[stack] += elapsed_us
+                    if cpu is not None and previous is not None and cpu > previous:
+                        self._cpu[stack] += int((cpu - previous) * 1_000_000)
+                for thread_id in set(self._cpu_clock) - set(frames):
+                    del self._cpu_clock[thread_id]
+                self._samples += 1
+                self._sampled_seconds += elapsed_us / 1_000_000
+
+    @property
+    def active(self) -> bool:
+        return self._active > 0
+
+    def reset(self):
+        with self._lock:
+            self._wall.clear()
+            self._cpu.clear()
+            self._samples = 0
+            self._sampled_seconds = 0.0
+            self._idle_seconds = 0.0
+
+    def collapsed(self, kind: str = "wall") -> str:
+        """Collapsed-stack text, one ``stack value`` line per unique stack."""
+        counter = self._cpu if kind == "cpu" else self._wall
+        with self._lock:
+            items = sorted(counter.items())
+        return "\n".join(f"{stack} {value}" for stack, value in items) + "\n"
+
+    def summary(self, top: int = 10) -> dict:
+        """Inclusive wall/CPU seconds per hot path plus the heaviest stacks."""
+        with self._lock:
+            wall = dict(self._wall)
+            cpu = dict(self._cpu)
+            samples = self._samples
+            sampled_seconds = self._sampled_seconds
+            idle_seconds = self._idle_seconds
+
+        def inclusive(counter: dict[str, int], path: str) -> float:
+            return round(sum(v for s, v in counter.items() if path in s) / 1_000_000, 4)
+
+        def heaviest(counter: dict[str, int]) -> list[dict]:
+            ranked = sorted(counter.items(), key=lambda kv: kv[1], reverse=True)[:top]
+            return [{"stack": s, "seconds": round(v / 1_000_000, 4)} for s, v in ranked]
+
+        return {
+            "active": self.active,
+            "samples": samples,
+            "sampled_seconds": round(sampled_seconds, 3),
+            "idle_thread_seconds": round(idle_seconds, 3),
+            "interval_ms": self.interval * 1000,
+            "hot_paths": {
+                path: {"wall": inclusive(wall, path), "cpu": inclusive(cpu, path)}
+                for path in HOT_PATHS
+            },
+            "top_wall": heaviest(wall),
+            "top_cpu": heaviest(cpu),
+        }
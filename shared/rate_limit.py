@@ -0,0 +1,316 @@
+"""Client-side rate limiting toward Bedrock, per model ID.
+
+Every model call made through ``create_bedrock_model`` first takes a request
+from a requests-per-minute bucket and its estimated tokens from a
+tokens-per-minute bucket for that model, then one of the model's concurrency
+slots. Callers queue in priority order: interactive chat ahead of batch jobs
+(``current_lane``), FIFO within a lane. Once the call finishes the token
+reservation is corrected to the actual usage.
+
+On a throttle the model's concurrency limit halves (at most once per
+cooldown) and its request bucket is emptied, so every caller pauses together
+instead of each strands retry loop backing off on its own; successes grow the
+limit back one slot at a time.
+
+Bucket levels live in process memory by default. With
+``RATE_LIMIT_SHARED_FILE`` set they are kept in that file under an exclusive
+``flock`` instead, so all workers on a host draw from the same budget; that
+file is only read and written in a worker thread (``asyncio.to_thread``),
+never on the event loop. Concurrency limits stay per process.
+
+Waiting callers do not poll. Only the head of the queue tries to take budget
+and a slot; everyone else sleeps on a future until the head changes. The head
+sleeps until whichever comes first: the time its bucket needs to refill, or
+a wake-up from a released slot or returned tokens.
+"""
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import json
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+from shared import deadline, metrics
+from shared.tracing import add_timing
+
+LANES = {"interactive": 0, "batch": 1}
+
+current_lane: contextvars.ContextVar[str] = contextvars.ContextVar("rate_limit_lane",
+                                                                  default="interactive")
+
+THROTTLE_ERRORS = {"ModelThrottledException", "ThrottlingException", "TooManyRequestsException"}
+
+
+def is_throttle(error: BaseException | None) -> bool:
+    """True if the error, or anything it was raised from, is a throttle."""
+    while error is not None:
+        if type(error).__name__ in THROTTLE_ERRORS:
+            return True
+        response = getattr(error, "response", None)  # botocore ClientError
+        if isinstance(response, dict) and response.get("Error", {}).get("Code") in THROTTLE_ERRORS:
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+def estimate_tokens(messages: list, system_prompt: str | None, expected_output: int) -> int:
+    """Rough token count for a request: ~4 characters per token plus expected output."""
+    chars = len(json.dumps(messages, default=str)) + len(system_prompt or "")
+    return chars // 4 + expected_output
+
+
+# ── Bucket state ────────────────────────────────────────────────
+
+class _LocalState:
+    in_memory = True
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data: dict[str, dict] = {}
+
+    @contextmanager
+    def locked(self):
+        with self._lock:
+            yield self._data
+
+
+class _FileState:
+    """Bucket levels in a JSON file shared by every worker on the host.
+
+    ``locked`` blocks on the file lock and does file I/O: call it from a
+    worker thread.
+    """
+
+    in_memory = False
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def locked(self):
+        import fcntl
+        with self._lock, open(self.path, "a+", encoding="utf-8") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            raw = f.read()
+            data = json.loads(raw) if raw.strip() else {}
+            yield data
+            f.seek(0)
+            f.truncate()
+            f.write(json.dumps(data))
+            f.flush()
+
+
+def _refill(bucket: dict, per_minute: float, now: float):
+    level = bucket.get("level", per_minute)
+    elapsed = max(0.0, now - bucket.get("updated", now))
+    bucket["level"] = min(per_minute, level + elapsed * per_minute / 60)
+    bucket["updated"] = now
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+# ── Per-model limiter ───────────────────────────────────────────
+
+class ModelLimiter:
+    """RPM/TPM buckets, priority queue and adaptive concurrency for one model."""
+
+    def __init__(self, model_id: str, rpm: float, tpm: float, max_concurrency: int,
+                 state, cooldown: float = 1.0, increase_after: int = 5):
+        self.model_id = model_id
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_concurrency = max_concurrency
+        self.limit = max_concurrency
+        self.active = 0
+        self.cooldown = cooldown
+        self.increase_after = increase_after
+        self._state = state
+        self._lock = threading.Lock()
+        self._queue: list[tuple[int, int]] = []
+        self._waiters: dict[tuple[int, int], tuple[asyncio.AbstractEventLoop, asyncio.Future]] = {}
+        self._tickets = itertools.count()
+        self._successes = 0
+        self._last_decrease = 0.0
+        self.throttles = 0
+
+    def _take_budget(self, tokens: int) -> float:
+        """Take one request and ``tokens`` from the buckets; else seconds until they refill."""
+        with self._state.locked() as data:
+            now = time.time()
+            requests = data.setdefault(f"{self.model_id}:rpm", {})
+            token_bucket = data.setdefault(f"{self.model_id}:tpm", {})
+            _refill(requests, self.rpm, now)
+            _refill(token_bucket, self.tpm, now)
+            needed = min(tokens, self.tpm)
+            wait = max((1 - requests["level"]) * 60 / self.rpm,
+                       (needed - token_bucket["level"]) * 60 / self.tpm, 0.0)
+            if wait > 0:
+                return wait
+            requests["level"] -= 1
+            token_bucket["level"] -= needed
+            return 0.0
+
+    async def _in_state(self, fn, *args):
+        """Run a bucket update inline for in-memory state, in a worker thread for the file."""
+        if self._state.in_memory:
+            return fn(*args)
+        return await asyncio.to_thread(fn, *args)
+
+    def _wake_head(self):
+        """Let the head of the queue retry; call holding ``_lock``."""
+        if self._queue:
+            waiter = self._waiters.get(self._queue[0])
+            if waiter is not None:
+                loop, future = waiter
+                loop.call_soon_threadsafe(_resolve, future)
+
+    async def acquire(self, tokens: int, lane: str = "interactive") -> float:
+        """Wait for budget and a slot; returns the seconds spent waiting."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            ticket = (LANES.get(lane, 0), next(self._tickets))
+            heapq.heappush(self._queue, ticket)
+        start = time.monotonic()
+        reserved = False
+        try:
+            while True:
+                future = loop.create_future()
+                with self._lock:
+                    self._waiters[ticket] = (loop, future)
+                    # Only the head may take a slot; reserve it before taking budget
+                    reserved = self._queue[0] == ticket and self.active < self.limit
+                    if reserved:
+                        self.active += 1
+                timeout = None  # not our turn: sleep until woken
+                if reserved:
+                    timeout = await self._in_state(self._take_budget, tokens)
+                    if timeout == 0:
+                        break
+                    with self._lock:
+                        self.active -= 1
+                        reserved = False
+                await deadline.race(asyncio.wait({future}, timeout=timeout))
+        except BaseException:
+            with self._lock:
+                if reserved:
+                    self.active -= 1
+                self._waiters.pop(ticket, None)
+                if ticket in self._queue:
+                    self._queue.remove(ticket)
+                    heapq.heapify(self._queue)
+                self._wake_head()
+            raise
+        with self._lock:
+            heapq.heappop(self._queue)  # our ticket: only the head reserves
+            del self._waiters[ticket]
+            self._wake_head()
+        return time.monotonic() - start
+
+    def release(self, throttled: bool):
+        """Free the slot and adapt the concurrency limit to the outcome."""
+        with self._lock:
+            self.active -= 1
+            if throttled:
+                self.throttles += 1
+                self._successes = 0
+                now = time.monotonic()
+                if now - self._last_decrease >= self.cooldown:
+                    self._last_decrease = now
+                    self.limit = max(1, self.limit // 2)
+            else:
+                self._successes += 1
+                if self._successes >= self.increase_after and self.limit < self.max_concurrency:
+                    self.limit += 1
+                    self._successes = 0
+            self._wake_head()
+
+    def _return_tokens(self, reserved: int, used: int | None, throttled: bool):
+        with self._state.locked() as data:
+            now = time.time()
+            if used is not None:
+                bucket = data.setdefault(f"{self.model_id}:tpm", {})
+                _refill(bucket, self.tpm, now)
+                bucket["level"] = min(self.tpm, bucket["level"] + reserved - used)
+            if throttled:
+                bucket = data.setdefault(f"{self.model_id}:rpm", {})
+                _refill(bucket, self.rpm, now)
+                bucket["level"] = min(bucket["level"], 0.0)
+
+    async def settle(self, reserved: int, used: int | None, throttled: bool):
+        """Correct the token reservation to ``used``; empty the request bucket on a throttle."""
+        await self._in_state(self._return_tokens, reserved, used, throttled)
+        if used is not None and used < reserved:
+            with self._lock:
+                self._wake_head()  # the head may be waiting on the tokens just returned
+
+    @asynccontextmanager
+    async def request(self, tokens: int):
+        """Hold budget and a slot for one model call; report usage via the yielded dict."""
+        lane = current_lane.get()
+        waited = await self.acquire(tokens, lane)
+        metrics.incr(f"rate_limit.{lane}.requests")
+        if waited > 0.001:
+            metrics.incr(f"rate_limit.{lane}.wait_seconds", waited)
+            add_timing("rate_limit_wait", waited)
+        usage: dict = {}
+        throttled = False
+        try:
+            yield usage
+        except BaseException as e:
+            throttled = is_throttle(e)
+            if throttled:
+                metrics.incr("rate_limit.throttles")
+            raise
+        finally:
+            used = usage.get("inputTokens", 0) + usage.get("outputTokens", 0) if usage else None
+            self.release(throttled)
+            if used is not None or throttled:
+                await self.settle(tokens, used, throttled)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"active": self.active, "limit": self.limit, "max": self.max_concurrency,
+                    "queued": len(self._queue), "throttles": self.throttles}
+
+
+_limiters: dict[str, ModelLimiter] = {}
+_limiters_lock = threading.Lock()
+_state = None
+
+
+def limiter_for(model_id: str) -> ModelLimiter:
+    """The process-wide limiter for a model ID, configured from shared.config."""
+    global _state
+    limiter = _limiters.get(model_id)
+    if limiter is not None:
+        return limiter
+    from shared.config import (
+        BEDROCK_MAX_CONCURRENCY, BEDROCK_RATE_LIMITS, BEDROCK_RPM, BEDROCK_TPM,
+        RATE_LIMIT_SHARED_FILE,
+    )
+    with _limiters_lock:
+        if _state is None:
+            _state = _FileState(RATE_LIMIT_SHARED_FILE) if RATE_LIMIT_SHARED_FILE else _LocalState()
+        if model_id not in _limiters:
+            limits = BEDROCK_RATE_LIMITS.get(model_id, {})
+            _limiters[model_id] = ModelLimiter(
+                model_id,
+                rpm=limits.get("rpm", BEDROCK_RPM),
+                tpm=limits.get("tpm", BEDROCK_TPM),
+                max_concurrency=limits.get("concurrency", BEDROCK_MAX_CONCURRENCY),
+                state=_state,
+            )
+        return _limiters[model_id]
+
+
+metrics.register_provider("rate_limit", lambda: {
+    model_id: limiter.stats() for model_id, limiter in list(_limiters.items())
+})
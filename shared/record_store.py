@@ -0,0 +1,386 @@
+"""Durable write-through store for records the agents create, shared by processes.
+
+Tickets, cases and billing corrections are appended to a JSON-lines log, one
+``{"c": collection, "id": ..., "r": record}`` entry per write; a later entry
+for the same id replaces the earlier one. Fields starting with ``_`` are
+bookkeeping (creation time, idempotency key) and are not returned to agents.
+An in-memory index (by id, by patient and by idempotency key) answers every
+read.
+
+Any number of processes on the host may open the same log, e.g. the workers
+of one A2A server. Appends take an exclusive ``flock`` on a ``.lock`` file
+next to the log for a few microseconds: the writer first indexes whatever
+other processes appended since it last looked, then writes its line. Reads
+catch up the same way without the lock, consuming complete lines only, so
+every process sees every other process's records and ``put_once`` can check
+an idempotency key and append in one atomic step. A torn final line (a crash
+mid-write) is truncated away by the next writer; a complete line that does
+not parse is counted in ``corrupt_entries``.
+
+Subscribers (``subscribe``) are told of each record once it is indexed: the
+process's own puts in the writing thread, other processes' records in the
+thread that catches up with them. ``shared.patient_view`` keeps its views
+current that way.
+
+Appends go to the page cache, so the tool hot path never waits on the disk. A
+background thread fsyncs them every ``fsync_interval`` seconds (group
+commit); ``flush()`` blocks until everything this process appended so far is
+durable. When the log holds many more entries than live records, the same
+thread compacts it under the lock: the live records are written to a
+temporary file, fsynced and atomically renamed over the log, and the other
+processes re-read the new file when they notice the rename.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # not POSIX: only one process may open a log
+    fcntl = None
+
+from shared import metrics
+
+Entry = tuple[str, str, dict]  # (collection, record_id, record)
+
+
+class RecordStore:
+    """Append-only, periodically compacted record log with an in-memory index."""
+
+    def __init__(self, path: str | os.PathLike, fsync_interval: float = 0.05,
+                 compact_min_entries: int = 1000, compact_ratio: float = 2.0):
+        self.path = Path(path)
+        self.fsync_interval = fsync_interval
+        self.compact_min_entries = compact_min_entries
+        self.compact_ratio = compact_ratio
+        self._lock = threading.Lock()        # index and log position
+        self._write_lock = threading.Lock()  # this process's appenders (flock does not exclude threads)
+        self._flushed = threading.Condition()
+        self._records: dict[str, dict[str, dict]] = defaultdict(dict)
+        self._by_patient: dict[str, dict[str, list[str]]] = defaultdict(lambda: defaultdict(list))
+        self._keys: dict[str, tuple[str, str]] = {}  # idempotency key -> (collection, record_id)
+        self._ino: int | None = None  # inode of the log the index was read from
+        self._offset = 0              # bytes of that log indexed so far
+        self._reader = self._file = None
+        self._written = 0   # sequence of the last line this process appended
+        self._durable = 0   # sequence of the last fsynced one
+        self._log_entries = 0
+        self.corrupt_entries = 0
+        self.torn_bytes = 0
+        self.compactions = 0
+        self._closed = False
+        self._listeners: list = []
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lockfile = open(self.path.with_name(self.path.name + ".lock"), "a+b")
+        with self._exclusive(), self._lock:
+            self.path.touch(exist_ok=True)
+            self._sync(exclusive=True)
+        self._thread = threading.Thread(target=self._run, name=f"record-store:{self.path.name}",
+                                        daemon=True)
+        self._thread.start()
+
+    # ── Reads ───────────────────────────────────────────────────
+
+    def get(self, collection: str, record_id: str) -> dict | None:
+        self.refresh()
+        with self._lock:
+            return self._records[collection].get(record_id)
+
+    def by_patient(self, collection: str, patient_id: str) -> list[dict]:
+        """A patient's records, oldest first, without ``_``-prefixed bookkeeping fields."""
+        self.refresh()
+        with self._lock:
+            records = self._records[collection]
+            return [_public(records[i]) for i in self._by_patient[collection].get(patient_id, ())]
+
+    def items(self, collection: str) -> list[tuple[str, dict]]:
+        self.refresh()
+        with self._lock:
+            return list(self._records[collection].items())
+
+    def refresh(self):
+        """Index the records other processes appended since the last look."""
+        with self._lock:
+            fresh = self._sync()
+        self._notify(fresh)
+
+    # ── Writes ──────────────────────────────────────────────────
+
+    def put(self, collection: str, record_id: str, record: dict) -> int:
+        """Index a record and append it to the log; returns its sequence number."""
+        with self._write_lock, self._exclusive(), self._lock:
+            fresh = self._sync(exclusive=True)
+            sequence = self._append(collection, record_id, record)
+        self._notify(fresh + [(collection, record_id, record)])
+        return sequence
+
+    def put_once(self, collection: str, record_id: str, record: dict, key: str,
+                 ttl: float) -> tuple[str, bool]:
+        """Put ``record`` unless ``key`` created a record in the last ``ttl`` seconds.
+
+        Returns ``(record_id, duplicate)``: the existing record's ID for a
+        repeat, whichever process wrote it, else ``record_id``. The record is
+        stored with ``_idempotency_key`` and, if missing, ``_created_at``.
+        """
+        record = {"_created_at": time.time(), **record, "_idempotency_key": key}
+        with self._write_lock, self._exclusive(), self._lock:
+            fresh = self._sync(exclusive=True)
+            found = self._keys.get(key)
+            existing = self._records[found[0]].get(found[1]) if found else None
+            if existing is not None and existing.get("_created_at", 0) + ttl > time.time():
+                record_id, written = found[1], []
+            else:
+                self._append(collection, record_id, record)
+                written = [(collection, record_id, record)]
+        self._notify(fresh + written)
+        return record_id, not written
+
+    def subscribe(self, listener):
+        """Call ``listener(collection, record_id, record)`` for each new record (no bookkeeping fields)."""
+        self._listeners.append(listener)
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Block until every record this process put so far is fsynced."""
+        target = self._written
+        with self._flushed:
+            return self._flushed.wait_for(lambda: self._durable >= target, timeout)
+
+    def close(self):
+        self.flush(timeout=5)
+        with self._lock:
+            self._closed = True
+        self._thread.join(timeout=5)
+        with self._lock:
+            self._file.close()
+            self._reader.close()
+        self._lockfile.close()
+
+    # ── Internals ───────────────────────────────────────────────
+
+    @contextmanager
+    def _exclusive(self):
+        """Hold the log's cross-process lock (appends, torn-tail repair, compaction)."""
+        if fcntl is None:
+            yield
+            return
+        fcntl.flock(self._lockfile, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lockfile, fcntl.LOCK_UN)
+
+    def _append(self, collection: str, record_id: str, record: dict) -> int:
+        # Called holding both locks, right after _sync: the log ends at _offset
+        if self._closed:
+            raise RuntimeError(f"record store {self.path} is closed")
+        line = (json.dumps({"c": collection, "id": record_id, "r": record}, separators=(",", ":"))
+                + "\n").encode()
+        self._file.write(line)
+        self._file.flush()
+        self._offset += len(line)
+        self._log_entries += 1
+        self._index(collection, record_id, record)
+        self._written += 1
+        return self._written
+
+    def _index(self, collection: str, record_id: str, record: dict):
+        records = self._records[collection]
+        if record_id not in records:
+            patient_id = record.get("patient_id")
+            if patient_id:
+                self._by_patient[collection][patient_id].append(record_id)
+        records[record_id] = record
+        key = record.get("_idempotency_key")
+        if key:
+            self._keys[key] = (collection, record_id)
+
+    def _notify(self, entries: list[Entry]):
+        if self._listeners:
+            for collection, record_id, record in entries:
+                public = _public(record)
+                for listener in self._listeners:
+                    listener(collection, record_id, public)
+
+    def _sync(self, exclusive: bool = False) -> list[Entry]:
+        """Index what the log gained since the last sync; call holding ``_lock``.
+
+        Only a caller holding the cross-process lock (``exclusive``) may treat
+        an unterminated last line as torn: otherwise it may still be being
+        written.
+        """
+        if self._closed:
+            return []
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return []  # mid-rename by a compacting process; the next look sees the new log
+        if stat.st_ino != self._ino:
+            return self._reopen(exclusive)
+        if stat.st_size == self._offset:
+            return []
+        return self._read(exclusive)
+
+    def _reopen(self, exclusive: bool) -> list[Entry]:
+        # First open, or another process compacted the log: index the new file
+        # from scratch and report the records that differ from what we had
+        previous = self._records
+        self._records = defaultdict(dict)
+        self._by_patient = defaultdict(lambda: defaultdict(list))
+        self._keys = {}
+        self._attach()
+        self._log_entries = 0
+        self._read(exclusive)
+        return [(c, record_id, record) for c, records in self._records.items()
+                for record_id, record in records.items()
+                if previous.get(c, {}).get(record_id) != record]
+
+    def _attach(self):
+        for f in (self._reader, self._file):
+            if f is not None:
+                f.close()
+        self._reader = open(self.path, "rb")
+        self._file = open(self.path, "ab")
+        self._ino = os.fstat(self._reader.fileno()).st_ino
+        self._offset = 0
+
+    def _read(self, exclusive: bool) -> list[Entry]:
+        self._reader.seek(self._offset)
+        data = self._reader.read()
+        end = data.rfind(b"\n") + 1
+        fresh = []
+        for line in data[:end].splitlines():
+            try:
+                entry = json.loads(line)
+                collection, record_id, record = entry["c"], entry["id"], entry["r"]
+                self._index(collection, record_id, record)
+            except (ValueError, KeyError, TypeError, AttributeError):
+                # A complete line that does not parse is real corruption, not a torn write
+                self.corrupt_entries += 1
+                metrics.incr("record_store.corrupt_entries")
+                continue
+            self._log_entries += 1
+            fresh.append((collection, record_id, record))
+        self._offset += end
+        if exclusive and end < len(data):
+            # A writer died mid-line. Cut the fragment off, or the next append
+            # would be glued onto it and lost on the following load.
+            with open(self.path, "r+b") as f:
+                f.truncate(self._offset)
+                f.flush()
+                os.fsync(f.fileno())
+            self.torn_bytes += len(data) - end
+            metrics.incr("record_store.torn_tails")
+        return fresh
+
+    def _live_records(self) -> int:
+        return sum(len(r) for r in list(self._records.values()))
+
+    def _run(self):
+        while True:
+            time.sleep(self.fsync_interval)
+            closed = self._closed
+            with self._lock:
+                target = self._written
+                fd = os.dup(self._file.fileno()) if target > self._durable else None
+            if fd is not None:
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+                metrics.incr("record_store.fsyncs")
+                metrics.incr("record_store.writes", target - self._durable)
+            with self._flushed:
+                self._durable = target
+                self._flushed.notify_all()
+            if self._compaction_due() and not closed:
+                self._compact()
+            if closed:
+                return
+
+    def _compaction_due(self) -> bool:
+        # Compact once superseded entries outnumber live ones; the next
+        # compaction then needs as many new entries again (amortised O(1))
+        return (self._log_entries >= self.compact_min_entries
+                and self._log_entries > self.compact_ratio * self._live_records())
+
+    def _compact(self):
+        with self._write_lock, self._exclusive():
+            with self._lock:
+                fresh = self._sync(exclusive=True)
+                if self._closed or not self._compaction_due():
+                    snapshot = None  # another process compacted first
+                else:
+                    snapshot = [(c, records.copy()) for c, records in self._records.items()]
+            if snapshot is not None:
+                # Nobody can append while we hold both locks, so the snapshot is the whole log
+                tmp = self.path.with_suffix(self.path.suffix + ".compact")
+                entries = 0
+                with open(tmp, "w", encoding="utf-8") as f:
+                    for collection, records in snapshot:
+                        for record_id, record in records.items():
+                            f.write(json.dumps({"c": collection, "id": record_id, "r": record},
+                                               separators=(",", ":")) + "\n")
+                            entries += 1
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.path)
+                dir_fd = os.open(self.path.parent, os.O_RDONLY)
+                try:
+                    os.fsync(dir_fd)
+                finally:
+                    os.close(dir_fd)
+                with self._lock:
+                    self._attach()
+                    self._offset = os.fstat(self._reader.fileno()).st_size
+                    self._log_entries = entries
+                self.compactions += 1
+                metrics.incr("record_store.compactions")
+        self._notify(fresh)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "records": {c: len(r) for c, r in self._records.items()},
+                "log_entries": self._log_entries,
+                "unsynced": self._written - self._durable,
+                "compactions": self.compactions,
+                "corrupt_entries": self.corrupt_entries,
+                "torn_bytes": self.torn_bytes,
+            }
+
+
+def _public(record: dict) -> dict:
+    return {k: v for k, v in record.items() if not k.startswith("_")}
+
+
+_stores: dict[str, RecordStore] = {}
+_stores_lock = threading.Lock()
+
+
+def open_record_store(name: str) -> RecordStore:
+    """The process-wide store for one agent, opened on first use."""
+    from shared.config import (
+        RECORD_STORE_COMPACT_MIN_ENTRIES, RECORD_STORE_DIR, RECORD_STORE_FSYNC_MS,
+    )
+    with _stores_lock:
+        store = _stores.get(name)
+        if store is None:
+            store = _stores[name] = RecordStore(
+                Path(RECORD_STORE_DIR) / f"{name}.jsonl",
+                fsync_interval=RECORD_STORE_FSYNC_MS / 1000,
+                compact_min_entries=RECORD_STORE_COMPACT_MIN_ENTRIES,
+            )
+            atexit.register(store.close)
+        return store
+
+
+metrics.register_provider("record_store", lambda: {
+    name: store.stats() for name, store in list(_stores.items())
+})
@@ -0,0 +1,290 @@
+"""Circuit breakers, hedging and load balancing across remote agent replicas.
+
+An ``EndpointGroup`` holds the replica URLs of one remote agent. Each replica
+has a circuit breaker over its recent calls: once too many of them failed or
+took longer than the slow-call threshold, the breaker opens and the replica
+gets no traffic until a cool-off has passed; then a single probe call decides
+whether it closes again. Calls go to the available replica with the fewest
+calls in flight (ties broken by recent latency).
+
+``EndpointGroup.call`` adds two things on top:
+
+* hedging: if the chosen replica has not answered within the group's recent
+  p95 latency, the same request is also sent to a second replica and the
+  first answer wins; the other is cancelled, and counts as a failed call for
+  its breaker only if it had started first (a hedge that loses is not the
+  replica's fault);
+* failover: a replica that fails is skipped and the next one tried.
+
+A ``RequestCancelled`` (the caller went away or ran out of budget) is the
+caller's doing: it counts against no replica and is not retried.
+
+When every replica's breaker is open the call fails fast with
+``CircuitOpen`` instead of waiting on a timeout.
+
+State is guarded by a threading lock and holds no asyncio objects, so one
+group can serve calls from any event loop.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable
+
+from shared import metrics
+from shared.deadline import RequestCancelled
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpen(Exception):
+    """No replica of a remote agent is currently accepting calls."""
+
+    def __init__(self, name: str):
+        super().__init__(f"{name}: circuit open on every endpoint")
+        self.name = name
+
+
+class CircuitBreaker:
+    """Failure/slow-call rate breaker over the last ``window`` calls."""
+
+    def __init__(self, name: str, window: int = 20, min_calls: int = 5,
+                 failure_rate: float = 0.5, slow_call_seconds: float = 20.0,
+                 open_seconds: float = 30.0):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.trips = 0
+        self._outcomes: deque[bool] = deque(maxlen=window)  # True = failed or slow
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        """Whether a call may be sent now (without reserving the probe)."""
+        with self._lock:
+            if self.state == OPEN:
+                return time.monotonic() - self.opened_at >= self.open_seconds
+            return self.state == CLOSED or not self._probing
+
+    def acquire(self) -> bool:
+        """Reserve a call; in half-open state only one probe is let through."""
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self.opened_at < self.open_seconds:
+                    return False
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == HALF_OPEN:
+                if self._probing:
+                    return False
+                self._probing = True
+            return True
+
+    def record(self, ok: bool, seconds: float):
+        bad = not ok or seconds >= self.slow_call_seconds
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probing = False
+                if bad:
+                    self._open()
+                else:
+                    self.state = CLOSED
+                    self._outcomes.clear()
+                    metrics.incr("resilience.breaker_closed")
+                return
+            self._outcomes.append(bad)
+            if (self.state == CLOSED and len(self._outcomes) >= self.min_calls
+                    and sum(self._outcomes) / len(self._outcomes) >= self.failure_rate):
+                self._open()
+
+    def abandon(self):
+        """The reserved call was cancelled before it finished; it says nothing."""
+        with self._lock:
+            self._probing = False
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.trips += 1
+        metrics.incr("resilience.breaker_opened")
+
+    def stats(self) -> dict:
+        with self._lock:
+            outcomes = list(self._outcomes)
+            return {
+                "state": self.state,
+                "trips": self.trips,
+                "recent_calls": len(outcomes),
+                "recent_failure_rate": round(sum(outcomes) / len(outcomes), 3) if outcomes else 0.0,
+            }
+
+
+class LatencyWindow:
+    """Latencies of the last ``size`` successful calls."""
+
+    def __init__(self, size: int = 100):
+        self._samples: deque[float] = deque(maxlen=size)
+
+    def add(self, seconds: float):
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, q: float) -> float | None:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Endpoint:
+    """One replica URL with its breaker, latency window and in-flight count."""
+
+    def __init__(self, url: str, breaker: CircuitBreaker):
+        self.url = url
+        self.breaker = breaker
+        self.latency = LatencyWindow()
+        self.in_flight = 0
+        self.cache: dict[str, Any] = {}  # per-replica data for the caller (e.g. agent card)
+
+    def stats(self) -> dict:
+        p50, p95 = self.latency.percentile(0.5), self.latency.percentile(0.95)
+        return {
+            **self.breaker.stats(),
+            "in_flight": self.in_flight,
+            "p50_seconds": round(p50, 3) if p50 is not None else None,
+            "p95_seconds": round(p95, 3) if p95 is not None else None,
+        }
+
+
+class EndpointGroup:
+    """The replicas of one remote agent, called through ``call``."""
+
+    def __init__(self, name: str, urls: list[str], breaker: Callable[[str], CircuitBreaker],
+                 hedge: bool = True, hedge_min_seconds: float = 1.0, hedge_min_samples: int = 10):
+        self.name = name
+        self.endpoints = [Endpoint(url, breaker(f"{name}@{url}")) for url in urls]
+        self.hedge = hedge
+        self.hedge_min_seconds = hedge_min_seconds
+        self.hedge_min_samples = hedge_min_samples
+        self.latency = LatencyWindow()
+        self._lock = threading.Lock()
+
+    def pick(self, exclude: set[str] = frozenset()) -> Endpoint | None:
+        """Reserve the least-loaded available replica not in ``exclude``."""
+        with self._lock:
+            candidates = sorted(
+                (e for e in self.endpoints if e.url not in exclude and e.breaker.available()),
+                key=lambda e: (e.in_flight, e.latency.percentile(0.5) or 0.0),
+            )
+            for endpoint in candidates:
+                if endpoint.breaker.acquire():
+                    endpoint.in_flight += 1
+                    return endpoint
+        return None
+
+    def hedge_delay(self) -> float | None:
+        """Seconds to wait on the first replica before hedging, or None."""
+        if not self.hedge or len(self.endpoints) < 2 or len(self.latency) < self.hedge_min_samples:
+            return None
+        return max(self.latency.percentile(0.95), self.hedge_min_seconds)
+
+    async def _attempt(self, endpoint: Endpoint, fn: Callable[[Endpoint], Awaitable[Any]],
+                       outrun: set[str]):
+        start = time.monotonic()
+        try:
+            result = await fn(endpoint)
+        except asyncio.CancelledError:
+            if endpoint.url in outrun:
+                # Beaten by a hedge that started later: counts against the replica,
+                # otherwise a hung replica would never trip its breaker
+                endpoint.breaker.record(False, time.monotonic() - start)
+                metrics.incr("resilience.outrun")
+            else:
+                endpoint.breaker.abandon()
+            raise
+        except RequestCancelled:
+            endpoint.breaker.abandon()
+            raise
+        except Exception:
+            endpoint.breaker.record(False, time.monotonic() - start)
+            raise
+        else:
+            seconds = time.monotonic() - start
+            endpoint.breaker.record(True, seconds)
+            endpoint.latency.add(seconds)
+            self.latency.add(seconds)
+            return result
+        finally:
+            with self._lock:
+                endpoint.in_flight -= 1
+
+    async def call(self, fn: Callable[[Endpoint], Awaitable[Any]], hedge: bool = True,
+                   retry: Callable[[BaseException], bool] = lambda e: True) -> Any:
+        """Run ``fn(endpoint)`` on a healthy replica, hedging and failing over.
+
+        ``hedge=False`` disables hedging for this call (e.g. for writes), and
+        ``retry(error)`` decides whether a failed attempt may be retried on
+        another replica.
+        """
+        endpoint = self.pick()
+        if endpoint is None:
+            metrics.incr("resilience.rejected")
+            raise CircuitOpen(self.name)
+        tried = {endpoint.url}
+        launched = [endpoint]  # in start order
+        outrun: set[str] = set()
+        attempts = {asyncio.ensure_future(self._attempt(endpoint, fn, outrun)): endpoint}
+        hedge_after = self.hedge_delay() if hedge else None
+        error: BaseException | None = None
+        try:
+            while attempts:
+                done, _ = await asyncio.wait(attempts, timeout=hedge_after,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedge_after = None  # hedge once per call
+                    backup = self.pick(exclude=tried)
+                    if backup is not None:
+                        tried.add(backup.url)
+                        launched.append(backup)
+                        attempts[asyncio.ensure_future(self._attempt(backup, fn, outrun))] = backup
+                        metrics.incr("resilience.hedged")
+                    continue
+                for task in done:
+                    winner = attempts.pop(task)
+                    if task.exception() is None:
+                        if winner is not endpoint:
+                            metrics.incr("resilience.backup_wins")
+                        # Only attempts started before the winner were beaten by it
+                        earlier = launched[:launched.index(winner)]
+                        outrun.update(e.url for e in earlier if e in attempts.values())
+                        return task.result()
+                    error = task.exception()
+                if not attempts and not isinstance(error, RequestCancelled) and retry(error):
+                    backup = self.pick(exclude=tried)
+                    if backup is not None:
+                        tried.add(backup.url)
+                        launched.append(backup)
+                        attempts[asyncio.ensure_future(self._attempt(backup, fn, outrun))] = backup
+                        metrics.incr("resilience.failovers")
+            raise error
+        finally:
+            for task in attempts:
+                task.cancel()
+            if attempts:
+                await asyncio.gather(*attempts, return_exceptions=True)
+
+    def stats(self) -> dict:
+        p95 = self.latency.percentile(0.95)
+        return {
+            "hedge_after_seconds": round(d, 3) if (d := self.hedge_delay()) is not None else None,
+            "p95_seconds": round(p95, 3) if p95 is not None else None,
+            "endpoints": {e.url: e.stats() for e in self.endpoints},
+        }
@@ -0,0 +1,209 @@
+"""Semantic whole-turn cache for general questions.
+
+"How long does a billing correction take?" and "what does modifier -25
+mean?" get the same answer for every patient, yet each one used to run the
+orchestrator. ``ResponseCache`` keeps the answers of such turns and serves a
+new message whose meaning is close enough to a cached one:
+
+* messages are embedded locally with a hashing vectorizer (word unigrams and
+  bigrams plus character 4-grams, signed feature hashing, L2-normalized), so
+  no model call is spent on the lookup;
+* candidates come from a random-hyperplane LSH index (``bands`` tables of
+  ``bits``-bit signatures), and the best one by exact cosine similarity is a
+  hit when it reaches ``threshold``;
+* entries expire after ``ttl`` seconds and the least recently used are
+  evicted beyond ``max_entries``.
+
+Only general answers may be stored: the caller only looks up and stores the
+opening message of a conversation (a follow-up leans on history the cached
+answer knows nothing about) and only when the turn used no patient-scoped
+tool, and ``store`` refuses any message or response carrying
+patient identifiers (record IDs, dates of birth, phone numbers, emails,
+names). A message with identifiers never looks the cache up either.
+"""
+
+import math
+import random
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from shared import metrics
+
+Vector = dict[int, float]  # sparse: hashed feature -> weight
+
+IDENTIFIER = re.compile(
+    r"\b[A-Z]{2,5}-[A-Z0-9]{3,}\b"  # PAT-2847, BILL-90421, CASE-..., TKT-...
+    r"|\b\d{4}-\d{2}-\d{2}\b|\b\d{1,2}/\d{1,2}/\d{2,4}\b"  # dates (of birth, of service)
+    r"|\(?\b\d{3}\)?[-.\s]\d{3}[-.\s]\d{4}\b"  # phone numbers
+    r"|\b\d{3}-\d{2}-\d{4}\b"  # SSN-shaped
+    r"|[\w.+-]+@[\w-]+\.[\w.]+"  # email
+    r"|\$\s?\d[\d,]*(?:\.\d\d)?"  # amounts are someone's bill
+)
+SELF_INTRODUCTION = re.compile(r"\b(my name is|i am [A-Z]|i'm [A-Z]|this is [A-Z])", re.IGNORECASE)
+CAPITALIZED = re.compile(r"(?<![.!?]\s)(?<!^)(?<![.!?])\b[A-Z][a-z]{2,}\b", re.MULTILINE)  # not sentence-initial
+TOKEN = re.compile(r"[a-z0-9]+(?:[-'][a-z0-9]+)*")
+STOPWORDS = frozenset("a an the is are was be do does did you your it its of to for in on at "
+                      "and or can could would should will please hi hello thanks".split())
+
+
+def has_identifiers(text: str, names: tuple[str, ...] = ()) -> bool:
+    """Whether ``text`` carries patient identifiers (or one of ``names``)."""
+    if IDENTIFIER.search(text):
+        return True
+    lowered = text.lower()
+    return any(name and name.lower() in lowered for name in names)
+
+
+def _stem(word: str) -> str:
+    # Plurals only: "corrections" should match "correction", nothing cleverer
+    return word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+
+
+def embed(text: str, dim: int) -> Vector:
+    """Hashing-vectorizer embedding of ``text`` (see module docstring)."""
+    words = [_stem(w) for w in TOKEN.findall(text.lower()) if w not in STOPWORDS]
+    features: list[tuple[str, float]] = [(w, 1.0) for w in words]
+    features += [(f"{a} {b}", 0.7) for a, b in zip(words, words[1:])]
+    for w in words:
+        padded = f"<{w}>"
+        features += [(padded[i:i + 4], 0.3) for i in range(max(1, len(padded) - 3))]
+    vector: Vector = {}
+    for feature, weight in features:
+        h = zlib.crc32(feature.encode())
+        index = h % dim
+        vector[index] = vector.get(index, 0.0) + (weight if h & 0x80000000 else -weight)
+    norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+    return {i: v / norm for i, v in vector.items() if v}
+
+
+def cosine(a: Vector, b: Vector) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(i, 0.0) for i, v in a.items())
+
+
+@dataclass(slots=True)
+class CachedTurn:
+    question: str
+    response: str
+    vector: Vector
+    signatures: tuple[int, ...]
+    latency: float  # seconds the original turn took
+    stored_at: float
+    hits: int = 0
+
+
+class ResponseCache:
+    """Answers of general questions by approximate semantic match."""
+
+    def __init__(self, threshold: float = 0.9, ttl: float = 3600.0, max_entries: int = 1000,
+                 dim: int = 2048, bands: int = 8, bits: int = 6, seed: int = 17):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.dim = dim
+        rng = random.Random(seed)
+        self._planes = [[[rng.gauss(0.0, 1.0) for _ in range(dim)] for _ in range(bits)]
+                        for _ in range(bands)]
+        self._entries: OrderedDict[int, CachedTurn] = OrderedDict()  # LRU order
+        self._buckets: list[dict[int, set[int]]] = [{} for _ in range(bands)]
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+        self.saved_seconds = 0.0
+
+    def _signatures(self, vector: Vector) -> tuple[int, ...]:
+        signatures = []
+        for band in self._planes:
+            signature = 0
+            for bit, plane in enumerate(band):
+                if sum(v * plane[i] for i, v in vector.items()) >= 0:
+                    signature |= 1 << bit
+            signatures.append(signature)
+        return tuple(signatures)
+
+    def lookup(self, message: str) -> tuple[CachedTurn, float] | None:
+        """The cached turn answering ``message`` and its similarity, if any."""
+        if has_identifiers(message):
+            return None
+        vector = embed(message, self.dim)
+        signatures = self._signatures(vector)
+        now = time.time()
+        with self._lock:
+            candidates = set()
+            for band, signature in zip(self._buckets, signatures):
+                candidates |= band.get(signature, set())
+            best, best_similarity = None, self.threshold
+            for entry_id in candidates:
+                entry = self._entries[entry_id]
+                if now - entry.stored_at > self.ttl:
+                    self._remove(entry_id)
+                    continue
+                similarity = cosine(vector, entry.vector)
+                if similarity >= best_similarity:
+                    best, best_similarity = entry_id, similarity
+            if best is None:
+                self.misses += 1
+                metrics.incr("response_cache.misses")
+                return None
+            self._entries.move_to_end(best)
+            entry = self._entries[best]
+            entry.hits += 1
+            self.hits += 1
+        metrics.incr("response_cache.hits")
+        return entry, best_similarity
+
+    def record_saving(self, entry: CachedTurn, seconds: float):
+        """Count the latency a hit saved against the turn it replaced."""
+        saved = max(0.0, entry.latency - seconds)
+        with self._lock:
+            self.saved_seconds += saved
+        metrics.incr("response_cache.saved_seconds", saved)
+
+    def store(self, message: str, response: str, latency: float) -> bool:
+        """Cache a general turn; refused if either side identifies a patient."""
+        mentioned = tuple(CAPITALIZED.findall(message))  # likely proper nouns
+        if (has_identifiers(message) or has_identifiers(response, mentioned)
+                or SELF_INTRODUCTION.search(message)):
+            metrics.incr("response_cache.rejected_identifiers")
+            return False
+        vector = embed(message, self.dim)
+        if not vector:
+            return False
+        entry = CachedTurn(message, response, vector, self._signatures(vector), latency, time.time())
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = entry
+            for band, signature in zip(self._buckets, entry.signatures):
+                band.setdefault(signature, set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                metrics.incr("response_cache.evicted")
+        metrics.incr("response_cache.stored")
+        return True
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        for band, signature in zip(self._buckets, entry.signatures):
+            bucket = band.get(signature)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del band[signature]
+
+    def clear(self):
+        with self._lock:
+            for entry_id in list(self._entries):
+                self._remove(entry_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                    "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+                    "saved_seconds": round(self.saved_seconds, 2)}
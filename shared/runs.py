@@ -0,0 +1,169 @@
+"""Chat turns as resumable runs.
+
+Every streamed turn is a ``Run`` with an ID. The SSE frames it produces
+(trace events, metrics, the final response) get increasing sequence numbers
+and are kept in a bounded replay buffer, so a client that lost its connection
+can reattach with ``Last-Event-ID`` and receive only what it missed while the
+turn keeps running. Reattaching replays buffered frames and never re-runs
+the turn.
+
+A run whose last subscriber has gone is given ``grace`` seconds for a
+reconnect before its ``on_abandoned`` callback (cancelling the turn) fires.
+Finished runs stay available for replay for ``retention`` seconds.
+
+Frames may be published from any thread (tools report into the trace from
+worker threads). The buffer keeps the frame objects themselves, which is also
+where a streamed turn's trace reads its events from; they are encoded only
+when a subscriber sends them (``shared.sse``). Subscribers poll the buffer on
+the event loop and receive everything published since their last batch
+together.
+"""
+
+import asyncio
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import AsyncIterator, Callable, NamedTuple
+
+from shared import metrics
+from shared.deadline import Deadline
+from shared.sse import droppable
+
+
+class Frame(NamedTuple):
+    seq: int
+    droppable: bool  # may be skipped for slow clients
+    frame: dict
+
+
+class Run:
+    """Sequenced frames of one turn and the subscribers streaming them."""
+
+    def __init__(self, session_id: str, buffer_size: int, grace: float):
+        self.run_id = f"run-{uuid.uuid4().hex[:16]}"
+        self.session_id = session_id
+        self.created_at = time.time()
+        self.finished_at: float | None = None
+        self.grace = grace
+        self.subscribers = 0
+        self.on_abandoned: Callable[[], None] | None = None
+        self.deadline: Deadline | None = None  # cancelling it stops the turn
+        self.task: asyncio.Task | None = None  # the turn producing the frames
+        self._frames: deque[Frame] = deque(maxlen=buffer_size)
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._grace_timer: asyncio.TimerHandle | None = None
+
+    @property
+    def done(self) -> bool:
+        return self.finished_at is not None
+
+    @property
+    def last_seq(self) -> int:
+        return self._seq
+
+    @property
+    def full(self) -> bool:
+        """Whether the next frame pushes the oldest one out of the buffer."""
+        return len(self._frames) == self._frames.maxlen
+
+    def publish(self, frame: dict) -> int:
+        """Append a frame; returns its sequence number (the SSE event id)."""
+        with self._lock:
+            self._seq += 1
+            self._frames.append(Frame(self._seq, droppable(frame), frame))
+            return self._seq
+
+    def finish(self):
+        self.finished_at = time.time()
+
+    def since(self, last_seq: int) -> tuple[list[Frame], int]:
+        """Frames after ``last_seq`` and how many of those fell out of the buffer."""
+        with self._lock:
+            frames = [f for f in self._frames if f.seq > last_seq]
+            oldest = self._frames[0].seq if self._frames else self._seq + 1
+        return frames, max(0, oldest - last_seq - 1)
+
+    async def subscribe(self, last_seq: int = 0, poll: float = 0.02) -> AsyncIterator[tuple[list[Frame], int]]:
+        """Yield batches of frames after ``last_seq`` until the run is done.
+
+        Each batch is everything published since the previous one, with the
+        number of frames that were evicted from the buffer before this
+        subscriber could see them.
+        """
+        self._attach()
+        try:
+            while True:
+                done = self.done  # read before draining so the last frames are not missed
+                frames, missed = self.since(last_seq)
+                if frames or missed:
+                    if frames:
+                        last_seq = frames[-1].seq
+                    else:
+                        last_seq += missed
+                    yield frames, missed
+                elif done:
+                    return
+                else:
+                    await asyncio.sleep(poll)
+        finally:
+            self._detach()
+
+    def _attach(self):
+        self.subscribers += 1
+        if self._grace_timer is not None:
+            self._grace_timer.cancel()
+            self._grace_timer = None
+
+    def _detach(self):
+        self.subscribers -= 1
+        if self.subscribers == 0 and not self.done and self.on_abandoned is not None:
+            self._grace_timer = asyncio.get_running_loop().call_later(self.grace, self._abandon)
+
+    def _abandon(self):
+        self._grace_timer = None
+        if self.subscribers == 0 and not self.done and self.on_abandoned is not None:
+            metrics.incr("runs.abandoned")
+            self.on_abandoned()
+
+    def status(self) -> dict:
+        return {"run_id": self.run_id, "session_id": self.session_id,
+                "status": "finished" if self.done else "running",
+                "last_event_id": self._seq, "subscribers": self.subscribers}
+
+
+class RunRegistry:
+    """Runs by ID; finished runs are dropped after ``retention`` seconds."""
+
+    def __init__(self, buffer_size: int = 1000, grace: float = 30.0, retention: float = 300.0,
+                 max_runs: int = 1000):
+        self.buffer_size = buffer_size
+        self.grace = grace
+        self.retention = retention
+        self.max_runs = max_runs
+        self._runs: OrderedDict[str, Run] = OrderedDict()
+
+    def create(self, session_id: str) -> Run:
+        self._evict()
+        run = Run(session_id, self.buffer_size, self.grace)
+        self._runs[run.run_id] = run
+        metrics.incr("runs.started")
+        return run
+
+    def get(self, run_id: str) -> Run | None:
+        self._evict()
+        return self._runs.get(run_id)
+
+    def _evict(self):
+        now = time.time()
+        finished = [r for r in self._runs.values() if r.done]
+        for run in finished:
+            if now - run.finished_at > self.retention or len(self._runs) > self.max_runs:
+                del self._runs[run.run_id]
+
+    def stats(self) -> dict:
+        runs = list(self._runs.values())
+        return {"running": sum(1 for r in runs if not r.done),
+                "retained": sum(1 for r in runs if r.done),
+                "subscribers": sum(r.subscribers for r in runs)}
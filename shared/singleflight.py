@@ -0,0 +1,102 @@
+"""Single-flight coalescing of identical in-flight calls.
+
+When several callers ask for the same thing at the same time (a retried
+request, two open tabs, a double-clicked send), only the first one runs it;
+the others wait for that execution and receive the same result. Nothing is
+cached: once the call finishes, the next caller runs it again.
+
+Async callers share an ``asyncio.Task`` on the same event loop. The shared
+execution is shielded from any one waiter being cancelled and is only
+cancelled when the last waiter leaves. Sync callers share a thread-side
+result slot instead.
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Hashable
+
+from shared import metrics
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with equal keys into one execution."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._async: dict[Hashable, _AsyncCall] = {}
+        self._sync: dict[Hashable, _SyncCall] = {}
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> tuple[Any, bool]:
+        """Run ``factory()`` once per key in flight; returns (result, shared)."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            call = self._async.get(key)
+            shared = call is not None and call.loop is loop
+            if not shared:
+                call = _AsyncCall(loop, loop.create_task(factory()))
+                self._async[key] = call
+                call.task.add_done_callback(lambda _, c=call: self._forget(self._async, key, c))
+            call.waiters += 1
+        self._count(shared)
+        try:
+            return await asyncio.shield(call.task), shared
+        finally:
+            with self._lock:
+                call.waiters -= 1
+                abandoned = call.waiters == 0 and not call.task.done()
+            if abandoned:
+                call.task.cancel()
+
+    def do_sync(self, key: Hashable, fn: Callable[[], Any]) -> tuple[Any, bool]:
+        """Blocking counterpart of ``do`` for synchronous callers."""
+        with self._lock:
+            call = self._sync.get(key)
+            shared = call is not None
+            if not shared:
+                call = self._sync[key] = _SyncCall()
+        self._count(shared)
+        if shared:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            self._forget(self._sync, key, call)
+            call.done.set()
+        return call.result, False
+
+    def _forget(self, calls: dict, key: Hashable, call):
+        with self._lock:
+            if calls.get(key) is call:
+                del calls[key]
+
+    def _count(self, shared: bool):
+        metrics.incr(f"singleflight.{self.name}.{'coalesced' if shared else 'executed'}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"in_flight": len(self._async) + len(self._sync)}
+
+
+class _AsyncCall:
+    __slots__ = ("loop", "task", "waiters")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, task: asyncio.Task):
+        self.loop = loop
+        self.task = task
+        self.waiters = 0
+
+
+class _SyncCall:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
@@ -0,0 +1,111 @@
+"""Server-sent event encoding and delivery for chat streams.
+
+Frames are serialized when they are sent (``encode_frame``), with orjson when
+it is installed and the stdlib encoder otherwise; the run's buffer holds the
+frame objects only, so a frame nobody receives is never encoded.
+
+``stream_run`` turns a run subscription into the response body:
+
+* every batch of frames published since the last write (events produced
+  within one poll interval of each other) goes out as a single chunk;
+* a client that has fallen more than ``max_lag`` frames behind gets the
+  essential frames only: droppable trace events (``thinking``) in that
+  backlog are replaced by one ``skipped`` frame, so a slow reader costs no
+  more than the run's bounded replay buffer;
+* with ``gzip`` the stream is compressed, flushed after every chunk so
+  frames are not held back by the compressor.
+"""
+
+import json
+import zlib
+from typing import AsyncIterator
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib encoder is several times slower on trace payloads
+    orjson = None
+
+from shared.tracing import TraceEvent
+
+DROPPABLE_TRACE_EVENTS = {"thinking"}
+
+
+def _default(obj):
+    # orjson encodes TraceEvent (a dataclass) natively; the stdlib needs the dict
+    return obj.to_dict() if isinstance(obj, TraceEvent) else str(obj)
+
+
+def dumps(obj) -> bytes:
+    """Compact JSON bytes; values JSON does not know (excerpts...) are stringified."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_default, separators=(",", ":")).encode()
+
+
+def encode_frame(seq: int | None, frame: dict) -> bytes:
+    data = b"data: " + dumps(frame) + b"\n\n"
+    return b"id: %d\n" % seq + data if seq is not None else data
+
+
+def droppable(frame: dict) -> bool:
+    if frame.get("type") != "trace":
+        return False
+    event = frame["event"]
+    event_type = event.type if isinstance(event, TraceEvent) else event.get("type")
+    return event_type in DROPPABLE_TRACE_EVENTS
+
+
+class _Gzip:
+    def __init__(self):
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31: gzip container
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+async def frame_batches(run, last_seq: int, *, poll: float,
+                        max_lag: int) -> AsyncIterator[list[tuple[int | None, bytes]]]:
+    """Batches of ``(seq, encoded frame)`` for ``run`` after ``last_seq``.
+
+    Missed frames are reported with a ``gap`` frame and, past ``max_lag``,
+    droppable frames are replaced by a ``skipped`` frame; both have no seq.
+    """
+    from shared import metrics
+
+    async for frames, missed in run.subscribe(last_seq, poll):
+        batch = []
+        if missed:
+            metrics.incr("sse.frames_lost", missed)
+            batch.append((None, encode_frame(None, {"type": "gap", "missed": missed})))
+        if len(frames) > max_lag:
+            kept = [f for f in frames if not f.droppable]
+            skipped = len(frames) - len(kept)
+            if skipped:
+                metrics.incr("sse.frames_dropped", skipped)
+                batch.append((None, encode_frame(None, {"type": "skipped", "count": skipped})))
+                frames = kept
+        batch.extend((f.seq, encode_frame(f.seq, f.frame)) for f in frames)
+        metrics.incr("sse.frames", len(frames))
+        yield batch
+
+
+def frame_json(encoded: bytes) -> bytes:
+    """The JSON payload of an encoded SSE frame."""
+    return encoded[encoded.index(b"data: ") + 6:-2]
+
+
+async def stream_run(run, last_seq: int, *, poll: float, max_lag: int,
+                     gzip: bool = False) -> AsyncIterator[bytes]:
+    """Response body chunks for ``run`` after ``last_seq`` (see module docstring)."""
+    from shared import metrics
+
+    compressor = _Gzip() if gzip else None
+    async for batch in frame_batches(run, last_seq, poll=poll, max_lag=max_lag):
+        chunk = b"".join(data for _, data in batch)
+        metrics.incr("sse.writes")
+        yield compressor.compress(chunk) if compressor else chunk
+    if compressor:
+        yield compressor.finish()
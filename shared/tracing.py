@@ -0,0 +1,82 @@
+"""Context-local access to the current request's trace from any layer.
+
+server.py sets ``current_trace`` for each turn. The tool layer, the model
+router and the domain tools report into it through these helpers without
+importing the server; outside a traced request they are no-ops.
+
+Trace events are ``TraceEvent`` objects rather than dicts: slotted, with the
+repeated agent/type/icon/status strings interned. Large payloads (tool
+outputs, full thoughts) are held by reference and cut to size only when the
+event is serialized, through ``Excerpt``.
+"""
+
+import contextvars
+import sys
+from dataclasses import dataclass
+from typing import Any
+
+current_trace: contextvars.ContextVar[Any] = contextvars.ContextVar("trace", default=None)
+
+
+class Excerpt:
+    """The first ``limit`` characters of ``text``, cut when serialized."""
+
+    __slots__ = ("text", "limit", "suffix")
+
+    def __init__(self, text: str, limit: int, suffix: str = ""):
+        self.text = text
+        self.limit = limit
+        self.suffix = suffix
+
+    def __str__(self) -> str:
+        if len(self.text) <= self.limit:
+            return self.text
+        return self.text[:self.limit] + self.suffix
+
+
+@dataclass(slots=True)
+class TraceEvent:
+    type: str
+    timestamp: float
+    agent: str
+    title: str
+    detail: str | Excerpt
+    icon: str
+    status: str
+    data: dict | None = None
+
+    def __post_init__(self):
+        # A turn has hundreds of events but only a handful of distinct values
+        self.type = sys.intern(self.type)
+        self.agent = sys.intern(self.agent)
+        self.icon = sys.intern(self.icon)
+        self.status = sys.intern(self.status)
+
+    def to_dict(self) -> dict:
+        """Plain JSON-ready dict, with excerpts cut."""
+        data = self.data
+        if data:
+            data = {k: str(v) if isinstance(v, Excerpt) else v for k, v in data.items()}
+        return {"type": self.type, "timestamp": self.timestamp, "agent": self.agent,
+                "title": self.title, "detail": str(self.detail), "icon": self.icon,
+                "status": self.status, "data": data}
+
+
+def trace_event(event_type: str, agent: str, title: str, detail: str = "",
+                icon: str = "⚡", status: str = "info", data: dict | None = None):
+    trace = current_trace.get()
+    if trace is not None:
+        trace.add(event_type, agent, title, detail, icon, status, data)
+
+
+def add_timing(label: str, seconds: float):
+    trace = current_trace.get()
+    if trace is not None:
+        trace.add_timing(label, seconds)
+
+
+def record_model_call(tier: str, seconds: float, input_tokens: int,
+                      output_tokens: int, cost: float):
+    trace = current_trace.get()
+    if trace is not None:
+        trace.record_model_call(tier, seconds, input_tokens, output_tokens, cost)
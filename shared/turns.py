@@ -0,0 +1,92 @@
+"""Per-session turn scheduling.
+
+Turns of one conversation must not overlap: they read and extend the same
+session history and patient context. ``SessionTurns.turn`` runs the turns of
+a session one at a time, in arrival order (``asyncio.Lock`` wakes waiters
+first-in first-out), while turns of different sessions never wait for each
+other. The time a turn spent queued behind its session's earlier turns is
+reported back so it can go into the trace.
+
+A message identical to one already queued or running in the same session (a
+double-clicked send, a client retry) should not cost a second agent run:
+``attach`` finds the in-flight turn registered with ``track`` so the caller
+can follow it instead.
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Hashable
+
+from shared import metrics
+from shared import deadline as request_deadline
+
+
+def turn_key(session_id: str, message: str) -> tuple[str, str]:
+    """Identity of a turn: the session and its whitespace-normalized message."""
+    return session_id, " ".join(message.split())
+
+
+class _SessionLock:
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+class SessionTurns:
+    """FIFO turn lock per session and the turns in flight, by ``turn_key``."""
+
+    def __init__(self):
+        self._locks: dict[str, _SessionLock] = {}
+        self._in_flight: dict[Hashable, Any] = {}
+
+    @asynccontextmanager
+    async def turn(self, session_id: str) -> AsyncIterator[float]:
+        """Hold the session's turn; yields seconds spent waiting for it.
+
+        Waiting is bounded by the current request deadline, if any.
+        """
+        entry = self._locks.get(session_id)
+        if entry is None:
+            entry = self._locks[session_id] = _SessionLock()
+        entry.users += 1
+        started = time.monotonic()
+        try:
+            queued = entry.lock.locked()
+            if queued:
+                metrics.incr("turns.queued")
+                await request_deadline.race(entry.lock.acquire())
+            else:
+                await entry.lock.acquire()  # free: taken without suspending
+            waited = time.monotonic() - started if queued else 0.0
+            if waited:
+                metrics.incr("turns.wait_seconds", waited)
+            try:
+                yield waited
+            finally:
+                entry.lock.release()
+        finally:
+            entry.users -= 1
+            if entry.users == 0:
+                del self._locks[session_id]
+
+    def attach(self, key: Hashable) -> Any | None:
+        """The handle of the identical turn in flight, if any."""
+        handle = self._in_flight.get(key)
+        if handle is not None:
+            metrics.incr("turns.attached")
+        return handle
+
+    def track(self, key: Hashable, handle: Any):
+        self._in_flight[key] = handle
+
+    def forget(self, key: Hashable, handle: Any):
+        if self._in_flight.get(key) is handle:
+            del self._in_flight[key]
+
+    def stats(self) -> dict:
+        return {"sessions_active": len(self._locks),
+                "sessions_queued": sum(1 for e in self._locks.values() if e.users > 1),
+                "in_flight": len(self._in_flight)}
@@ -0,0 +1,190 @@
+"""Many chat sessions over one WebSocket.
+
+A dashboard watching dozens of patient sessions opens one ``/ws`` connection
+instead of a POST and an SSE response per turn. Turns still run as resumable
+runs (``shared.runs``) and their frames are the same ones SSE clients get;
+each WebSocket message is one batch of them, tagged with the session and run.
+
+Client messages (JSON text):
+
+* ``{"type": "chat", "session_id": ..., "message": ..., "ref": ...}`` starts
+  a turn. ``session_id`` may be omitted for a new session; the ``accepted``
+  reply carries the ``ref`` back with the session and run IDs.
+* ``{"type": "cancel", "run_id": ...}`` (or ``"session_id"``) cancels a turn.
+* ``{"type": "resume", "run_id": ..., "last_event_id": ...}`` follows a run
+  started on an earlier connection (or over SSE) from where it left off.
+* ``{"type": "ping"}`` is answered with ``pong``.
+
+Server messages are JSON arrays of envelopes
+``{"session_id", "run_id", "id", "frame"}`` where ``frame`` is exactly the
+SSE ``data`` payload and ``id`` its event id (null for gap/skipped frames).
+Protocol errors are sent as a one-element array with an ``error`` frame and
+no run.
+
+Replies to the client's own messages (``pong``, ``accepted``, errors) go out
+ahead of queued run frames, so pings, cancels and new turns are never stuck
+behind a slow socket. A client that stops reading while it keeps sending is
+disconnected once ``control_buffer`` replies are pending.
+
+Turns of one session run one after another, in order (``shared.turns``);
+repeating a message that is still in flight attaches to its run. When the
+connection closes, its runs keep going for the reconnect grace period like
+abandoned SSE streams.
+"""
+
+import asyncio
+import json
+from typing import Awaitable, Callable
+
+from shared import metrics
+from shared.runs import Run, RunRegistry
+from shared.sse import dumps, frame_batches, frame_json
+
+StartTurn = Callable[[str | None, str], Awaitable[Run]]
+
+
+class _Overloaded(Exception):
+    """The client is not reading the replies to its own messages."""
+
+
+class ChatMultiplexer:
+    """One WebSocket connection and the runs streamed over it."""
+
+    def __init__(self, websocket, start_turn: StartTurn, runs: RunRegistry, *,
+                 poll: float, max_lag: int, max_runs: int, send_buffer: int = 64,
+                 control_buffer: int = 256):
+        self.websocket = websocket
+        self.start_turn = start_turn
+        self.runs = runs
+        self.poll = poll
+        self.max_lag = max_lag
+        self.max_runs = max_runs
+        self._outbox: asyncio.Queue[bytes] = asyncio.Queue(send_buffer)  # run frames
+        self._control: asyncio.Queue[bytes] = asyncio.Queue(control_buffer)  # replies, sent first
+        self._ready = asyncio.Event()  # set whenever either queue gets a message
+        self._forwarders: dict[str, asyncio.Task] = {}  # run_id -> task streaming it
+
+    async def serve(self):
+        """Handle the connection until the client closes it."""
+        await self.websocket.accept()
+        metrics.incr("ws.connections")
+        writer = asyncio.create_task(self._write())
+        try:
+            while True:
+                message = await self.websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("text") is None:
+                    self._error("binary messages are not supported; send JSON text")
+                    continue
+                try:
+                    request = json.loads(message["text"])
+                except ValueError:
+                    self._error("invalid JSON")
+                    continue
+                metrics.incr("ws.messages_in")
+                try:
+                    await self._handle(request if isinstance(request, dict) else {})
+                except (TypeError, ValueError) as e:
+                    self._error(f"invalid request: {e}")
+        except _Overloaded:
+            metrics.incr("ws.overloaded")
+        finally:
+            for task in self._forwarders.values():
+                task.cancel()  # detaching starts each run's reconnect grace period
+            writer.cancel()
+
+    async def _handle(self, request: dict):
+        kind = request.get("type")
+        ref = request.get("ref")
+        if kind == "ping":
+            self._reply(b'[{"frame":{"type":"pong"}}]')
+        elif kind == "chat":
+            message = str(request.get("message") or "").strip()
+            session_id = request.get("session_id")
+            if not message:
+                self._error("'message' is required", ref)
+            elif len(self._forwarders) >= self.max_runs:
+                self._error(f"at most {self.max_runs} turns may run per connection", ref)
+            else:
+                run = await self.start_turn(session_id, message)
+                self._reply(self._message(run, [(None, dumps({"type": "accepted", "ref": ref}))]))
+                if run.run_id not in self._forwarders:  # not a repeat of a turn we follow
+                    self._follow(run, 0)
+                metrics.incr("ws.turns")
+        elif kind == "cancel":
+            run_id = request.get("run_id") or self._active_run(request.get("session_id"))
+            run = self.runs.get(str(run_id))
+            if run is None or run.done or run.deadline is None:
+                self._error("no running turn to cancel", ref)
+            else:
+                run.deadline.cancel("client_cancelled")
+        elif kind == "resume":
+            run = self.runs.get(str(request.get("run_id")))
+            if run is None:
+                self._error("run not found or expired", ref)
+            elif run.run_id not in self._forwarders:
+                metrics.incr("runs.resumed")
+                self._follow(run, int(request.get("last_event_id") or 0))
+        else:
+            self._error(f"unknown message type {kind!r}", ref)
+
+    def _active_run(self, session_id: str | None) -> str | None:
+        for run_id in self._forwarders:
+            run = self.runs.get(run_id)
+            if run is not None and run.session_id == session_id and not run.done:
+                return run_id
+        return None
+
+    def _follow(self, run: Run, last_seq: int):
+        task = asyncio.create_task(self._forward(run, last_seq))
+        self._forwarders[run.run_id] = task
+        task.add_done_callback(lambda _: self._forwarders.pop(run.run_id, None))
+
+    async def _forward(self, run: Run, last_seq: int):
+        async for batch in frame_batches(run, last_seq, poll=self.poll, max_lag=self.max_lag):
+            # Waits while the outbox is full, so a slow client's backlog piles up
+            # in the run and is shed like an SSE client's
+            await self._outbox.put(self._message(run, [(seq, frame_json(data)) for seq, data in batch]))
+            self._ready.set()
+
+    @staticmethod
+    def _message(run: Run, frames: list[tuple[int | None, bytes]]) -> bytes:
+        """One message with ``(seq, frame JSON)`` pairs of ``run``."""
+        prefix = b'{"session_id":%s,"run_id":"%s","id":' % (dumps(run.session_id), run.run_id.encode())
+        envelopes = [prefix + (b"%d" % seq if seq is not None else b"null") + b',"frame":'
+                     + data + b"}"
+                     for seq, data in frames]
+        return b"[" + b",".join(envelopes) + b"]"
+
+    def _reply(self, message: bytes):
+        """Queue a reply to the client's own message, ahead of run frames."""
+        try:
+            self._control.put_nowait(message)
+        except asyncio.QueueFull:
+            raise _Overloaded from None
+        self._ready.set()
+
+    def _error(self, message: str, ref=None):
+        metrics.incr("ws.errors")
+        self._reply(b"[" + dumps({"frame": {"type": "error", "message": message,
+                                            "ref": ref}}) + b"]")
+
+    async def _write(self):
+        # The only task that sends, so frames of concurrent runs never interleave mid-message
+        from starlette.websockets import WebSocketDisconnect
+
+        while True:
+            if not self._control.empty():
+                message = self._control.get_nowait()
+            elif not self._outbox.empty():
+                message = self._outbox.get_nowait()
+            else:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            try:
+                await self.websocket.send_text(message.decode())
+            except (WebSocketDisconnect, RuntimeError):
+                return  # closed; the receive loop ends the connection
+            metrics.incr("ws.messages_out")
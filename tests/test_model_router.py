@@ -0,0 +1,50 @@
+"""Routing table for shared.model_router.route: which tasks may use the fast tier."""
+
+import pytest
+
+from shared import model_router as router
+
+
+@pytest.fixture(autouse=True)
+def auto_routing(monkeypatch):
+    monkeypatch.setattr(router, "MODEL_ROUTING_ENABLED", True)
+    monkeypatch.setattr(router, "AGENT_TIERS", {"servicenow": "auto", "salesforce": "auto"})
+
+
+@pytest.mark.parametrize("agent, task, tier", [
+    # Read-only lookups, including the ones that mention errors, cases or bills
+    ("servicenow", "Look up billing records for patient PAT-2847 and identify any errors or discrepancies.", "fast"),
+    ("servicenow", "List available cardiology appointment slots for PAT-2847.", "fast"),
+    ("servicenow", "Look up any open tickets on BILL-90421 for PAT-2847.", "fast"),
+    ("salesforce", "Verify insurance coverage for PAT-2847 and check for open cases.", "fast"),
+    ("salesforce", "Look up the patient record for PAT-2847.", "fast"),
+    ("salesforce", "Retrieve care history for PAT-2847.", "fast"),
+    # Writes phrased with a verb
+    ("servicenow", "Submit a billing correction for BILL-90421 (procedure_code) for PAT-2847.", "large"),
+    ("servicenow", "Process the correction for BILL-90421.", "large"),
+    ("servicenow", "Schedule a cardiology follow-up for PAT-2847.", "large"),
+    ("servicenow", "Create a billing dispute ticket for PAT-2847.", "large"),
+    ("salesforce", "Create a billing dispute case for PAT-2847.", "large"),
+    ("salesforce", "Update the case for PAT-2847 with the correction ID.", "large"),
+    # Writes phrased as a noun
+    ("servicenow", "Billing correction: add modifier -25 to BILL-90421 for PAT-2847", "large"),
+    ("servicenow", "Modifier -25 on BILL-90421 for PAT-2847", "large"),
+    ("servicenow", "New ticket for PAT-2847: billing dispute on BILL-90421", "large"),
+    ("salesforce", "Billing dispute case for PAT-2847", "large"),
+    ("servicenow", "Cardiology appointment for PAT-2847 next week", "large"),
+    # Nothing recognisably read-only
+    ("servicenow", "BILL-90421", "large"),
+    ("salesforce", "PAT-2847", "large"),
+])
+def test_route(agent, task, tier):
+    assert router.route(agent, task).tier == tier
+
+
+def test_pinned_tier_wins(monkeypatch):
+    monkeypatch.setattr(router, "AGENT_TIERS", {"servicenow": "fast"})
+    assert router.route("servicenow", "Submit a billing correction for BILL-90421").tier == "fast"
+
+
+def test_routing_disabled(monkeypatch):
+    monkeypatch.setattr(router, "MODEL_ROUTING_ENABLED", False)
+    assert router.route("servicenow", "Look up billing records for PAT-2847").tier == "large"